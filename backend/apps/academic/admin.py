@@ -5,7 +5,7 @@ from .models import (
     Grade, Attendance, AcademicPeriod, LessonPlan,
     ExtraActivity, ExtraActivityEnrollment, ExtraActivityAttendance,
     TaughtContent, SchoolEvent,
-    StudentChecklistConfig, StudentDailyChecklist, LessonPlanSubmissionBlock
+    StudentChecklistConfig, StudentDailyChecklist, LessonPlanSubmissionBlock, CalendarFeedToken
 )
 
 # --- CONFIGURAÇÕES AUXILIARES ---
@@ -188,6 +188,14 @@ class SchoolEventAdmin(admin.ModelAdmin):
     list_filter = ('event_type', 'target_audience')
 
 
+@admin.register(CalendarFeedToken)
+class CalendarFeedTokenAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at', 'last_used_at', 'revoked_at')
+    list_filter = ('revoked_at',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    readonly_fields = ('token', 'created_at', 'last_used_at')
+
+
 @admin.register(LessonPlanSubmissionBlock)
 class LessonPlanSubmissionBlockAdmin(admin.ModelAdmin):
     list_display = ('teacher', 'active', 'created_at', 'released_at', 'blocked_by', 'released_by')
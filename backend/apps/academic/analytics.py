@@ -0,0 +1,146 @@
+"""
+Estatísticas de notas por período (painel da coordenação / professor).
+
+Tudo é calculado no PostgreSQL numa única consulta: a média ponderada de cada
+aluno por turma/matéria (mesma regra do boletim, Σ(nota×peso)/Σpeso) e, sobre
+essas médias, média, mediana e percentis (``percentile_cont``), histograma em
+faixas de 1 ponto e aprovados/recuperação (média >= 6, como em reports.py).
+``GROUPING SETS`` devolve no mesmo resultado os níveis turma×matéria, matéria
+(escola toda) e escola.
+
+O resultado fica em cache por período; a chave tem uma versão por período,
+incrementada a cada gravação de nota.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+PASSING_AVERAGE = 6
+HISTOGRAM_BUCKETS = 10  # faixas [0,1), [1,2), ..., [9,10]
+PERCENTILES = (('p25', 0.25), ('median', 0.5), ('p75', 0.75), ('p90', 0.9))
+
+_VERSION_KEY = 'grade-analytics:version:{}'
+
+
+def _ttl():
+    return getattr(settings, 'GRADE_ANALYTICS_CACHE_TTL', 300)
+
+
+def invalidate_grade_analytics(period_ids):
+    for period_id in {pid for pid in period_ids if pid}:
+        cache.set(_VERSION_KEY.format(period_id), timezone.now().timestamp(), None)
+
+
+def _analytics_sql(classroom_id=None, subject_id=None):
+    from .models import ClassRoom, Enrollment, Grade, Subject
+
+    filters = ['g.period_id = %s']
+    params = []
+    if classroom_id is not None:
+        filters.append('e.classroom_id = %s')
+        params.append(classroom_id)
+    if subject_id is not None:
+        filters.append('g.subject_id = %s')
+        params.append(subject_id)
+
+    percentiles = ',\n            '.join(
+        f'percentile_cont({fraction}) WITHIN GROUP (ORDER BY avg) AS {name}' for name, fraction in PERCENTILES
+    )
+    buckets = ', '.join(
+        f'COUNT(*) FILTER (WHERE bucket = {i})' for i in range(1, HISTOGRAM_BUCKETS + 1)
+    )
+    sql = f"""
+        WITH student_avg AS (
+            SELECT e.classroom_id, c.name AS classroom_name, g.subject_id, s.name AS subject_name,
+                   g.enrollment_id,
+                   SUM(g.value * g.weight) / NULLIF(SUM(g.weight), 0) AS avg
+            FROM {Grade._meta.db_table} g
+            JOIN {Enrollment._meta.db_table} e ON e.id = g.enrollment_id
+            JOIN {ClassRoom._meta.db_table} c ON c.id = e.classroom_id
+            JOIN {Subject._meta.db_table} s ON s.id = g.subject_id
+            WHERE {' AND '.join(filters)}
+            GROUP BY e.classroom_id, c.name, g.subject_id, s.name, g.enrollment_id
+        ), bucketed AS (
+            SELECT *, LEAST(width_bucket(avg, 0, 10, {HISTOGRAM_BUCKETS}), {HISTOGRAM_BUCKETS}) AS bucket
+            FROM student_avg
+            WHERE avg IS NOT NULL
+        )
+        SELECT
+            GROUPING(classroom_id, subject_id) AS grouping_level,
+            classroom_id, classroom_name, subject_id, subject_name,
+            COUNT(*) AS students,
+            AVG(avg) AS average,
+            MIN(avg) AS minimum,
+            MAX(avg) AS maximum,
+            {percentiles},
+            COUNT(*) FILTER (WHERE avg >= {PASSING_AVERAGE}) AS passing,
+            COUNT(*) FILTER (WHERE avg < {PASSING_AVERAGE}) AS recovery,
+            ARRAY[{buckets}] AS histogram
+        FROM bucketed
+        GROUP BY GROUPING SETS (
+            (classroom_id, classroom_name, subject_id, subject_name),
+            (subject_id, subject_name),
+            ()
+        )
+        ORDER BY grouping_level, subject_name, classroom_name
+    """
+    return sql, params
+
+
+def _number(value):
+    return round(float(value), 2) if value is not None else None
+
+
+def _row_to_dict(columns, values):
+    row = dict(zip(columns, values))
+    level = {0: 'classroom_subject', 2: 'subject', 3: 'school'}[row.pop('grouping_level')]
+    result = {
+        'level': level,
+        'classroom_id': row['classroom_id'],
+        'classroom_name': row['classroom_name'],
+        'subject_id': row['subject_id'],
+        'subject_name': row['subject_name'],
+        'students': row['students'],
+        'average': _number(row['average']),
+        'min': _number(row['minimum']),
+        'max': _number(row['maximum']),
+        'passing': row['passing'],
+        'recovery': row['recovery'],
+        'pass_rate': round(row['passing'] * 100 / row['students'], 1) if row['students'] else None,
+        'histogram': [
+            {'from': i, 'to': i + 1, 'count': count}
+            for i, count in enumerate(row['histogram'])
+        ],
+    }
+    for name, _ in PERCENTILES:
+        result[name] = _number(row[name])
+    return result
+
+
+def compute_grade_analytics(period_id, classroom_id=None, subject_id=None):
+    """Sem cache: executa a consulta agregada e devolve {'school', 'subjects', 'classrooms'}."""
+    sql, params = _analytics_sql(classroom_id, subject_id)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [period_id, *params])
+        columns = [col[0] for col in cursor.description]
+        rows = [_row_to_dict(columns, values) for values in cursor.fetchall()]
+
+    return {
+        'period': int(period_id),
+        'passing_average': PASSING_AVERAGE,
+        'school': next((row for row in rows if row['level'] == 'school'), None),
+        'subjects': [row for row in rows if row['level'] == 'subject'],
+        'classrooms': [row for row in rows if row['level'] == 'classroom_subject'],
+    }
+
+
+def get_grade_analytics(period_id, classroom_id=None, subject_id=None):
+    """Estatísticas com cache por período (ver invalidate_grade_analytics)."""
+    version = cache.get(_VERSION_KEY.format(period_id), 0)
+    key = f'grade-analytics:{period_id}:{classroom_id}:{subject_id}:{version}'
+    data = cache.get(key)
+    if data is None:
+        data = compute_grade_analytics(period_id, classroom_id, subject_id)
+        cache.set(key, data, _ttl())
+    return data
@@ -0,0 +1,121 @@
+"""
+Autocomplete de alunos e responsáveis (typeahead dos formulários).
+
+Nome: busca sem acento e sem caixa sobre ``immutable_unaccent(lower(name))``,
+coberta por índice GIN trigram (``pg_trgm``). ``unaccent`` nativo é STABLE e
+não pode ser usado em índice, por isso a migração cria o wrapper IMMUTABLE.
+
+CPF e matrícula: colunas normalizadas (só dígitos / maiúsculas sem pontuação)
+mantidas no ``save()`` e indexadas em btree, para busca exata e por prefixo.
+"""
+import re
+import unicodedata
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, F, FloatField, Func, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+MIN_QUERY_LENGTH = 2
+
+# Abaixo disso a similaridade trigram não ajuda (prefixos curtos): só LIKE.
+_TRIGRAM_MIN_LENGTH = 3
+
+
+class ImmutableUnaccent(Func):
+    """Wrapper SQL IMMUTABLE de unaccent (criado na migração academic 0023_student_guardian_autocomplete)."""
+    function = 'immutable_unaccent'
+    arity = 1
+
+
+def name_key(field='name'):
+    """Expressão usada tanto no índice trigram quanto nas consultas."""
+    return ImmutableUnaccent(Lower(field))
+
+
+def normalize_text(value):
+    """Equivalente em Python de immutable_unaccent(lower(...))."""
+    decomposed = unicodedata.normalize('NFKD', (value or '').lower())
+    without_marks = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(without_marks.split())
+
+
+def normalize_digits(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def normalize_registration(value):
+    return re.sub(r'[^0-9A-Z]', '', (value or '').upper())
+
+
+def _ranked(queryset, text, extra_filters=Q(), extra_exact=Q()):
+    """
+    Aplica filtro + ranking por nome:
+    0 = documento exato, 1 = nome começa com o termo, 2 = alguma palavra começa
+    com o termo, 3 = contém / similar. Empate decidido pela similaridade trigram.
+    """
+    term = normalize_text(text)
+    name_filter = Q(_name_key__startswith=term) | Q(_name_key__contains=f' {term}')
+    if len(term) >= _TRIGRAM_MIN_LENGTH:
+        # "contains" cobre nomes no meio da palavra; trigram_word_similar cobre erros de digitação.
+        name_filter |= Q(_name_key__contains=term) | Q(_name_key__trigram_word_similar=term)
+
+    rank_whens = []
+    if extra_exact:
+        rank_whens.append(When(extra_exact, then=Value(0)))
+    rank_whens += [
+        When(_name_key__startswith=term, then=Value(1)),
+        When(_name_key__contains=f' {term}', then=Value(2)),
+    ]
+
+    qs = queryset.annotate(_name_key=name_key()).filter(name_filter | extra_filters)
+    qs = qs.annotate(
+        _match_rank=Case(*rank_whens, default=Value(3), output_field=IntegerField()),
+        _similarity=(
+            TrigramWordSimilarity(Value(term), F('_name_key'))
+            if len(term) >= _TRIGRAM_MIN_LENGTH
+            else Value(0.0, output_field=FloatField())
+        ),
+    )
+    return qs.order_by('_match_rank', '-_similarity', 'name', 'id')
+
+
+def _clamp_limit(limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def autocomplete_students(queryset, text, limit=DEFAULT_LIMIT):
+    text = (text or '').strip()
+    digits = normalize_digits(text)
+    registration = normalize_registration(text)
+
+    extra_filters = Q()
+    extra_exact = Q()
+    if len(registration) >= MIN_QUERY_LENGTH:
+        extra_filters |= Q(registration_key__startswith=registration)
+        extra_exact |= Q(registration_key=registration)
+    if len(digits) >= MIN_QUERY_LENGTH:
+        extra_filters |= Q(cpf_digits__startswith=digits)
+        extra_exact |= Q(cpf_digits=digits)
+
+    qs = _ranked(queryset, text, extra_filters, extra_exact)
+    return list(qs.values('id', 'name', 'registration_number')[:_clamp_limit(limit)])
+
+
+def autocomplete_guardians(queryset, text, limit=DEFAULT_LIMIT):
+    text = (text or '').strip()
+    digits = normalize_digits(text)
+
+    extra_filters = Q()
+    extra_exact = Q()
+    if len(digits) >= MIN_QUERY_LENGTH:
+        extra_filters |= Q(cpf_digits__startswith=digits)
+        extra_exact |= Q(cpf_digits=digits)
+
+    qs = _ranked(queryset, text, extra_filters, extra_exact)
+    return list(qs.values('id', 'name', 'cpf', 'phone')[:_clamp_limit(limit)])
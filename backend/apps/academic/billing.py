@@ -0,0 +1,159 @@
+"""
+Relatório mensal de cobrança das atividades extras pagas (fechamento do mês).
+
+A agregação é feita no PostgreSQL: para cada mês do intervalo, as matrículas
+em atividades ``PAID`` que se sobrepõem ao mês são cobradas proporcionalmente
+aos dias cobertos (``start_date``/``end_date``) e somadas por
+responsável/aluno/mês. Matrículas inativas só entram se tiverem ``end_date``
+(encerradas no meio do mês ainda cobram os dias usados).
+
+O aluno pode ter mais de um responsável; a cobrança vai para o primeiro
+vínculo cadastrado, para não duplicar valores.
+
+As linhas são lidas com cursor no servidor e exportadas em CSV (streaming) ou
+XLSX (openpyxl em modo write-only, gravado em arquivo temporário).
+"""
+import calendar
+import csv
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.db import connections
+
+CHUNK_SIZE = 1000
+MAX_MONTHS = 24
+
+COLUMNS = [
+    ('month', 'Mês'),
+    ('guardian_name', 'Responsável'),
+    ('guardian_cpf', 'CPF do Responsável'),
+    ('student_name', 'Aluno'),
+    ('registration_number', 'Matrícula'),
+    ('activities', 'Atividades'),
+    ('billed_days', 'Dias Cobrados'),
+    ('full_amount', 'Valor Integral'),
+    ('amount', 'Valor a Cobrar'),
+]
+
+
+def parse_month(value):
+    """'2026-03' -> date(2026, 3, 1). Levanta ValueError se inválido."""
+    year, month = str(value).split('-')[:2]
+    return date(int(year), int(month), 1)
+
+
+def month_range(start, end):
+    if end < start:
+        raise ValueError('O mês final deve ser igual ou posterior ao inicial.')
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    if months > MAX_MONTHS:
+        raise ValueError(f'Intervalo máximo de {MAX_MONTHS} meses.')
+    last_day = calendar.monthrange(end.year, end.month)[1]
+    return start, end.replace(day=last_day)
+
+
+def _billing_sql():
+    from .models import ExtraActivity, ExtraActivityEnrollment, Guardian, Student
+
+    return f"""
+        WITH months AS (
+            SELECT m::date AS month_start,
+                   (m + interval '1 month' - interval '1 day')::date AS month_end
+            FROM generate_series(%s::date, %s::date, interval '1 month') AS m
+        ), billable AS (
+            SELECT mo.month_start,
+                   (mo.month_end - mo.month_start + 1) AS month_days,
+                   s.id AS student_id, s.name AS student_name, s.registration_number,
+                   a.name AS activity_name, a.price,
+                   (LEAST(COALESCE(e.end_date, mo.month_end), mo.month_end)
+                    - GREATEST(e.start_date, mo.month_start) + 1) AS billed_days
+            FROM months mo
+            JOIN {ExtraActivityEnrollment._meta.db_table} e
+              ON e.start_date <= mo.month_end
+             AND (e.end_date IS NULL OR e.end_date >= mo.month_start)
+             AND (e.active OR e.end_date IS NOT NULL)
+            JOIN {ExtraActivity._meta.db_table} a ON a.id = e.activity_id AND a.activity_type = 'PAID'
+            JOIN {Student._meta.db_table} s ON s.id = e.student_id
+        )
+        SELECT b.month_start, g.id AS guardian_id, g.name AS guardian_name, g.cpf AS guardian_cpf,
+               b.student_id, b.student_name, b.registration_number,
+               string_agg(b.activity_name, ', ' ORDER BY b.activity_name) AS activities,
+               SUM(b.billed_days) AS billed_days,
+               SUM(b.price) AS full_amount,
+               SUM(ROUND(b.price * b.billed_days / b.month_days, 2)) AS amount
+        FROM billable b
+        LEFT JOIN LATERAL (
+            SELECT g.id, g.name, g.cpf
+            FROM {Student.guardians.through._meta.db_table} sg
+            JOIN {Guardian._meta.db_table} g ON g.id = sg.guardian_id
+            WHERE sg.student_id = b.student_id
+            ORDER BY sg.id
+            LIMIT 1
+        ) g ON TRUE
+        GROUP BY b.month_start, g.id, g.name, g.cpf, b.student_id, b.student_name, b.registration_number
+        ORDER BY b.month_start, g.name NULLS LAST, b.student_name
+    """
+
+
+def iter_billing_rows(start, end, using='default'):
+    """Gera as linhas (dict) do relatório, lidas em lotes por cursor no servidor."""
+    first_day, last_day = month_range(start, end)
+    with connections[using].chunked_cursor() as cursor:
+        cursor.execute(_billing_sql(), [first_day, last_day])
+        # Em cursor nomeado (psycopg2) a descrição das colunas só existe após o primeiro fetch.
+        chunk = cursor.fetchmany(CHUNK_SIZE)
+        columns = [col[0] for col in cursor.description or ()]
+        while chunk:
+            for values in chunk:
+                row = dict(zip(columns, values))
+                row['month'] = row.pop('month_start').strftime('%Y-%m')
+                yield row
+            chunk = cursor.fetchmany(CHUNK_SIZE)
+
+
+def summarize(rows):
+    """Lista + totais por mês (para a resposta JSON)."""
+    rows = list(rows)
+    totals = {}
+    for row in rows:
+        month = totals.setdefault(row['month'], {'students': 0, 'amount': Decimal('0')})
+        month['students'] += 1
+        month['amount'] += row['amount'] or 0
+    return {'rows': rows, 'totals': totals}
+
+
+class _Echo:
+    """Pseudo-arquivo para csv.writer devolver a linha em vez de gravar."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo(), delimiter=';')
+    # BOM para o Excel abrir acentos corretamente
+    yield '\ufeff' + writer.writerow([label for _, label in COLUMNS])
+    for row in rows:
+        yield writer.writerow([
+            str(row[key]).replace('.', ',') if isinstance(row[key], Decimal) else row[key]
+            for key, _ in COLUMNS
+        ])
+
+
+def build_xlsx(rows):
+    """Planilha em modo write-only (memória constante); retorna arquivo temporário posicionado no início."""
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Cobrança')
+    sheet.append([label for _, label in COLUMNS])
+    for row in rows:
+        sheet.append([
+            float(row[key]) if isinstance(row[key], Decimal) else row[key]
+            for key, _ in COLUMNS
+        ])
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,185 @@
+"""
+Feed iCalendar (ICS) do calendário escolar por usuário.
+
+O app de calendário do celular assina ``/api/calendar/feed/<token>.ics`` e
+sincroniza por GET condicional (ETag forte = hash do corpo). O corpo fica em
+cache por usuário, com a versão global dos eventos na chave: qualquer
+gravação/remoção de SchoolEvent muda a versão e invalida todos os feeds. O TTL
+cobre mudanças de público (grupos, matrículas dos filhos).
+"""
+import hashlib
+from datetime import time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+FEED_CACHE_TTL = 15 * 60
+# Eventos mais antigos que isso não entram no feed (mantém o arquivo pequeno).
+FEED_PAST_DAYS = 365
+
+_POWER_GROUPS = ['Coordenadores', 'Coordenação', 'Coordenacao', 'Direção', 'Direcao', 'Diretoria', 'Secretaria']
+_GUARDIAN_GROUPS = ['Responsáveis', 'Responsaveis', 'Pais']
+_VERSION_KEY = 'calendar-feed:version'
+
+
+def visible_events(user, queryset=None):
+    """Regras de público do calendário (as mesmas da listagem SchoolEventViewSet)."""
+    from .models import Enrollment, Guardian, SchoolEvent
+
+    if queryset is None:
+        queryset = SchoolEvent.objects.all().order_by('start_time')
+
+    # 1. COORDENADORES / DIREÇÃO / SECRETARIA
+    user_groups = set(user.groups.values_list('name', flat=True))
+    if user.is_superuser or bool(set(_POWER_GROUPS) & user_groups):
+        return queryset
+
+    # 2. PROFESSORES
+    if 'Professores' in user_groups:
+        return queryset.filter(target_audience__in=['ALL', 'TEACHERS', 'CLASSROOM'])
+
+    # 3. RESPONSÁVEIS
+    if set(_GUARDIAN_GROUPS) & user_groups:
+        guardian = Guardian.objects.filter(user=user).first()
+        if not guardian:
+            return queryset.filter(target_audience='ALL')
+
+        student_ids = guardian.students.values_list('id', flat=True)
+        my_classrooms_ids = Enrollment.objects.filter(
+            student__id__in=student_ids
+        ).values_list('classroom_id', flat=True).distinct()
+
+        return queryset.filter(
+            Q(target_audience='ALL') |
+            Q(target_audience='CLASSROOM', classroom__id__in=my_classrooms_ids)
+        ).distinct()
+
+    # 4. PADRÃO
+    return queryset.filter(target_audience='ALL')
+
+
+def invalidate_calendar_feeds():
+    cache.set(_VERSION_KEY, timezone.now().timestamp(), None)
+
+
+# --- Renderização RFC 5545 ---
+
+def _escape(value):
+    return (
+        str(value or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Quebra linhas em 75 octetos (continuação começa com espaço)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = char
+            limit = 74  # descontando o espaço inicial da continuação
+        else:
+            current += char
+    parts.append(current)
+    return '\r\n '.join(parts)
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _all_day_range(event):
+    """
+    Eventos de dia inteiro no ICS: os que cobrem 00:00–23:59 locais e os
+    vindos da importação do xlsx (marcados na descrição, gravados das 08:00 às
+    17:00). Retorna (data_inicio, data_fim_exclusiva) ou None.
+    """
+    from .calendar_xlsx_import import IMPORT_DAY_END, IMPORT_DAY_START, IMPORT_MARKER
+
+    start = timezone.localtime(event.start_time)
+    end = timezone.localtime(event.end_time) if event.end_time else None
+    if IMPORT_MARKER in (event.description or '') and end is not None:
+        if (start.time(), end.time()) == (IMPORT_DAY_START, IMPORT_DAY_END):
+            return start.date(), end.date() + timedelta(days=1)
+    if start.time() != time(0, 0):
+        return None
+    if end is None:
+        return start.date(), start.date() + timedelta(days=1)
+    if end.time() >= time(23, 59):
+        return start.date(), end.date() + timedelta(days=1)
+    return None
+
+
+def _event_lines(event, host):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:schoolevent-{event.id}@{host}',
+        f'DTSTAMP:{_utc(event.updated_at)}',
+        f'LAST-MODIFIED:{_utc(event.updated_at)}',
+    ]
+    all_day = _all_day_range(event)
+    if all_day:
+        lines.append(f'DTSTART;VALUE=DATE:{all_day[0]:%Y%m%d}')
+        lines.append(f'DTEND;VALUE=DATE:{all_day[1]:%Y%m%d}')
+    else:
+        lines.append(f'DTSTART:{_utc(event.start_time)}')
+        if event.end_time:
+            lines.append(f'DTEND:{_utc(event.end_time)}')
+
+    summary = event.title
+    if event.classroom_id:
+        summary = f'{summary} ({event.classroom.name})'
+    lines.append(f'SUMMARY:{_escape(summary)}')
+    if event.description:
+        lines.append(f'DESCRIPTION:{_escape(event.description)}')
+    lines.append(f'CATEGORIES:{_escape(event.get_event_type_display())}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def render_ics(events, calendar_name, host='lumis'):
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Lumis//Calendario Escolar//PT-BR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(calendar_name)}',
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ]
+    for event in events:
+        lines.extend(_event_lines(event, host))
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(_fold(line) for line in lines) + '\r\n').encode('utf-8')
+
+
+def get_feed(user, host='lumis'):
+    """Retorna (corpo_bytes, etag) do feed do usuário, usando o cache quando possível."""
+    from apps.core.models import SchoolAccount
+
+    version = cache.get(_VERSION_KEY, 0)
+    key = f'calendar-feed:{user.pk}:{host}:{version}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    since = timezone.now() - timedelta(days=FEED_PAST_DAYS)
+    events = visible_events(user).filter(start_time__gte=since).select_related('classroom').order_by('start_time', 'id')
+    school = SchoolAccount.objects.only('name').first()
+    body = render_ics(events, school.name if school else 'Lumis', host=host)
+    etag = hashlib.sha256(body).hexdigest()
+
+    cache.set(key, (body, etag), FEED_CACHE_TTL)
+    return body, etag
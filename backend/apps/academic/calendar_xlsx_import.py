@@ -4,6 +4,10 @@ Importação do calendário escolar a partir da planilha padrão (layout 2026).
 Layout esperado: uma aba com blocos de meses nas colunas B, K, T, AC, AL, AU;
 linhas 14–21 (1.º semestre) e 31–37 (2.º semestre) com textos do tipo
 "Dia - descrição" ou "Dia a Dia - descrição".
+
+O workbook é aberto em modo read-only e só as faixas fixas de linhas são lidas
+(iter_rows). Várias abas (uma por ano, p.ex. "CALENDÁRIO GERAL 2026") podem ser
+importadas numa só execução; o ano de cada aba vem do título, salvo indicação.
 """
 from __future__ import annotations
 
@@ -38,9 +42,18 @@ MONTH_NAMES_PT = frozenset(
 # Colunas dos blocos de mês (openpyxl / Excel)
 MONTH_COLS = ('B', 'K', 'T', 'AC', 'AL', 'AU')
 
+# Faixas de linhas (inclusivas) e o mês da primeira coluna de cada faixa
+SEMESTER_BLOCKS = (
+    (14, 21, 1),   # 1.º semestre: meses 1–6
+    (31, 37, 7),   # 2.º semestre: meses 7–12
+)
+
 TZ_SP = ZoneInfo('America/Sao_Paulo')
 
 IMPORT_MARKER = '[Fonte: importação calendário xlsx]'
+# Horário gravado nos eventos importados (o xlsx só traz as datas).
+IMPORT_DAY_START = time(8, 0)
+IMPORT_DAY_END = time(17, 0)
 IMPORT_DESCRIPTION_SUFFIX = f'\n\n{IMPORT_MARKER}'
 
 
@@ -201,6 +214,23 @@ def parse_calendar_line(raw: str, year: int, month: int) -> list[ParsedCalendarE
     return []
 
 
+def _col_index(col: str) -> int:
+    """'B' -> 2, 'AC' -> 29 (equivalente a openpyxl.utils.column_index_from_string)."""
+    index = 0
+    for char in col.upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index
+
+
+MONTH_COL_INDEXES = tuple(_col_index(col) for col in MONTH_COLS)
+
+
+def infer_sheet_year(sheet_title: str) -> int | None:
+    """Ano no título da aba (ex.: "CALENDÁRIO GERAL 2026" -> 2026)."""
+    m = re.search(r'(?<!\d)(20\d{2})(?!\d)', sheet_title or '')
+    return int(m.group(1)) if m else None
+
+
 def _cell_str(value) -> str:
     if value is None:
         return ''
@@ -209,103 +239,150 @@ def _cell_str(value) -> str:
     return str(value).strip()
 
 
-def iter_parsed_events(
-    xlsx_path: str | Path,
-    year: int = 2026,
-    sheet_name: str | None = None,
-) -> Iterator[ParsedCalendarEvent]:
-    """
-    Lê o workbook e gera eventos interpretados.
-    """
+def iter_sheet_events(ws, year: int) -> Iterator[ParsedCalendarEvent]:
+    """Interpreta uma aba já aberta, lendo só as faixas fixas de linhas/colunas."""
+    first_col, last_col = min(MONTH_COL_INDEXES), max(MONTH_COL_INDEXES)
+    for min_row, max_row, first_month in SEMESTER_BLOCKS:
+        for row in ws.iter_rows(
+            min_row=min_row, max_row=max_row, min_col=first_col, max_col=last_col, values_only=True
+        ):
+            for idx, col_index in enumerate(MONTH_COL_INDEXES):
+                pos = col_index - first_col
+                value = row[pos] if pos < len(row) else None
+                yield from parse_calendar_line(_cell_str(value), year, first_month + idx)
+
+
+def _open_workbook(xlsx_path: str | Path):
     try:
         import openpyxl
     except ImportError as e:
         raise ImportError(
             'Instale openpyxl para usar a importação do calendário (pip install openpyxl).'
         ) from e
+    return openpyxl.load_workbook(Path(xlsx_path), read_only=True, data_only=True)
 
-    path = Path(xlsx_path)
-    # Sem read_only: o modo read-only não permite ws['B14'] (acesso aleatório).
-    wb = openpyxl.load_workbook(path, data_only=True)
+
+def iter_calendar_sheets(
+    xlsx_path: str | Path,
+    *,
+    year: int | None = None,
+    sheet_names: list[str] | None = None,
+    all_sheets: bool = False,
+) -> Iterator[tuple[str, int, list[ParsedCalendarEvent]]]:
+    """
+    Gera (nome_da_aba, ano, eventos) para cada aba pedida.
+    Sem sheet_names/all_sheets, lê só a primeira aba. Ano: `year` se informado;
+    senão o ano do título da aba; senão o ano corrente.
+    """
+    wb = _open_workbook(xlsx_path)
     try:
-        if sheet_name:
-            ws = wb[sheet_name]
+        if sheet_names:
+            missing = [name for name in sheet_names if name not in wb.sheetnames]
+            if missing:
+                raise KeyError(f'Aba(s) inexistente(s): {", ".join(missing)}. Disponíveis: {", ".join(wb.sheetnames)}')
+            worksheets = [wb[name] for name in sheet_names]
+        elif all_sheets:
+            worksheets = list(wb.worksheets)
         else:
-            ws = wb.worksheets[0]
-        # 1.º semestre: meses 1–6, linhas 14–21
-        for row in range(14, 22):
-            for idx, col in enumerate(MONTH_COLS):
-                month = idx + 1
-                val = _cell_str(ws[f'{col}{row}'].value)
-                for ev in parse_calendar_line(val, year, month):
-                    yield ev
-        # 2.º semestre: meses 7–12, linhas 31–37
-        for row in range(31, 38):
-            for idx, col in enumerate(MONTH_COLS):
-                month = idx + 7
-                val = _cell_str(ws[f'{col}{row}'].value)
-                for ev in parse_calendar_line(val, year, month):
-                    yield ev
+            worksheets = wb.worksheets[:1]
+
+        for ws in worksheets:
+            sheet_year = year or infer_sheet_year(ws.title) or date.today().year
+            yield ws.title, sheet_year, list(iter_sheet_events(ws, sheet_year))
     finally:
         wb.close()
 
 
+def iter_parsed_events(
+    xlsx_path: str | Path,
+    year: int = 2026,
+    sheet_name: str | None = None,
+) -> Iterator[ParsedCalendarEvent]:
+    """
+    Lê o workbook (uma aba) e gera eventos interpretados.
+    """
+    sheets = iter_calendar_sheets(xlsx_path, year=year, sheet_names=[sheet_name] if sheet_name else None)
+    for _, _, events in sheets:
+        yield from events
+
+
 def _to_aware_start(d: date) -> datetime:
-    return datetime.combine(d, time(8, 0), tzinfo=TZ_SP)
+    return datetime.combine(d, IMPORT_DAY_START, tzinfo=TZ_SP)
 
 
 def _to_aware_end(d: date) -> datetime:
-    return datetime.combine(d, time(17, 0), tzinfo=TZ_SP)
+    return datetime.combine(d, IMPORT_DAY_END, tzinfo=TZ_SP)
+
+
+def _existing_keys(years: set[int]) -> set[tuple[str, date]]:
+    """(título, data local de início) dos eventos já gravados nos anos alvo — uma consulta."""
+    from django.utils import timezone
+
+    from apps.academic.models import SchoolEvent
+
+    rows = SchoolEvent.objects.filter(start_time__year__in=sorted(years)).values_list('title', 'start_time')
+    return {(title, timezone.localtime(start).date()) for title, start in rows}
 
 
 def import_calendar_events(
     xlsx_path: str | Path,
     *,
-    year: int = 2026,
+    year: int | None = 2026,
+    sheet_names: list[str] | None = None,
+    all_sheets: bool = False,
     dry_run: bool = False,
     skip_existing: bool = False,
     created_by=None,
     stdout=None,
+    batch_size: int = 500,
 ) -> dict:
     """
-    Persiste SchoolEvent a partir do xlsx. Retorna contadores.
+    Persiste SchoolEvent a partir do xlsx (uma ou várias abas). Retorna contadores
+    totais e um relatório por aba em ``sheets``.
     """
     from django.db import transaction
 
+    from apps.academic.calendar_feed import invalidate_calendar_feeds
+    from apps.academic.family import invalidate_family_summary
     from apps.academic.models import SchoolEvent
 
     def log(msg: str):
         if stdout:
             stdout.write(msg)
 
-    created = 0
-    dry_run_lines = 0
-    skipped_dup = 0
-
-    events = list(iter_parsed_events(xlsx_path, year=year))
-
-    def persist():
-        nonlocal created, dry_run_lines, skipped_dup
+    sheets = list(iter_calendar_sheets(xlsx_path, year=year, sheet_names=sheet_names, all_sheets=all_sheets))
+    existing = _existing_keys({sheet_year for _, sheet_year, _ in sheets}) if skip_existing else set()
+
+    report = []
+    to_create = []
+    for sheet_title, sheet_year, events in sheets:
+        sheet_stats = {
+            'sheet': sheet_title,
+            'year': sheet_year,
+            'parsed': len(events),
+            'created': 0,
+            'dry_run_lines': 0,
+            'skipped_duplicate': 0,
+        }
         for ev in events:
-            desc = ev.description + IMPORT_DESCRIPTION_SUFFIX
-
-            if skip_existing and SchoolEvent.objects.filter(
-                title=ev.title,
-                start_time__date=ev.start_date,
-            ).exists():
-                skipped_dup += 1
-                continue
+            key = (ev.title, ev.start_date)
+            if skip_existing:
+                if key in existing:
+                    sheet_stats['skipped_duplicate'] += 1
+                    continue
+                # Evita duplicar também dentro do próprio arquivo (ex.: mesma aba repetida)
+                existing.add(key)
 
             if dry_run:
                 log(
                     f'[dry-run] {ev.start_date} … {ev.end_date} | {ev.event_type}/{ev.target_audience} | {ev.title[:80]}\n'
                 )
-                dry_run_lines += 1
+                sheet_stats['dry_run_lines'] += 1
                 continue
 
-            SchoolEvent.objects.create(
+            to_create.append(SchoolEvent(
                 title=ev.title,
-                description=desc,
+                description=ev.description + IMPORT_DESCRIPTION_SUFFIX,
                 start_time=_to_aware_start(ev.start_date),
                 end_time=_to_aware_end(ev.end_date),
                 event_type=ev.event_type,
@@ -313,18 +390,21 @@ def import_calendar_events(
                 classroom=None,
                 subject=None,
                 created_by=created_by,
-            )
-            created += 1
+            ))
+            sheet_stats['created'] += 1
+        report.append(sheet_stats)
 
-    if dry_run:
-        persist()
-    else:
+    if to_create:
         with transaction.atomic():
-            persist()
+            SchoolEvent.objects.bulk_create(to_create, batch_size=batch_size)
+        # bulk_create não passa pelo save(): invalida os caches dependentes do calendário
+        invalidate_family_summary()
+        invalidate_calendar_feeds()
 
     return {
-        'parsed': len(events),
-        'created': created,
-        'dry_run_lines': dry_run_lines,
-        'skipped_duplicate': skipped_dup,
+        'parsed': sum(item['parsed'] for item in report),
+        'created': sum(item['created'] for item in report),
+        'dry_run_lines': sum(item['dry_run_lines'] for item in report),
+        'skipped_duplicate': sum(item['skipped_duplicate'] for item in report),
+        'sheets': report,
     }
@@ -0,0 +1,226 @@
+"""
+Resumo da família (Portal do Responsável): uma única resposta com turma atual,
+médias por período, resumo de faltas, próximos eventos e relatórios aprovados
+recentes de todos os filhos.
+
+Cada bloco é uma consulta agregada para todos os filhos de uma vez (o custo não
+cresce com o número de filhos). O resultado fica em cache por responsável; a
+chave inclui uma "versão" por aluno e uma versão global (eventos), que são
+incrementadas nas gravações de notas, frequências, matrículas, relatórios e
+eventos. O TTL curto cobre alterações em massa que não passam pelo save().
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+UPCOMING_EVENTS_DAYS = 30
+UPCOMING_EVENTS_LIMIT = 10
+RECENT_REPORTS_PER_CHILD = 3
+
+_GLOBAL_VERSION_KEY = 'family-summary:version:global'
+_STUDENT_VERSION_KEY = 'family-summary:version:student:{}'
+
+
+def _ttl():
+    return getattr(settings, 'FAMILY_SUMMARY_CACHE_TTL', 60)
+
+
+def _bump(key):
+    # Valor novo e único: dispensa incr() atômico e funciona em qualquer backend.
+    cache.set(key, timezone.now().timestamp(), None)
+
+
+def invalidate_family_summary(student_ids=None):
+    """
+    Invalida o resumo das famílias dos alunos informados.
+    Sem argumentos invalida todas (ex.: alteração de evento do calendário).
+    """
+    if student_ids is None:
+        _bump(_GLOBAL_VERSION_KEY)
+        return
+    for student_id in {sid for sid in student_ids if sid}:
+        _bump(_STUDENT_VERSION_KEY.format(student_id))
+
+
+_rows_deferred = ContextVar('family_summary_rows_deferred', default=False)
+
+
+@contextmanager
+def defer_row_invalidation():
+    """
+    Lançamentos em lote: dentro do bloco, o save()/delete() de notas e
+    frequências não invalida linha a linha (nem carrega a matrícula para achar
+    o aluno). Quem abre o bloco invalida os alunos afetados uma vez no final.
+    """
+    token = _rows_deferred.set(True)
+    try:
+        yield
+    finally:
+        _rows_deferred.reset(token)
+
+
+def row_invalidation_deferred():
+    return _rows_deferred.get()
+
+
+def _cache_key(guardian_id, student_ids):
+    version_keys = [_GLOBAL_VERSION_KEY] + [_STUDENT_VERSION_KEY.format(sid) for sid in student_ids]
+    versions = cache.get_many(version_keys)
+    parts = [str(versions.get(key, 0)) for key in version_keys]
+    return f"family-summary:{guardian_id}:{'-'.join(map(str, student_ids))}:{'|'.join(parts)}"
+
+
+def _weighted_average(weighted_sum, weight_sum):
+    if not weight_sum:
+        return None
+    return round(float(weighted_sum) / float(weight_sum), 2)
+
+
+def _grade_averages(enrollment_ids):
+    """{enrollment_id: [período com média geral e por matéria]} em uma consulta."""
+    from .models import Grade
+
+    rows = (
+        Grade.objects.filter(enrollment_id__in=enrollment_ids)
+        .values('enrollment_id', 'period_id', 'period__name', 'period__start_date', 'subject_id', 'subject__name')
+        .annotate(weighted=Sum(F('value') * F('weight')), weights=Sum('weight'))
+        .order_by('enrollment_id', 'period__start_date', 'subject__name')
+    )
+
+    by_enrollment = {}
+    for row in rows:
+        periods = by_enrollment.setdefault(row['enrollment_id'], {})
+        period = periods.setdefault(row['period_id'], {
+            'period_id': row['period_id'],
+            'period_name': row['period__name'] or 'Sem período',
+            'subjects': [],
+            '_weighted': 0,
+            '_weights': 0,
+        })
+        period['subjects'].append({
+            'subject_id': row['subject_id'],
+            'subject': row['subject__name'],
+            'average': _weighted_average(row['weighted'], row['weights']),
+        })
+        period['_weighted'] += row['weighted'] or 0
+        period['_weights'] += row['weights'] or 0
+
+    result = {}
+    for enrollment_id, periods in by_enrollment.items():
+        result[enrollment_id] = []
+        for period in periods.values():
+            period['average'] = _weighted_average(period.pop('_weighted'), period.pop('_weights'))
+            result[enrollment_id].append(period)
+    return result
+
+
+def _absence_summary(student_ids):
+    from .models import Attendance
+
+    rows = (
+        Attendance.objects.filter(enrollment__student_id__in=student_ids, present=False)
+        .values('enrollment__student_id')
+        .annotate(total=Count('id'), justified=Count('id', filter=Q(justified=True)))
+    )
+    return {
+        row['enrollment__student_id']: {
+            'total': row['total'],
+            'justified': row['justified'],
+            'effective': row['total'] - row['justified'],
+        }
+        for row in rows
+    }
+
+
+def _recent_reports(student_ids):
+    from apps.coordination.models import StudentReport
+
+    rows = (
+        StudentReport.objects.filter(student_id__in=student_ids, status='APPROVED', visible_to_family=True)
+        .annotate(position=Window(RowNumber(), partition_by=[F('student_id')], order_by=[F('date').desc(), F('id').desc()]))
+        .filter(position__lte=RECENT_REPORTS_PER_CHILD)
+        .values('id', 'student_id', 'date', 'subject', 'report_type')
+        .order_by('student_id', '-date', '-id')
+    )
+    result = {}
+    for row in rows:
+        result.setdefault(row.pop('student_id'), []).append(row)
+    return result
+
+
+def _upcoming_events(classroom_ids):
+    from .models import SchoolEvent
+
+    now = timezone.now()
+    rows = (
+        SchoolEvent.objects.filter(
+            Q(target_audience='ALL') | Q(target_audience='CLASSROOM', classroom_id__in=classroom_ids),
+            start_time__gte=now,
+            start_time__lte=now + timedelta(days=UPCOMING_EVENTS_DAYS),
+        )
+        .values('id', 'title', 'start_time', 'end_time', 'event_type', 'target_audience', 'classroom_id')
+        .order_by('start_time')[:UPCOMING_EVENTS_LIMIT]
+    )
+    return list(rows)
+
+
+def build_family_summary(guardian, children):
+    """Monta o resumo (sem cache). `children` deve vir com current_enrollment__classroom__segment."""
+    student_ids = [child.id for child in children]
+    current = {child.id: child.current_enrollment for child in children}
+    enrollment_ids = [enr.id for enr in current.values() if enr]
+    classroom_ids = sorted({enr.classroom_id for enr in current.values() if enr and enr.active})
+
+    grades = _grade_averages(enrollment_ids)
+    absences = _absence_summary(student_ids)
+    reports = _recent_reports(student_ids)
+
+    children_data = []
+    for child in children:
+        enrollment = current[child.id]
+        classroom = enrollment.classroom if enrollment else None
+        children_data.append({
+            'id': child.id,
+            'name': child.name,
+            'registration_number': child.registration_number,
+            'classroom': {
+                'id': classroom.id,
+                'name': classroom.name,
+                'year': classroom.year,
+                'segment': classroom.segment.name if classroom.segment else None,
+                'active': enrollment.active,
+            } if classroom else None,
+            'grades': grades.get(enrollment.id, []) if enrollment else [],
+            'absences': absences.get(child.id, {'total': 0, 'justified': 0, 'effective': 0}),
+            'recent_reports': reports.get(child.id, []),
+        })
+
+    return {
+        'guardian_id': guardian.id,
+        'generated_at': timezone.now(),
+        'children': children_data,
+        'upcoming_events': _upcoming_events(classroom_ids),
+    }
+
+
+def get_family_summary(guardian):
+    """Resumo com cache por responsável (ver invalidate_family_summary)."""
+    from .models import Student
+
+    children = list(
+        Student.objects.filter(guardians=guardian)
+        .select_related('current_enrollment__classroom__segment')
+        .order_by('name', 'id')
+    )
+    key = _cache_key(guardian.id, [child.id for child in children])
+    data = cache.get(key)
+    if data is None:
+        data = build_family_summary(guardian, children)
+        cache.set(key, data, _ttl())
+    return data
@@ -0,0 +1,217 @@
+"""
+Diário de notas em matriz (alunos × avaliações) de uma turma/matéria/período.
+
+A leitura é uma única consulta: matrículas da turma com LEFT JOIN nas notas do
+escopo (FilteredRelation). A gravação recebe a matriz inteira e faz upsert em
+lote (INSERT ... ON CONFLICT sobre a constraint única de Grade) numa transação;
+célula com valor nulo remove a nota.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+
+MAX_ASSESSMENTS = 30
+_TWO_PLACES = Decimal('0.01')
+
+
+class GradebookError(Exception):
+    """Matriz inválida; ``errors`` lista os problemas encontrados."""
+
+    def __init__(self, errors):
+        super().__init__('Diário de notas inválido.')
+        self.errors = errors
+
+
+def _to_decimal(value, minimum=Decimal('0'), maximum=None):
+    try:
+        number = Decimal(str(value)).quantize(_TWO_PLACES, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    if number < minimum or (maximum is not None and number > maximum):
+        return None
+    return number
+
+
+def _to_id(value):
+    """Id inteiro vindo do JSON (10 ou "10"); None se ausente ou inválido."""
+    if value in (None, '') or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _weighted_average(cells):
+    weights = sum(weight for _, weight in cells)
+    if not weights:
+        return None
+    return round(float(sum(value * weight for value, weight in cells) / weights), 2)
+
+
+def build_gradebook(classroom_id, subject_id, period_id):
+    """
+    Matriz de notas em uma consulta. Entram as matrículas ativas da turma e as
+    inativas que já tenham nota no escopo.
+    """
+    from .models import Enrollment
+
+    rows = (
+        Enrollment.objects.filter(classroom_id=classroom_id)
+        .annotate(scoped_grade=FilteredRelation(
+            'grade',
+            condition=Q(grade__subject_id=subject_id, grade__period_id=period_id),
+        ))
+        .filter(Q(active=True) | Q(scoped_grade__id__isnull=False))
+        .values(
+            'id', 'active', 'student_id', 'student__name',
+            'scoped_grade__id', 'scoped_grade__name', 'scoped_grade__value',
+            'scoped_grade__weight', 'scoped_grade__date',
+        )
+        .order_by('student__name', 'id', 'scoped_grade__date', 'scoped_grade__id')
+    )
+
+    students = {}
+    assessments = {}
+    for row in rows:
+        student = students.setdefault(row['id'], {
+            'enrollment_id': row['id'],
+            'student_id': row['student_id'],
+            'student_name': row['student__name'],
+            'active': row['active'],
+            'grades': {},
+            '_cells': [],
+        })
+        name = row['scoped_grade__name']
+        if row['scoped_grade__id'] is None:
+            continue
+        value, weight = row['scoped_grade__value'], row['scoped_grade__weight']
+        student['grades'][name] = {'id': row['scoped_grade__id'], 'value': value}
+        student['_cells'].append((value, weight))
+        assessment = assessments.setdefault(name, {
+            'name': name, 'weight': weight, 'date': row['scoped_grade__date'], '_values': [],
+        })
+        assessment['_values'].append(value)
+        if row['scoped_grade__date'] and (assessment['date'] is None or row['scoped_grade__date'] < assessment['date']):
+            assessment['date'] = row['scoped_grade__date']
+
+    for student in students.values():
+        student['average'] = _weighted_average(student.pop('_cells'))
+
+    columns = sorted(assessments.values(), key=lambda a: (a['date'] is None, a['date'], a['name']))
+    for column in columns:
+        values = column.pop('_values')
+        column['class_average'] = round(float(sum(values) / len(values)), 2) if values else None
+
+    averages = [s['average'] for s in students.values() if s['average'] is not None]
+    return {
+        'classroom': int(classroom_id),
+        'subject': int(subject_id),
+        'period': int(period_id),
+        'assessments': columns,
+        'students': list(students.values()),
+        'class_average': round(sum(averages) / len(averages), 2) if averages else None,
+    }
+
+
+def _validate(classroom_id, assessments, grades):
+    from .models import Enrollment, Grade
+
+    errors = []
+    name_max = Grade._meta.get_field('name').max_length
+    weights = {}
+    if not isinstance(assessments, list) or not isinstance(grades, list):
+        return {}, [], [{'field': 'assessments/grades', 'message': 'Envie as listas "assessments" e "grades".'}]
+    if len(assessments) > MAX_ASSESSMENTS:
+        errors.append({'field': 'assessments', 'message': f'Máximo de {MAX_ASSESSMENTS} avaliações.'})
+
+    for position, item in enumerate(assessments):
+        name = str((item or {}).get('name') or '').strip()
+        weight = _to_decimal((item or {}).get('weight', 1), maximum=Decimal('99.99'))
+        if not name or len(name) > name_max:
+            errors.append({'field': 'assessments', 'index': position, 'message': f'Nome obrigatório (até {name_max} caracteres).'})
+        elif name in weights:
+            errors.append({'field': 'assessments', 'index': position, 'message': f'Avaliação repetida: {name}.'})
+        elif weight is None:
+            errors.append({'field': 'assessments', 'index': position, 'message': 'Peso inválido.'})
+        else:
+            weights[name] = weight
+
+    row_ids = [_to_id(item.get('enrollment_id')) if isinstance(item, dict) else None for item in grades]
+    valid_ids = dict(
+        Enrollment.objects.filter(id__in=set(row_ids) - {None}, classroom_id=classroom_id)
+        .values_list('id', 'student_id')
+    )
+
+    cells = []
+    for position, (item, enrollment_id) in enumerate(zip(grades, row_ids)):
+        if enrollment_id not in valid_ids:
+            errors.append({'field': 'grades', 'index': position, 'message': 'Aluno inválido para a turma selecionada.'})
+            continue
+        values = item.get('values') or {}
+        if not isinstance(values, dict):
+            errors.append({'field': 'grades', 'index': position, 'message': 'Envie as notas como {"avaliação": valor}.'})
+            continue
+        for name, raw in values.items():
+            if name not in weights:
+                errors.append({'field': 'grades', 'index': position, 'message': f'Avaliação não declarada: {name}.'})
+                continue
+            value = None if raw in (None, '') else _to_decimal(raw, maximum=Decimal('10'))
+            if raw not in (None, '') and value is None:
+                errors.append({'field': 'grades', 'index': position, 'message': f'Nota inválida em "{name}" (0 a 10).'})
+                continue
+            cells.append((enrollment_id, valid_ids[enrollment_id], name, value))
+    return weights, cells, errors
+
+
+def save_gradebook(classroom_id, subject_id, period_id, assessments, grades):
+    """
+    Upsert da matriz inteira numa transação. Retorna contadores e os alunos
+    afetados; levanta GradebookError sem gravar nada se houver qualquer erro.
+    """
+    from .analytics import invalidate_grade_analytics
+    from .family import invalidate_family_summary
+    from .models import Grade
+
+    weights, cells, errors = _validate(classroom_id, assessments, grades)
+    if errors:
+        raise GradebookError(errors)
+
+    upserts = [
+        Grade(
+            enrollment_id=enrollment_id,
+            subject_id=subject_id,
+            period_id=period_id,
+            name=name,
+            value=value,
+            weight=weights[name],
+        )
+        for enrollment_id, _, name, value in cells
+        if value is not None
+    ]
+    removals = Q()
+    for enrollment_id, _, name, value in cells:
+        if value is None:
+            removals |= Q(enrollment_id=enrollment_id, name=name)
+
+    scope = Grade.objects.filter(enrollment__classroom_id=classroom_id, subject_id=subject_id, period_id=period_id)
+    with transaction.atomic():
+        deleted = scope.filter(removals).delete()[0] if removals else 0
+        if upserts:
+            Grade.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['enrollment', 'subject', 'name', 'period'],
+                update_fields=['value', 'weight'],
+                batch_size=500,
+            )
+        # Peso é da avaliação: alinha as notas da coluna não enviadas nesta matriz.
+        for name, weight in weights.items():
+            scope.filter(name=name).exclude(weight=weight).update(weight=weight)
+
+    student_ids = {student_id for _, student_id, _, _ in cells}
+    # bulk_create/update não passam por Grade.save()
+    invalidate_family_summary(student_ids)
+    invalidate_grade_analytics([period_id])
+    return {'saved': len(upserts), 'deleted': deleted, 'students': len(student_ids)}
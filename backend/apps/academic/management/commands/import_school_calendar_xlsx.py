@@ -4,11 +4,13 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
 
+from apps.academic.calendar_feed import invalidate_calendar_feeds
 from apps.academic.calendar_xlsx_import import (
     IMPORT_MARKER,
     import_calendar_events,
-    iter_parsed_events,
+    iter_calendar_sheets,
 )
+from apps.academic.family import invalidate_family_summary
 from apps.academic.models import SchoolEvent
 
 User = get_user_model()
@@ -31,8 +33,20 @@ class Command(BaseCommand):
         parser.add_argument(
             '--year',
             type=int,
-            default=2026,
-            help='Ano letivo das datas interpretadas.',
+            default=None,
+            help='Ano letivo das datas interpretadas (por omissão: ano no título de cada aba).',
+        )
+        parser.add_argument(
+            '--sheet',
+            action='append',
+            dest='sheets',
+            default=None,
+            help='Nome da aba a importar (pode repetir). Por omissão: a primeira aba.',
+        )
+        parser.add_argument(
+            '--all-sheets',
+            action='store_true',
+            help='Importa todas as abas do ficheiro (ex.: uma aba por ano).',
         )
         parser.add_argument(
             '--dry-run',
@@ -66,8 +80,17 @@ class Command(BaseCommand):
         if not path.is_file():
             raise CommandError(f'Ficheiro não encontrado: {path}')
 
+        sheet_options = {
+            'year': options['year'],
+            'sheet_names': options['sheets'],
+            'all_sheets': options['all_sheets'],
+        }
+
         if options['replace_imported'] and not options['dry_run']:
             deleted, _ = SchoolEvent.objects.filter(description__contains=IMPORT_MARKER).delete()
+            # delete() em queryset não passa pelo SchoolEvent.delete(): invalida os caches aqui
+            invalidate_family_summary()
+            invalidate_calendar_feeds()
             self.stdout.write(self.style.WARNING(f'Removidos {deleted} evento(s) de importação anterior.'))
 
         created_by = None
@@ -76,19 +99,32 @@ class Command(BaseCommand):
             if not created_by:
                 raise CommandError(f'Utilizador não encontrado: {options["user"]}')
 
-        if options['count_only']:
-            n = sum(1 for _ in iter_parsed_events(path, year=options['year']))
-            self.stdout.write(self.style.SUCCESS(f'Eventos interpretados: {n}'))
-            return
+        try:
+            if options['count_only']:
+                total = 0
+                for sheet_title, sheet_year, events in iter_calendar_sheets(path, **sheet_options):
+                    total += len(events)
+                    self.stdout.write(f'Aba "{sheet_title}" ({sheet_year}): {len(events)} evento(s)')
+                self.stdout.write(self.style.SUCCESS(f'Eventos interpretados: {total}'))
+                return
 
-        stats = import_calendar_events(
-            path,
-            year=options['year'],
-            dry_run=options['dry_run'],
-            skip_existing=options['skip_existing'],
-            created_by=created_by,
-            stdout=self.stdout,
-        )
+            stats = import_calendar_events(
+                path,
+                **sheet_options,
+                dry_run=options['dry_run'],
+                skip_existing=options['skip_existing'],
+                created_by=created_by,
+                stdout=self.stdout,
+            )
+        except KeyError as e:
+            raise CommandError(str(e.args[0]))
+
+        for sheet in stats['sheets']:
+            self.stdout.write(
+                f'Aba "{sheet["sheet"]}" ({sheet["year"]}): interpretados={sheet["parsed"]}, '
+                f'criados={sheet["created"]}, ignorados_duplicado={sheet["skipped_duplicate"]}'
+                + (f', linhas_dry_run={sheet["dry_run_lines"]}' if options['dry_run'] else '')
+            )
 
         self.stdout.write(
             self.style.SUCCESS(
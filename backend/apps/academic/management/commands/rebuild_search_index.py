@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from apps.academic.models import LessonPlan, TaughtContent
+from apps.academic.search import rebuild_search_vectors
+from apps.coordination.models import StudentReport
+
+
+MODELS = {
+    "lesson_plan": LessonPlan,
+    "taught_content": TaughtContent,
+    "student_report": StudentReport,
+}
+
+
+class Command(BaseCommand):
+    help = "Recalcula o índice de busca textual (search_vector) de planejamentos, conteúdos e relatórios."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type",
+            dest="types",
+            action="append",
+            choices=sorted(MODELS.keys()),
+            help="Tipo a reindexar (pode repetir). Padrão: todos.",
+        )
+        parser.add_argument(
+            "--only-missing",
+            action="store_true",
+            help="Reindexa apenas registros ainda sem search_vector.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Tamanho do lote de leitura. Padrão: 500.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta os registros que seriam reindexados.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = bool(options.get("dry_run"))
+        types = options.get("types") or list(MODELS.keys())
+        total = 0
+
+        for key in types:
+            qs = MODELS[key].objects.all()
+            if options.get("only_missing"):
+                qs = qs.filter(search_vector__isnull=True)
+
+            if dry_run:
+                count = qs.count()
+            else:
+                count = rebuild_search_vectors(qs.order_by("pk"), batch_size=options["batch_size"])
+            total += count
+            self.stdout.write(f"{key}: {count} registro(s)")
+
+        mode_label = "SIMULAÇÃO" if dry_run else "EXECUÇÃO"
+        self.stdout.write(self.style.SUCCESS(f"{mode_label} concluída. Total reindexado: {total}."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from apps.academic.models import Student
+
+
+class Command(BaseCommand):
+    help = "Recalcula Student.current_enrollment (backfill/reparo do ponteiro de matrícula atual)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas lista os alunos com ponteiro divergente, sem gravar.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = bool(options.get("dry_run"))
+
+        rows = Student.objects.annotate(
+            expected_enrollment=Student.current_enrollment_subquery()
+        ).values_list("id", "name", "current_enrollment_id", "expected_enrollment")
+        divergent = [row for row in rows if row[2] != row[3]]
+
+        for student_id, name, current, expected in divergent:
+            self.stdout.write(
+                self.style.WARNING(f"Divergente: {name} (#{student_id}) atual={current or '-'} esperado={expected or '-'}")
+            )
+
+        if not dry_run and divergent:
+            Student.sync_current_enrollments(Student.objects.filter(id__in=[row[0] for row in divergent]))
+
+        mode_label = "SIMULAÇÃO" if dry_run else "EXECUÇÃO"
+        self.stdout.write(
+            self.style.SUCCESS(f"{mode_label} concluída. Alunos com ponteiro divergente: {len(divergent)}.")
+        )
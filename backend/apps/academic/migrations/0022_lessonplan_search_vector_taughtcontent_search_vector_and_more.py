@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0021_lessonplansubmissionblock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonplan',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='taughtcontent',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lessonplan',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='lessonplan_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='taughtcontent',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='taughtcontent_search_gin'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Autocomplete de alunos/responsáveis: unaccent + pg_trgm e documentos normalizados
+
+import apps.academic.autocomplete
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations, models
+
+from apps.academic.autocomplete import normalize_digits, normalize_registration
+
+
+# unaccent() é STABLE (depende do dicionário configurado) e não pode ir em índice.
+# O wrapper fixa o dicionário e pode ser declarado IMMUTABLE.
+CREATE_IMMUTABLE_UNACCENT = """
+CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+"""
+DROP_IMMUTABLE_UNACCENT = "DROP FUNCTION IF EXISTS immutable_unaccent(text);"
+
+
+def fill_normalized_documents(apps, schema_editor):
+    Student = apps.get_model('academic', 'Student')
+    Guardian = apps.get_model('academic', 'Guardian')
+
+    students = list(Student.objects.only('id', 'cpf', 'registration_number'))
+    for student in students:
+        student.cpf_digits = normalize_digits(student.cpf)
+        student.registration_key = normalize_registration(student.registration_number)
+    Student.objects.bulk_update(students, ['cpf_digits', 'registration_key'], batch_size=1000)
+
+    guardians = list(Guardian.objects.only('id', 'cpf'))
+    for guardian in guardians:
+        guardian.cpf_digits = normalize_digits(guardian.cpf)
+    Guardian.objects.bulk_update(guardians, ['cpf_digits'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0022_lessonplan_search_vector_taughtcontent_search_vector_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        TrigramExtension(),
+        migrations.RunSQL(CREATE_IMMUTABLE_UNACCENT, DROP_IMMUTABLE_UNACCENT),
+        migrations.AddField(
+            model_name='guardian',
+            name='cpf_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=14),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='cpf_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=14),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='registration_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_normalized_documents, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='guardian',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(apps.academic.autocomplete.ImmutableUnaccent(django.db.models.functions.text.Lower('name')), name='gin_trgm_ops'), name='guardian_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='guardian',
+            index=models.Index(fields=['cpf_digits'], name='guardian_cpf_digits_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(apps.academic.autocomplete.ImmutableUnaccent(django.db.models.functions.text.Lower('name')), name='gin_trgm_ops'), name='student_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['cpf_digits'], name='student_cpf_digits_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['registration_key'], name='student_registration_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
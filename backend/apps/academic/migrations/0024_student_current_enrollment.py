@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_current_enrollment(apps, schema_editor):
+    Student = apps.get_model('academic', 'Student')
+    Enrollment = apps.get_model('academic', 'Enrollment')
+    Student.objects.update(current_enrollment=Subquery(
+        Enrollment.objects.filter(student=OuterRef('pk')).order_by('-active', '-id').values('id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0023_student_guardian_autocomplete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='current_enrollment',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='academic.enrollment', verbose_name='Matrícula Atual'),
+        ),
+        migrations.RunPython(fill_current_enrollment, migrations.RunPython.noop),
+    ]
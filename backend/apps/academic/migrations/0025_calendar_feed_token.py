@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:30
+
+import apps.academic.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0024_student_current_enrollment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=apps.academic.models.generate_feed_token, editable=False, max_length=64, unique=True, verbose_name='Token')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('revoked_at', models.DateTimeField(blank=True, null=True, verbose_name='Revogado em')),
+                ('last_used_at', models.DateTimeField(blank=True, null=True, verbose_name='Último acesso')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feed_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Token de Calendário (ICS)',
+                'verbose_name_plural': 'Tokens de Calendário (ICS)',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+# Mantém a nota mais recente (maior id) de cada avaliação repetida antes de
+# criar a constraint; reenvios antigos do lançamento geravam duplicatas.
+DEDUP_GRADES_SQL = """
+DELETE FROM academic_grade AS older
+USING academic_grade AS newer
+WHERE older.enrollment_id = newer.enrollment_id
+  AND older.subject_id = newer.subject_id
+  AND older.name = newer.name
+  AND older.period_id IS NOT DISTINCT FROM newer.period_id
+  AND older.id < newer.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0025_calendar_feed_token'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DEDUP_GRADES_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='grade',
+            constraint=models.UniqueConstraint(fields=('enrollment', 'subject', 'name', 'period'), name='grade_unique_assessment', nulls_distinct=False),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:29
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY não trava escrita na tabela em produção;
+    # exige migração fora de transação.
+    atomic = False
+
+    dependencies = [
+        ('academic', '0026_grade_unique_assessment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('present', False)), fields=['enrollment'], name='attendance_absent_enr_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='enrollment',
+            index=models.Index(condition=models.Q(('active', True)), fields=['classroom'], name='enrollment_active_cls_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='lessonplan',
+            index=models.Index(fields=['assignment', 'start_date', 'status'], name='lessonplan_asg_week_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='lessonplan',
+            index=models.Index(condition=models.Q(('status', 'SUBMITTED')), fields=['-start_date'], name='lessonplan_submitted_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='schoolevent',
+            index=models.Index(fields=['start_time', 'target_audience', 'event_type'], name='schoolevent_start_aud_idx'),
+        ),
+    ]
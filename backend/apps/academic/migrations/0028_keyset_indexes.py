@@ -0,0 +1,24 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY não trava escrita na tabela em produção;
+    # exige migração fora de transação.
+    atomic = False
+
+    dependencies = [
+        ('academic', '0027_hot_path_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='grade',
+            index=models.Index(fields=['date', 'id'], name='grade_date_id_idx'),
+        ),
+    ]
@@ -1,7 +1,15 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import FileExtensionValidator
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .analytics import invalidate_grade_analytics
+from .autocomplete import name_key, normalize_digits, normalize_registration
+from .family import invalidate_family_summary, row_invalidation_deferred
 
 class Segment(models.Model):
     """Ex: Educação Infantil, Fundamental I, Médio"""
@@ -48,13 +56,24 @@ class Guardian(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Normalizado no save() para busca exata/prefixo (ver apps/academic/autocomplete.py)
+    cpf_digits = models.CharField(max_length=14, blank=True, default='', editable=False)
+
     class Meta:
         verbose_name = "Responsável"
         verbose_name_plural = "Responsáveis"
+        indexes = [
+            GinIndex(OpClass(name_key(), name='gin_trgm_ops'), name='guardian_name_trgm'),
+            models.Index(fields=['cpf_digits'], name='guardian_cpf_digits_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.cpf_digits = normalize_digits(self.cpf)
+        super().save(*args, **kwargs)
+
 class ExtraActivity(models.Model):
     """Atividades extracurriculares. Podem ser incluídas no período integral ou pagas separadamente."""
     ACTIVITY_TYPE_CHOICES = [
@@ -139,14 +158,70 @@ class Student(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Normalizados no save() para busca exata/prefixo (ver apps/academic/autocomplete.py)
+    cpf_digits = models.CharField(max_length=14, blank=True, default='', editable=False)
+    registration_key = models.CharField(max_length=20, blank=True, default='', editable=False)
+
+    # Matrícula vigente (ativa mais recente; sem ativa, a mais recente). Mantida por Enrollment.save()/delete().
+    current_enrollment = models.ForeignKey(
+        'Enrollment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name="Matrícula Atual",
+    )
+
     class Meta:
         verbose_name = "Aluno"
         verbose_name_plural = "Alunos"
         ordering = ['name']
+        indexes = [
+            GinIndex(OpClass(name_key(), name='gin_trgm_ops'), name='student_name_trgm'),
+            models.Index(fields=['cpf_digits'], name='student_cpf_digits_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['registration_key'], name='student_registration_key_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.registration_number})"
 
+    def save(self, *args, **kwargs):
+        from apps.core.thumbnails import generate_thumbnails, image_changed
+        self.cpf_digits = normalize_digits(self.cpf)
+        self.registration_key = normalize_registration(self.registration_number)
+        photo_changed = image_changed(self.photo)
+        super().save(*args, **kwargs)
+        if photo_changed:
+            generate_thumbnails(self.photo, crop=True)
+        invalidate_family_summary([self.pk])
+
+    @staticmethod
+    def current_enrollment_subquery():
+        return Subquery(
+            Enrollment.objects.filter(student=OuterRef('pk')).order_by('-active', '-id').values('id')[:1]
+        )
+
+    @classmethod
+    def sync_current_enrollments(cls, queryset=None):
+        """Recalcula current_enrollment em uma única UPDATE. Retorna o total de alunos atualizados."""
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(current_enrollment=cls.current_enrollment_subquery())
+
+    def refresh_current_enrollment(self):
+        """Recalcula o ponteiro deste aluno (chamado ao criar/alterar/remover matrículas)."""
+        with transaction.atomic():
+            # Trava a linha do aluno para serializar alterações concorrentes de matrícula.
+            list(type(self).objects.select_for_update().filter(pk=self.pk).values_list('pk', flat=True))
+            enrollment_id = (
+                Enrollment.objects.filter(student_id=self.pk)
+                .order_by('-active', '-id')
+                .values_list('id', flat=True)
+                .first()
+            )
+            type(self).objects.filter(pk=self.pk).update(current_enrollment_id=enrollment_id)
+            self.current_enrollment_id = enrollment_id
+
 
 class ExtraActivityEnrollment(models.Model):
     """Matrícula do aluno em uma atividade extracurricular."""
@@ -204,10 +279,28 @@ class Enrollment(models.Model):
     class Meta:
         unique_together = ('student', 'classroom') # Aluno não pode estar 2x na mesma turma
         verbose_name = "Matrícula"
+        indexes = [
+            # Alunos ativos da turma (chamada, dashboards, boletins).
+            models.Index(fields=['classroom'], condition=models.Q(active=True), name='enrollment_active_cls_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.name} -> {self.classroom.name}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.student.refresh_current_enrollment()
+        invalidate_family_summary([self.student_id])
+
+    def delete(self, *args, **kwargs):
+        student = self.student
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            student.refresh_current_enrollment()
+        invalidate_family_summary([student.id])
+        return result
+
 class TeacherAssignment(models.Model):
     teacher = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -367,12 +460,36 @@ class Grade(models.Model):
     class Meta:
         verbose_name = "Nota"
         verbose_name_plural = "Notas"
-        # Garante que não lance a mesma prova duas vezes pro mesmo aluno (opcional, mas bom)
-        # unique_together = ('enrollment', 'subject', 'name') 
+        # Garante que não lance a mesma prova duas vezes pro mesmo aluno no período
+        # (alvo do upsert do diário de notas; sem período também conta como valor)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['enrollment', 'subject', 'name', 'period'],
+                name='grade_unique_assessment',
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            # Ordenação estável da listagem (paginação por cursor em date, id).
+            models.Index(fields=['date', 'id'], name='grade_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.enrollment.student.name} - {self.name}: {self.value}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if not row_invalidation_deferred():
+            invalidate_family_summary([self.enrollment.student_id])
+        invalidate_grade_analytics([self.period_id])
+
+    def delete(self, *args, **kwargs):
+        student_id = None if row_invalidation_deferred() else self.enrollment.student_id
+        result = super().delete(*args, **kwargs)
+        invalidate_family_summary([student_id])
+        invalidate_grade_analytics([self.period_id])
+        return result
+
 class Attendance(models.Model):
     """Lançamento de Frequência (Diário de Classe)"""
     enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, verbose_name="Matrícula")
@@ -387,11 +504,30 @@ class Attendance(models.Model):
         verbose_name_plural = "Frequências"
         # Um aluno só pode ter um registro de presença por matéria no dia
         unique_together = ('enrollment', 'subject', 'date')
+        indexes = [
+            # Faltas por matrícula (alunos em risco, resumo da família): só as faltas entram no índice.
+            models.Index(fields=['enrollment'], condition=models.Q(present=False), name='attendance_absent_enr_idx'),
+            # Ordenação estável da listagem (paginação por cursor em date, id).
+            models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+        ]
 
     def __str__(self):
         status = "Presente" if self.present else "Faltou"
         return f"{self.date} - {self.enrollment.student.name}: {status}"
 
+    # Faltas entram no resumo da família (family._absence_summary). Em lote
+    # (family.defer_row_invalidation) quem grava invalida uma vez no final.
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if not row_invalidation_deferred():
+            invalidate_family_summary([self.enrollment.student_id])
+
+    def delete(self, *args, **kwargs):
+        student_id = None if row_invalidation_deferred() else self.enrollment.student_id
+        result = super().delete(*args, **kwargs)
+        invalidate_family_summary([student_id])
+        return result
+
 class AbsenceJustification(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Em Análise'),
@@ -463,14 +599,29 @@ class LessonPlan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Índice de busca textual (mantido no save, ver apps/academic/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = "Planejamento Semanal"
         verbose_name_plural = "Planejamentos Semanais"
         ordering = ['-start_date']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='lessonplan_search_gin'),
+            # Planejamento da atribuição na semana (atraso, bloqueio de chamada).
+            models.Index(fields=['assignment', 'start_date', 'status'], name='lessonplan_asg_week_idx'),
+            # Fila de revisão da coordenação.
+            models.Index(fields=['-start_date'], condition=models.Q(status='SUBMITTED'), name='lessonplan_submitted_idx'),
+        ]
 
     def __str__(self):
         return f"Semana {self.start_date} - {self.assignment}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .search import refresh_search_vector
+        refresh_search_vector(self)
+
 class LessonPlanFile(models.Model):
     plan = models.ForeignKey(LessonPlan, related_name='attachments', on_delete=models.CASCADE)
     file = models.FileField(upload_to='lesson_plans/%Y/%m/')
@@ -529,16 +680,27 @@ class TaughtContent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Índice de busca textual (mantido no save, ver apps/academic/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = "Conteúdo Ministrado"
         verbose_name_plural = "Conteúdos Ministrados"
         ordering = ['-date']
         # Garante que não haja dois registros para a mesma aula/dia (opcional, mas recomendado)
         unique_together = ('assignment', 'date') 
+        indexes = [
+            GinIndex(fields=['search_vector'], name='taughtcontent_search_gin'),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.assignment}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .search import refresh_search_vector
+        refresh_search_vector(self)
+
 class SchoolEvent(models.Model):
     EVENT_TYPES = [
         ('HOLIDAY', 'Feriado / Recesso'),
@@ -585,10 +747,58 @@ class SchoolEvent(models.Model):
         verbose_name = "Evento / Calendário"
         verbose_name_plural = "Calendário Escolar"
         ordering = ['start_time']
+        indexes = [
+            # Eventos por intervalo + público/tipo (calendário, dias não letivos, resumo da família).
+            models.Index(fields=['start_time', 'target_audience', 'event_type'], name='schoolevent_start_aud_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_event_type_display()}: {self.title} ({self.start_time.strftime('%d/%m')})"
 
+    def save(self, *args, **kwargs):
+        from .calendar_feed import invalidate_calendar_feeds
+        super().save(*args, **kwargs)
+        invalidate_family_summary()
+        invalidate_calendar_feeds()
+
+    def delete(self, *args, **kwargs):
+        from .calendar_feed import invalidate_calendar_feeds
+        result = super().delete(*args, **kwargs)
+        invalidate_family_summary()
+        invalidate_calendar_feeds()
+        return result
+
+
+def generate_feed_token():
+    import secrets
+    return secrets.token_urlsafe(32)
+
+
+class CalendarFeedToken(models.Model):
+    """
+    Token de assinatura do calendário (ICS) por usuário.
+    Vai na URL do feed (apps de calendário não enviam JWT); revogar invalida o link.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed_tokens',
+        verbose_name="Usuário",
+    )
+    token = models.CharField("Token", max_length=64, unique=True, default=generate_feed_token, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField("Revogado em", null=True, blank=True)
+    last_used_at = models.DateTimeField("Último acesso", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Token de Calendário (ICS)"
+        verbose_name_plural = "Tokens de Calendário (ICS)"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        status = "revogado" if self.revoked_at else "ativo"
+        return f"{self.user} ({status})"
+
 class ClassSchedule(models.Model):
     # Padrão FullCalendar: 0=Dom, 1=Seg, ..., 6=Sab
     DAYS_OF_WEEK = [
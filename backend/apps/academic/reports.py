@@ -12,6 +12,8 @@ except OSError:
     HTML = None
     CSS = None
 
+from apps.core.metrics import write_pdf
+
 from .models import Enrollment, Grade, Attendance, Subject, AcademicPeriod, TeacherAssignment, TaughtContent, ClassRoom
 from datetime import datetime
 
@@ -151,7 +153,7 @@ def generate_student_report_card(request, enrollment_id):
 
     html_string = render_to_string('reports/report_card.html', context)
     html = HTML(string=html_string, base_url=request.build_absolute_uri())
-    pdf_file = html.write_pdf()
+    pdf_file = write_pdf(html, 'report_card')
 
     response = HttpResponse(pdf_file, content_type='application/pdf')
     filename = f"Boletim_{student.name}.pdf"
@@ -227,7 +229,7 @@ def generate_diary_report(request):
 
     html_string = render_to_string('reports/diary_report.html', context)
     html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-    pdf_file = html.write_pdf()
+    pdf_file = write_pdf(html, 'diary_report')
 
     response = HttpResponse(pdf_file, content_type='application/pdf')
     filename = f"Diario_Classe_{classroom.name}_{period.name.replace(' ', '_')}.pdf"
@@ -301,7 +303,7 @@ def generate_attendance_report(request):
 
     html_string = render_to_string('reports/attendance_report.html', context)
     html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-    pdf_file = html.write_pdf()
+    pdf_file = write_pdf(html, 'attendance_report')
 
     response = HttpResponse(pdf_file, content_type='application/pdf')
     filename = f"Frequencias_{classroom.name}_{period.name.replace(' ', '_')}.pdf"
@@ -0,0 +1,265 @@
+"""
+Busca textual (PostgreSQL full-text) sobre Planejamentos, Conteúdos Ministrados
+e Relatórios de Alunos.
+
+Cada modelo indexado guarda um ``search_vector`` (dicionário ``portuguese``)
+recalculado no ``save()``. O HTML do editor é limpo com
+``reports._plain_text_from_editor`` antes de indexar, para que tags e entidades
+não poluam o índice. As consultas usam o índice GIN e retornam resultados
+ordenados por relevância, com trecho destacado. O trecho volta como HTML
+seguro: todo o texto é escapado e só as marcações ``<mark>`` são tags.
+"""
+from html import escape, unescape
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F, Func, Value
+
+SEARCH_CONFIG = 'portuguese'
+SEARCH_TYPES = ('lesson_plan', 'taught_content', 'student_report')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MIN_QUERY_LENGTH = 2
+
+_POWER_GROUPS = ['Coordenadores', 'Coordenação', 'Coordenacao', 'Direção', 'Direcao', 'Diretoria', 'Secretaria']
+
+# Delimitadores do ts_headline: caracteres de controle que não aparecem no
+# texto do editor, trocados por <mark> depois de escapar o trecho.
+_MARK_START = '\x02'
+_MARK_STOP = '\x03'
+
+_HEADLINE_OPTIONS = {
+    'start_sel': _MARK_START,
+    'stop_sel': _MARK_STOP,
+    'max_words': 30,
+    'min_words': 10,
+    'max_fragments': 2,
+}
+
+
+def _plain(value):
+    # Import tardio: reports importa os modelos, e os modelos chamam este módulo no save().
+    from .reports import _plain_text_from_editor
+    return _plain_text_from_editor(value)
+
+
+def _person_name(user):
+    if not user:
+        return ''
+    return user.get_full_name() or user.username
+
+
+def _document_parts(instance):
+    """Lista de (texto, peso) que compõe o documento indexado de cada modelo."""
+    from apps.coordination.models import StudentReport
+    from .models import LessonPlan, TaughtContent
+
+    if isinstance(instance, LessonPlan):
+        assignment = instance.assignment
+        return [
+            (instance.topic, 'A'),
+            (_plain(instance.description), 'B'),
+            (f'{assignment.subject.name} {_person_name(assignment.teacher)}', 'C'),
+        ]
+    if isinstance(instance, TaughtContent):
+        return [
+            (_plain(instance.content), 'A'),
+            (_plain(instance.homework), 'B'),
+            (instance.assignment.subject.name, 'C'),
+        ]
+    if isinstance(instance, StudentReport):
+        return [
+            (instance.subject, 'A'),
+            (_plain(instance.content), 'B'),
+            (instance.student.name, 'C'),
+        ]
+    raise TypeError(f'Modelo sem indexação textual: {type(instance).__name__}')
+
+
+def build_search_vector(instance):
+    vector = None
+    for text, weight in _document_parts(instance):
+        part = SearchVector(Value(text or ''), config=SEARCH_CONFIG, weight=weight)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def refresh_search_vector(instance):
+    """Recalcula o search_vector de uma instância já salva (uma única UPDATE)."""
+    if instance.pk is None:
+        return
+    type(instance).objects.filter(pk=instance.pk).update(search_vector=build_search_vector(instance))
+
+
+def rebuild_search_vectors(queryset, batch_size=500):
+    """Reindexa um queryset inteiro (backfill / reparo). Retorna o total processado."""
+    total = 0
+    for instance in queryset.iterator(chunk_size=batch_size):
+        refresh_search_vector(instance)
+        total += 1
+    return total
+
+
+def _strip_tags_sql(expression):
+    return Func(expression, Value('<[^>]*>'), Value(' '), Value('g'), function='regexp_replace')
+
+
+def _headline(expression, query):
+    return SearchHeadline(_strip_tags_sql(expression), query, config=SEARCH_CONFIG, **_HEADLINE_OPTIONS)
+
+
+def _clean_snippet(value):
+    """
+    HTML do trecho: entidades do editor viram texto (``&lt;script&gt;`` é
+    texto, não tag), tudo é escapado e só os delimitadores viram ``<mark>``.
+    """
+    text = escape(' '.join(unescape(value or '').split()))
+    return text.replace(_MARK_START, '<mark>').replace(_MARK_STOP, '</mark>')
+
+
+def _user_roles(user):
+    group_names = set(user.groups.values_list('name', flat=True))
+    is_power = user.is_superuser or bool(group_names & set(_POWER_GROUPS))
+    is_coordination = user.is_superuser or 'Coordenacao' in group_names
+    return group_names, is_power, is_coordination
+
+
+def _guardian_classroom_ids(guardian):
+    from .models import Enrollment
+    return Enrollment.objects.filter(student__guardians=guardian, active=True).values_list('classroom_id', flat=True)
+
+
+def _lesson_plan_queryset(user, is_power):
+    from .models import LessonPlan
+
+    qs = LessonPlan.objects.all()
+    # Mesmas regras de LessonPlanViewSet.get_queryset
+    if user.is_superuser:
+        return qs
+    if is_power:
+        return qs.filter(recipients=user)
+    return qs.filter(assignment__teacher=user)
+
+
+def _taught_content_queryset(user, group_names, is_power):
+    from .models import TaughtContent
+
+    qs = TaughtContent.objects.all()
+    if is_power:
+        return qs
+    if 'Professores' in group_names:
+        return qs.filter(assignment__teacher=user)
+    guardian = getattr(user, 'guardian_profile', None)
+    if guardian is not None:
+        return qs.filter(assignment__classroom_id__in=_guardian_classroom_ids(guardian))
+    return qs.filter(assignment__teacher=user)
+
+
+def _student_report_queryset(user, is_coordination):
+    from apps.coordination.models import StudentReport
+
+    qs = StudentReport.objects.all()
+    # Mesmas regras de StudentReportViewSet.get_queryset
+    guardian = getattr(user, 'guardian_profile', None)
+    if guardian is not None:
+        return qs.filter(student__guardians=guardian, status='APPROVED', visible_to_family=True)
+    if is_coordination:
+        return qs
+    return qs.filter(teacher=user)
+
+
+def _search_lesson_plans(qs, query, limit):
+    rows = (
+        qs.filter(search_vector=query)
+        .annotate(rank=SearchRank(F('search_vector'), query), snippet=_headline(F('description'), query))
+        .select_related('assignment__subject', 'assignment__classroom', 'assignment__teacher')
+        .order_by('-rank', '-start_date')[:limit]
+    )
+    return [
+        {
+            'type': 'lesson_plan',
+            'id': plan.id,
+            'title': plan.topic,
+            'snippet': _clean_snippet(plan.snippet),
+            'date': plan.start_date,
+            'rank': plan.rank,
+            'subject_name': plan.assignment.subject.name,
+            'classroom_name': plan.assignment.classroom.name,
+            'teacher_name': _person_name(plan.assignment.teacher),
+            'status': plan.status,
+        }
+        for plan in rows
+    ]
+
+
+def _search_taught_contents(qs, query, limit):
+    rows = (
+        qs.filter(search_vector=query)
+        .annotate(rank=SearchRank(F('search_vector'), query), snippet=_headline(F('content'), query))
+        .select_related('assignment__subject', 'assignment__classroom', 'assignment__teacher')
+        .order_by('-rank', '-date')[:limit]
+    )
+    return [
+        {
+            'type': 'taught_content',
+            'id': item.id,
+            'title': f'{item.assignment.subject.name} - {item.date:%d/%m/%Y}',
+            'snippet': _clean_snippet(item.snippet),
+            'date': item.date,
+            'rank': item.rank,
+            'subject_name': item.assignment.subject.name,
+            'classroom_name': item.assignment.classroom.name,
+            'teacher_name': _person_name(item.assignment.teacher),
+        }
+        for item in rows
+    ]
+
+
+def _search_student_reports(qs, query, limit):
+    rows = (
+        qs.filter(search_vector=query)
+        .annotate(rank=SearchRank(F('search_vector'), query), snippet=_headline(F('content'), query))
+        .select_related('student', 'teacher')
+        .order_by('-rank', '-date')[:limit]
+    )
+    return [
+        {
+            'type': 'student_report',
+            'id': report.id,
+            'title': report.subject,
+            'snippet': _clean_snippet(report.snippet),
+            'date': report.date,
+            'rank': report.rank,
+            'student_id': report.student_id,
+            'student_name': report.student.name,
+            'teacher_name': _person_name(report.teacher),
+            'report_type': report.report_type,
+            'status': report.status,
+        }
+        for report in rows
+    ]
+
+
+def search_documents(user, text, types=None, limit=DEFAULT_LIMIT):
+    """
+    Busca unificada respeitando a visibilidade do usuário em cada tipo.
+    Retorna lista ordenada por relevância (maior primeiro).
+    """
+    text = (text or '').strip()
+    if len(text) < MIN_QUERY_LENGTH:
+        return []
+    types = [t for t in (types or SEARCH_TYPES) if t in SEARCH_TYPES]
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    group_names, is_power, is_coordination = _user_roles(user)
+
+    results = []
+    if 'lesson_plan' in types:
+        results += _search_lesson_plans(_lesson_plan_queryset(user, is_power), query, limit)
+    if 'taught_content' in types:
+        results += _search_taught_contents(_taught_content_queryset(user, group_names, is_power), query, limit)
+    if 'student_report' in types:
+        results += _search_student_reports(_student_report_queryset(user, is_coordination), query, limit)
+
+    results.sort(key=lambda item: (item['rank'], item['date']), reverse=True)
+    return results[:limit]
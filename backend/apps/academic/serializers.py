@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from apps.core.thumbnails import thumbnail_urls
 from .models import (
     Segment, ClassRoom, Subject, Guardian, Student, Enrollment,
     TeacherAssignment, Grade, Attendance, AcademicPeriod, LessonPlan, AbsenceJustification, ExtraActivity,
@@ -100,11 +101,16 @@ class ExtraActivityAttendanceSerializer(serializers.ModelSerializer):
 class StudentSerializer(serializers.ModelSerializer):
     guardians_details = GuardianSerializer(source='guardians', many=True, read_only=True)
     guardians = serializers.PrimaryKeyRelatedField(many=True, queryset=Guardian.objects.all(), required=False)
+    # URLs das miniaturas (sm/md/lg) para listas e avatares; 'photo' continua sendo o original
+    photo_thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = Student
         fields = '__all__'
 
+    def get_photo_thumbnails(self, obj):
+        return thumbnail_urls(obj.photo, request=self.context.get('request'))
+
 class EnrollmentSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.name', read_only=True)
     classroom_name = serializers.CharField(source='classroom.name', read_only=True)
@@ -178,6 +184,31 @@ class GradeSerializer(serializers.ModelSerializer):
         model = Grade
         fields = '__all__'
 
+    def validate(self, data):
+        """
+        Mesma regra do grade_unique_assessment: uma avaliação por matrícula,
+        matéria, nome e período. O validador automático do DRF ignora
+        period=None, mas no banco "sem período" também conta como valor.
+        """
+        def current(field):
+            if field in data:
+                return data[field]
+            return getattr(self.instance, field) if self.instance else None
+
+        duplicates = Grade.objects.filter(
+            enrollment=current('enrollment'),
+            subject=current('subject'),
+            name=current('name'),
+            period=current('period'),
+        )
+        if self.instance:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                "Já existe uma nota com este nome para o aluno nesta matéria e período."
+            )
+        return data
+
 class AbsenceJustificationSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='attendance.enrollment.student.name', read_only=True)
     classroom_name = serializers.CharField(source='attendance.enrollment.classroom.name', read_only=True)
@@ -321,14 +352,18 @@ class ParentStudentSerializer(serializers.ModelSerializer):
             'zip_code', 'street', 'number', 'complement', 'neighborhood', 'city', 'state'
         ]
 
+    @staticmethod
+    def with_current_enrollment(queryset):
+        """
+        Traz a matrícula atual com turma e segmento no mesmo JOIN, para que a
+        lista de filhos não faça consultas por aluno.
+        """
+        return queryset.select_related('current_enrollment__classroom__segment')
+
     def _latest_enrollment(self, obj):
-        enrolls = getattr(obj, 'enrollment_set', getattr(obj, 'enrollments', None))
-        if not enrolls:
-            return None
-        active = enrolls.filter(active=True).order_by('-id').first()
-        if active:
-            return active
-        return enrolls.order_by('-id').first()
+        # Ponteiro desnormalizado (ativa mais recente, ou a última existente);
+        # os três campos de turma leem o mesmo objeto já carregado.
+        return obj.current_enrollment
 
     def get_classroom_id(self, obj):
         enrollment = self._latest_enrollment(obj)
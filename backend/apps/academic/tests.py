@@ -1,8 +1,11 @@
-from datetime import date, time
+from datetime import date, time, timedelta
+from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from io import StringIO
+import os
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
 from django.core.management import call_command
 from django.test import SimpleTestCase
@@ -15,6 +18,7 @@ from apps.academic.models import (
     ClassRoom,
     ClassSchedule,
     Enrollment,
+    Grade,
     Guardian,
     Segment,
     Student,
@@ -25,6 +29,13 @@ from apps.academic.models import (
     LessonPlanSubmissionBlock,
     AbsenceJustification,
     SchoolEvent,
+    ContraturnoClassroom,
+    ContraturnoAttendance,
+    StudentChecklistConfig,
+    StudentDailyChecklist,
+    ExtraActivity,
+    ExtraActivityEnrollment,
+    ExtraActivityAttendance,
 )
 from apps.coordination.models import StudentReport
 
@@ -153,6 +164,435 @@ class ParentPortalSecurityTests(APITestCase):
         self.assertEqual(len(data), 0)
 
 
+class MyChildrenQueryCountTests(APITestCase):
+    def setUp(self):
+        segment = Segment.objects.create(name='Fundamental I')
+        self.classrooms = [
+            ClassRoom.objects.create(name=f'{n}A', year=2026, segment=segment) for n in range(1, 4)
+        ]
+        self.old_classroom = ClassRoom.objects.create(name='Antiga', year=2025, segment=segment)
+
+    def _family(self, username, children):
+        user = User.objects.create_user(username=username, password='123')
+        guardian = Guardian.objects.create(user=user, name=f'Resp {username}', cpf=f'{username}-cpf', phone='1')
+        for index in range(children):
+            student = Student.objects.create(name=f'{username} filho {index}', registration_number=f'{username}{index}')
+            student.guardians.add(guardian)
+            # Ativa + inativa criada depois: a ativa deve prevalecer mesmo com id menor.
+            Enrollment.objects.create(student=student, classroom=self.classrooms[index % 3], active=True)
+            Enrollment.objects.create(student=student, classroom=self.old_classroom, active=False)
+        return user
+
+    def _count_queries(self, user):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/students/my-children/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_query_count_does_not_grow_with_children(self):
+        small_family = self._family('um', 1)
+        large_family = self._family('cinco', 5)
+
+        small_count, _ = self._count_queries(small_family)
+        large_count, data = self._count_queries(large_family)
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(data), 5)
+        by_name = {item['name']: item for item in data}
+        self.assertEqual(by_name['cinco filho 1']['classroom_name'], '2A')
+        self.assertEqual(by_name['cinco filho 1']['segment_name'], 'Fundamental I')
+
+
+class CurrentEnrollmentPointerTests(APITestCase):
+    def setUp(self):
+        segment = Segment.objects.create(name='Fundamental I')
+        self.classroom_2025 = ClassRoom.objects.create(name='4A', year=2025, segment=segment)
+        self.classroom_2026 = ClassRoom.objects.create(name='5A', year=2026, segment=segment)
+        self.student = Student.objects.create(name='Aluno Ponteiro', registration_number='P001')
+
+    def _pointer(self):
+        self.student.refresh_from_db()
+        return self.student.current_enrollment_id
+
+    def test_pointer_follows_enrollment_lifecycle(self):
+        self.assertIsNone(self._pointer())
+
+        old = Enrollment.objects.create(student=self.student, classroom=self.classroom_2025, active=True)
+        self.assertEqual(self._pointer(), old.id)
+
+        new = Enrollment.objects.create(student=self.student, classroom=self.classroom_2026, active=True)
+        self.assertEqual(self._pointer(), new.id)
+
+        new.active = False
+        new.save()
+        self.assertEqual(self._pointer(), old.id)
+
+        old.active = False
+        old.save()
+        # Sem matrícula ativa: cai para a mais recente.
+        self.assertEqual(self._pointer(), new.id)
+
+        new.delete()
+        self.assertEqual(self._pointer(), old.id)
+
+    def test_sync_command_repairs_bulk_changes(self):
+        enrollment = Enrollment.objects.create(student=self.student, classroom=self.classroom_2025, active=True)
+        Student.objects.filter(pk=self.student.pk).update(current_enrollment=None)
+
+        out = StringIO()
+        call_command('sync_current_enrollments', '--dry-run', stdout=out)
+        self.assertIn('divergente: 1', out.getvalue())
+        self.assertIsNone(self._pointer())
+
+        call_command('sync_current_enrollments', stdout=StringIO())
+        self.assertEqual(self._pointer(), enrollment.id)
+
+
+class PhotoThumbnailTests(APITestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.staff = User.objects.create_user(username='staff_thumb', password='123', is_staff=True)
+        segment = Segment.objects.create(name='Fundamental I')
+        self.classroom = ClassRoom.objects.create(name='3A', year=2026, segment=segment)
+
+    def _upload(self, name='foto.jpg', size=(1200, 900)):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 120, 40)).save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_thumbnails_are_generated_on_save_next_to_original(self):
+        from PIL import Image
+        from apps.core.thumbnails import THUMBNAIL_SIZES, thumbnail_name
+
+        student = Student.objects.create(name='Aluno Foto', registration_number='F001', photo=self._upload())
+        storage = student.photo.storage
+        for size, max_side in THUMBNAIL_SIZES.items():
+            name = thumbnail_name(student.photo.name, size)
+            self.assertEqual(os.path.dirname(name), os.path.dirname(student.photo.name))
+            with storage.open(name, 'rb') as fh:
+                self.assertEqual(Image.open(fh).size, (max_side, max_side))
+
+    def test_old_files_fall_back_to_original_until_backfilled(self):
+        from django.core.cache import cache
+        from apps.core.thumbnails import THUMBNAIL_SIZES, thumbnail_name
+
+        student = Student.objects.create(name='Aluno Antigo', registration_number='F002', photo=self._upload())
+        Enrollment.objects.create(student=student, classroom=self.classroom, active=True)
+        storage = student.photo.storage
+        for size in THUMBNAIL_SIZES:
+            storage.delete(thumbnail_name(student.photo.name, size))
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(f'/api/classrooms/{self.classroom.id}/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        thumbs = response.data['students'][0]['photo_thumbnails']
+        self.assertEqual(set(thumbs), {'sm', 'md', 'lg'})
+        self.assertTrue(all(url.endswith(student.photo.url) for url in thumbs.values()))
+        # A leitura não gera miniatura.
+        self.assertFalse(storage.exists(thumbnail_name(student.photo.name, 'md')))
+
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('fotos: 1 geradas', out.getvalue())
+        md_name = thumbnail_name(student.photo.name, 'md')
+        self.assertTrue(storage.exists(md_name))
+
+        with patch('django.core.files.storage.FileSystemStorage.exists', side_effect=AssertionError('exists na leitura')):
+            response = self.client.get(f'/api/students/{student.id}/')
+        self.assertTrue(response.data['photo_thumbnails']['md'].endswith(storage.url(md_name)))
+
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('fotos: 0 geradas, 1 ignoradas', out.getvalue())
+
+    def test_broken_original_failure_is_remembered(self):
+        from django.core.cache import cache
+        from django.core.files.base import ContentFile
+        from apps.core.thumbnails import generate_thumbnails, thumbnail_urls
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        student = Student.objects.create(name='Aluno Quebrado', registration_number='F004')
+        student.photo.save('quebrada.jpg', ContentFile(b'nao e imagem'), save=False)
+        Student.objects.filter(pk=student.pk).update(photo=student.photo.name)
+
+        with self.assertLogs('apps.core.thumbnails', level='WARNING'):
+            self.assertEqual(generate_thumbnails(student.photo, crop=True), [])
+        self.assertEqual(set(thumbnail_urls(student.photo).values()), {student.photo.url})
+
+        out = StringIO()
+        with patch('apps.core.management.commands.generate_thumbnails.generate_thumbnails') as generate:
+            call_command('generate_thumbnails', stdout=out)
+        generate.assert_not_called()
+        self.assertIn('fotos: 0 geradas, 1 ignoradas', out.getvalue())
+
+    def test_student_without_photo_has_no_thumbnails(self):
+        student = Student.objects.create(name='Sem Foto', registration_number='F003')
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(f'/api/students/{student.id}/')
+        self.assertIsNone(response.data['photo_thumbnails'])
+
+
+class FamilySummaryTests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.utils import timezone
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.teacher = User.objects.create_user(username='prof_familia', password='123')
+        self.guardian_user = User.objects.create_user(username='resp_familia', password='123')
+        self.guardian = Guardian.objects.create(user=self.guardian_user, name='Resp Família', cpf='555', phone='1')
+
+        segment = Segment.objects.create(name='Fundamental I')
+        self.classroom_a = ClassRoom.objects.create(name='2A', year=2026, segment=segment)
+        self.classroom_b = ClassRoom.objects.create(name='4B', year=2026, segment=segment)
+        other_classroom = ClassRoom.objects.create(name='9Z', year=2026, segment=segment)
+        self.math = Subject.objects.create(name='Matemática')
+        self.period = AcademicPeriod.objects.create(
+            name='1º Bimestre', start_date=date(2026, 2, 1), end_date=date(2026, 4, 30),
+        )
+
+        self.child_a = Student.objects.create(name='Filho A', registration_number='FA01')
+        self.child_b = Student.objects.create(name='Filho B', registration_number='FB01')
+        for child in (self.child_a, self.child_b):
+            child.guardians.add(self.guardian)
+        self.enrollment_a = Enrollment.objects.create(student=self.child_a, classroom=self.classroom_a)
+        self.enrollment_b = Enrollment.objects.create(student=self.child_b, classroom=self.classroom_b)
+
+        Grade.objects.create(enrollment=self.enrollment_a, subject=self.math, name='P1', value=8, weight=2, period=self.period)
+        Grade.objects.create(enrollment=self.enrollment_a, subject=self.math, name='T1', value=5, weight=1, period=self.period)
+        Attendance.objects.create(enrollment=self.enrollment_a, subject=self.math, date=date(2026, 3, 2), present=False)
+        Attendance.objects.create(
+            enrollment=self.enrollment_a, subject=self.math, date=date(2026, 3, 3), present=False, justified=True,
+        )
+
+        for index in range(4):
+            StudentReport.objects.create(
+                student=self.child_a, teacher=self.teacher, date=date(2026, 3, 1 + index),
+                subject=f'Relatório {index}', content='ok', status='APPROVED', visible_to_family=True,
+            )
+        StudentReport.objects.create(
+            student=self.child_b, teacher=self.teacher, date=date(2026, 3, 5),
+            subject='Pendente', content='x', status='PENDING', visible_to_family=True,
+        )
+
+        soon = timezone.now() + timedelta(days=2)
+        SchoolEvent.objects.create(title='Reunião geral', start_time=soon, target_audience='ALL')
+        SchoolEvent.objects.create(title='Prova 2A', start_time=soon, target_audience='CLASSROOM', classroom=self.classroom_a)
+        SchoolEvent.objects.create(title='Prova 9Z', start_time=soon, target_audience='CLASSROOM', classroom=other_classroom)
+
+    def _get(self):
+        self.client.force_authenticate(user=self.guardian_user)
+        return self.client.get('/api/students/family-summary/')
+
+    def test_summary_contents(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        children = {child['name']: child for child in response.data['children']}
+
+        child_a = children['Filho A']
+        self.assertEqual(child_a['classroom']['name'], '2A')
+        self.assertEqual(child_a['grades'][0]['average'], 7.0)  # (8*2 + 5*1) / 3
+        self.assertEqual(child_a['absences'], {'total': 2, 'justified': 1, 'effective': 1})
+        self.assertEqual([r['subject'] for r in child_a['recent_reports']], ['Relatório 3', 'Relatório 2', 'Relatório 1'])
+        self.assertEqual(children['Filho B']['recent_reports'], [])
+
+        titles = {event['title'] for event in response.data['upcoming_events']}
+        self.assertEqual(titles, {'Reunião geral', 'Prova 2A'})
+
+    def test_query_count_is_constant_and_cached(self):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as two_children:
+            self._get()
+
+        extra = Student.objects.create(name='Filho C', registration_number='FC01')
+        extra.guardians.add(self.guardian)
+        Enrollment.objects.create(student=extra, classroom=self.classroom_b)
+        cache.clear()
+        with CaptureQueriesContext(connection) as three_children:
+            self._get()
+        self.assertEqual(len(two_children), len(three_children))
+
+        with CaptureQueriesContext(connection) as cached:
+            self._get()
+        self.assertLess(len(cached), len(three_children))
+
+    def test_writes_invalidate_cached_summary(self):
+        from django.utils import timezone
+
+        self._get()
+        Grade.objects.create(enrollment=self.enrollment_a, subject=self.math, name='P2', value=10, weight=1, period=self.period)
+        child_a = next(c for c in self._get().data['children'] if c['name'] == 'Filho A')
+        self.assertEqual(child_a['grades'][0]['average'], 7.75)
+
+        SchoolEvent.objects.create(title='Festa', start_time=timezone.now() + timedelta(days=1), target_audience='ALL')
+        titles = {event['title'] for event in self._get().data['upcoming_events']}
+        self.assertIn('Festa', titles)
+
+    def test_attendance_writes_invalidate_absence_summary(self):
+        def absences():
+            child_a = next(c for c in self._get().data['children'] if c['name'] == 'Filho A')
+            return child_a['absences']
+
+        self.assertEqual(absences(), {'total': 2, 'justified': 1, 'effective': 1})
+
+        coordinator = User.objects.create_user(username='coord_familia', password='123')
+        coordinator.groups.add(Group.objects.get_or_create(name='Coordenacao')[0])
+        self.client.force_authenticate(user=coordinator)
+        response = self.client.post('/api/attendance/bulk_save/', {
+            'classroom': self.classroom_a.id, 'subject': self.math.id, 'date': '2026-03-04',
+            'records': [{'enrollment_id': self.enrollment_a.id, 'present': False}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(absences(), {'total': 3, 'justified': 1, 'effective': 2})
+
+        attendance = Attendance.objects.get(enrollment=self.enrollment_a, date=date(2026, 3, 4))
+        justification = AbsenceJustification.objects.create(attendance=attendance, reason='Atestado')
+        self.client.force_authenticate(user=coordinator)
+        response = self.client.patch(f'/api/justifications/{justification.id}/', {'status': 'APPROVED'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(absences(), {'total': 3, 'justified': 2, 'effective': 1})
+
+        attendance.delete()
+        self.assertEqual(absences(), {'total': 2, 'justified': 1, 'effective': 1})
+
+    def test_attendance_bulk_save_does_not_load_enrollment_per_row(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        coordinator = User.objects.create_user(username='coord_lote', password='123')
+        coordinator.groups.add(Group.objects.get_or_create(name='Coordenacao')[0])
+        self.client.force_authenticate(user=coordinator)
+        classmates = [
+            Enrollment.objects.create(
+                student=Student.objects.create(name=f'Colega {index}', registration_number=f'FC{index}'),
+                classroom=self.classroom_a,
+            )
+            for index in range(3)
+        ]
+
+        def enrollment_selects(enrollments, day):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post('/api/attendance/bulk_save/', {
+                    'classroom': self.classroom_a.id, 'subject': self.math.id, 'date': day,
+                    'records': [{'enrollment_id': e.id, 'present': False} for e in enrollments],
+                }, format='json')
+            self.assertEqual(response.status_code, 200)
+            return sum('FROM "academic_enrollment"' in query['sql'] for query in ctx.captured_queries)
+
+        self.assertEqual(
+            enrollment_selects([self.enrollment_a], '2026-03-05'),
+            enrollment_selects([self.enrollment_a] + classmates, '2026-03-06'),
+        )
+        self.assertEqual(
+            next(c for c in self._get().data['children'] if c['name'] == 'Filho A')['absences']['total'], 4
+        )
+
+    def test_non_guardian_is_rejected(self):
+        self.client.force_authenticate(user=self.teacher)
+        self.assertEqual(self.client.get('/api/students/family-summary/').status_code, 403)
+
+
+class CalendarFeedTests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.utils import timezone
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        guardians_group, _ = Group.objects.get_or_create(name='Responsáveis')
+        self.guardian_user = User.objects.create_user(username='resp_ics', password='123')
+        self.guardian_user.groups.add(guardians_group)
+        guardian = Guardian.objects.create(user=self.guardian_user, name='Resp ICS', cpf='777', phone='1')
+
+        segment = Segment.objects.create(name='Fundamental I')
+        own_classroom = ClassRoom.objects.create(name='1A', year=2026, segment=segment)
+        other_classroom = ClassRoom.objects.create(name='1B', year=2026, segment=segment)
+        student = Student.objects.create(name='Aluno ICS', registration_number='ICS1')
+        student.guardians.add(guardian)
+        Enrollment.objects.create(student=student, classroom=own_classroom)
+
+        start = timezone.now() + timedelta(days=3)
+        self.public_event = SchoolEvent.objects.create(
+            title='Festa junina; quadrilha', start_time=start, end_time=start + timedelta(hours=2), target_audience='ALL',
+        )
+        SchoolEvent.objects.create(title='Prova 1A', start_time=start, target_audience='CLASSROOM', classroom=own_classroom)
+        SchoolEvent.objects.create(title='Prova 1B', start_time=start, target_audience='CLASSROOM', classroom=other_classroom)
+        SchoolEvent.objects.create(title='Conselho', start_time=start, target_audience='TEACHERS')
+
+    def _token_url(self):
+        self.client.force_authenticate(user=self.guardian_user)
+        response = self.client.get('/api/calendar/feed-token/')
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(user=None)
+        return response.data['url']
+
+    def test_feed_uses_audience_rules_and_ics_format(self):
+        response = self.client.get(self._token_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('SUMMARY:Festa junina\\; quadrilha', body)
+        self.assertIn('Prova 1A', body)
+        self.assertNotIn('Prova 1B', body)
+        self.assertNotIn('Conselho', body)
+
+    def test_conditional_get_and_invalidation_on_event_change(self):
+        url = self._token_url()
+        etag = self.client.get(url)['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.public_event.title = 'Festa julina'
+        self.public_event.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Festa julina', response.content.decode())
+
+    def test_rotated_or_revoked_token_stops_working(self):
+        old_url = self._token_url()
+
+        self.client.force_authenticate(user=self.guardian_user)
+        new_url = self.client.post('/api/calendar/feed-token/').data['url']
+        self.assertNotEqual(new_url, old_url)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+        self.client.force_authenticate(user=self.guardian_user)
+        self.assertEqual(self.client.delete('/api/calendar/feed-token/').status_code, 204)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(new_url).status_code, 404)
+
+
 class ClassScheduleAccessTests(APITestCase):
     """Grade horária: leitura por professor/responsável; escrita só coordenação/secretaria etc."""
 
@@ -261,6 +701,591 @@ class ClassScheduleAccessTests(APITestCase):
         self.assertEqual(len(results), 0)
 
 
+class GradebookMatrixTests(APITestCase):
+    def setUp(self):
+        prof_group, _ = Group.objects.get_or_create(name='Professores')
+        self.teacher = User.objects.create_user(username='gb_teacher', password='pass12345')
+        self.teacher.groups.add(prof_group)
+        self.outsider = User.objects.create_user(username='gb_outsider', password='pass12345')
+        self.outsider.groups.add(prof_group)
+
+        segment = Segment.objects.create(name='Fundamental GB')
+        self.classroom = ClassRoom.objects.create(name='7A', year=2026, segment=segment)
+        self.subject = Subject.objects.create(name='História GB')
+        TeacherAssignment.objects.create(teacher=self.teacher, subject=self.subject, classroom=self.classroom)
+        self.period = AcademicPeriod.objects.create(
+            name='1º Bim GB', start_date=date(2026, 2, 1), end_date=date(2026, 4, 30)
+        )
+        self.enrollments = []
+        for index in range(3):
+            student = Student.objects.create(name=f'Aluno GB {index}', registration_number=f'GB{index}')
+            self.enrollments.append(Enrollment.objects.create(student=student, classroom=self.classroom))
+        self.url = '/api/grades/gradebook/'
+
+    def _payload(self, values):
+        return {
+            'classroom': self.classroom.id,
+            'subject': self.subject.id,
+            'period': self.period.id,
+            'assessments': [{'name': 'Prova 1', 'weight': 2}, {'name': 'Trabalho', 'weight': 1}],
+            'grades': [
+                {'enrollment_id': enrollment.id, 'values': cell}
+                for enrollment, cell in zip(self.enrollments, values)
+            ],
+        }
+
+    def test_duplicate_grade_without_period_is_rejected_with_400(self):
+        admin = User.objects.create_superuser(username='gb_admin', password='pass12345')
+        self.client.force_authenticate(user=admin)
+        payload = {'enrollment': self.enrollments[0].id, 'subject': self.subject.id, 'name': 'Prova extra', 'value': '7.00'}
+        self.assertEqual(self.client.post('/api/grades/', payload, format='json').status_code, 201)
+        resp = self.client.post('/api/grades/', payload, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Grade.objects.filter(name='Prova extra').count(), 1)
+
+        other = self.client.post('/api/grades/', {**payload, 'name': 'Prova extra 2'}, format='json')
+        self.assertEqual(other.status_code, 201)
+        resp = self.client.patch(f"/api/grades/{other.data['id']}/", {'name': 'Prova extra'}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.client.patch(f"/api/grades/{other.data['id']}/", {'value': '8.00'}, format='json').status_code, 200)
+
+    def test_put_upserts_matrix_and_get_returns_weighted_averages(self):
+        self.client.force_authenticate(user=self.teacher)
+        payload = self._payload([
+            {'Prova 1': 8, 'Trabalho': 5},
+            {'Prova 1': 6},
+            {'Trabalho': '10'},
+        ])
+        resp = self.client.put(self.url, payload, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(Grade.objects.count(), 4)
+
+        # Reenvio (retry) com uma nota alterada e uma removida: sem duplicatas
+        payload['grades'][0]['values'] = {'Prova 1': 9, 'Trabalho': None}
+        resp = self.client.put(self.url, payload, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(Grade.objects.count(), 3)
+
+        resp = self.client.get(self.url, {
+            'classroom': self.classroom.id, 'subject': self.subject.id, 'period': self.period.id,
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([a['name'] for a in resp.data['assessments']], ['Prova 1', 'Trabalho'])
+        by_student = {row['enrollment_id']: row for row in resp.data['students']}
+        self.assertEqual(by_student[self.enrollments[0].id]['average'], 9.0)
+        self.assertEqual(by_student[self.enrollments[2].id]['average'], 10.0)
+        self.assertEqual(len(resp.data['students']), 3)
+
+    def test_get_matrix_is_a_single_query(self):
+        from apps.academic.gradebook import build_gradebook
+
+        for enrollment in self.enrollments:
+            Grade.objects.create(
+                enrollment=enrollment, subject=self.subject, period=self.period, name='Prova 1', value=7, weight=1
+            )
+        with self.assertNumQueries(1):
+            data = build_gradebook(self.classroom.id, self.subject.id, self.period.id)
+        self.assertEqual(data['class_average'], 7.0)
+
+    def test_invalid_matrix_returns_errors_and_writes_nothing(self):
+        self.client.force_authenticate(user=self.teacher)
+        payload = self._payload([{'Prova 1': 11}, {'Desconhecida': 5}, {'Prova 1': 7}])
+        resp = self.client.put(self.url, payload, format='json')
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(len(resp.data['errors']), 2)
+        self.assertEqual(Grade.objects.count(), 0)
+
+    def test_enrollment_ids_are_coerced_and_bad_ones_are_row_errors(self):
+        self.client.force_authenticate(user=self.teacher)
+        payload = self._payload([{'Prova 1': 8}, {'Prova 1': 6}, {'Prova 1': 7}])
+        payload['grades'][0]['enrollment_id'] = str(self.enrollments[0].id)
+        payload['grades'][1]['enrollment_id'] = 'abc'
+        payload['grades'][2]['enrollment_id'] = [self.enrollments[2].id]
+        resp = self.client.put(self.url, payload, format='json')
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual([(e['field'], e['index']) for e in resp.data['errors']], [('grades', 1), ('grades', 2)])
+        self.assertEqual(Grade.objects.count(), 0)
+
+        payload['grades'] = payload['grades'][:1]
+        resp = self.client.put(self.url, payload, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(Grade.objects.filter(enrollment=self.enrollments[0], name='Prova 1').exists())
+
+    def test_teacher_without_assignment_is_forbidden(self):
+        self.client.force_authenticate(user=self.outsider)
+        resp = self.client.put(self.url, self._payload([{'Prova 1': 5}]), format='json')
+        self.assertEqual(resp.status_code, 403)
+
+    def test_unique_constraint_blocks_duplicate_assessment(self):
+        from django.db import IntegrityError, transaction
+
+        Grade.objects.create(enrollment=self.enrollments[0], subject=self.subject, name='Prova 1', value=5)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Grade.objects.create(enrollment=self.enrollments[0], subject=self.subject, name='Prova 1', value=6)
+
+
+class GradeAnalyticsTests(APITestCase):
+    def setUp(self):
+        coord_group, _ = Group.objects.get_or_create(name='Coordenadores')
+        prof_group, _ = Group.objects.get_or_create(name='Professores')
+        self.coord = User.objects.create_user(username='ga_coord', password='pass12345')
+        self.coord.groups.add(coord_group)
+        self.teacher = User.objects.create_user(username='ga_teacher', password='pass12345')
+        self.teacher.groups.add(prof_group)
+
+        segment = Segment.objects.create(name='Fundamental GA')
+        self.class_a = ClassRoom.objects.create(name='8A', year=2026, segment=segment)
+        self.class_b = ClassRoom.objects.create(name='8B', year=2026, segment=segment)
+        self.math = Subject.objects.create(name='Matemática GA')
+        TeacherAssignment.objects.create(teacher=self.teacher, subject=self.math, classroom=self.class_a)
+        self.period = AcademicPeriod.objects.create(
+            name='2º Bim GA', start_date=date(2026, 5, 1), end_date=date(2026, 7, 15)
+        )
+        # Médias ponderadas por aluno: 8A -> 4.0, 7.0, 10.0 ; 8B -> 6.0
+        grades = {
+            (self.class_a, 'A1'): [(4, 1)],
+            (self.class_a, 'A2'): [(4, 1), (8.5, 2)],  # (4 + 17) / 3 = 7.0
+            (self.class_a, 'A3'): [(10, 1)],
+            (self.class_b, 'B1'): [(6, 1)],
+        }
+        for (classroom, code), cells in grades.items():
+            student = Student.objects.create(name=f'Aluno {code}', registration_number=f'GA{code}')
+            enrollment = Enrollment.objects.create(student=student, classroom=classroom)
+            for position, (value, weight) in enumerate(cells):
+                Grade.objects.create(
+                    enrollment=enrollment, subject=self.math, period=self.period,
+                    name=f'Av {position}', value=value, weight=weight,
+                )
+        self.url = '/api/grades/analytics/'
+
+    def test_school_wide_statistics_in_one_query(self):
+        from django.core.cache import cache
+        from apps.academic.analytics import compute_grade_analytics
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            data = compute_grade_analytics(self.period.id)
+
+        school = data['school']
+        self.assertEqual(school['students'], 4)
+        self.assertEqual(school['passing'], 3)
+        self.assertEqual(school['recovery'], 1)
+        self.assertEqual(school['median'], 6.5)
+        self.assertEqual(school['average'], 6.75)
+        self.assertEqual(sum(bucket['count'] for bucket in school['histogram']), 4)
+        self.assertEqual(school['histogram'][9]['count'], 1)  # 10.0 entra na última faixa
+
+        by_classroom = {row['classroom_id']: row for row in data['classrooms']}
+        self.assertEqual(by_classroom[self.class_a.id]['median'], 7.0)
+        self.assertEqual(by_classroom[self.class_b.id]['students'], 1)
+        self.assertEqual(len(data['subjects']), 1)
+
+    def test_cached_per_period_and_invalidated_on_grade_save(self):
+        self.client.force_authenticate(user=self.coord)
+        first = self.client.get(self.url, {'period': self.period.id})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['school']['students'], 4)
+
+        with self.assertNumQueries(2):  # período + grupos; estatísticas vêm do cache
+            self.client.get(self.url, {'period': self.period.id})
+
+        enrollment = Enrollment.objects.get(student__registration_number='GAB1')
+        Grade.objects.filter(enrollment=enrollment).first().delete()
+        after = self.client.get(self.url, {'period': self.period.id})
+        self.assertEqual(after.data['school']['students'], 3)
+
+    def test_teacher_limited_to_own_assignment(self):
+        self.client.force_authenticate(user=self.teacher)
+        resp = self.client.get(self.url, {'period': self.period.id})
+        self.assertEqual(resp.status_code, 403)
+
+        resp = self.client.get(self.url, {'period': self.period.id, 'classroom': self.class_b.id, 'subject': self.math.id})
+        self.assertEqual(resp.status_code, 403)
+
+        resp = self.client.get(self.url, {'period': self.period.id, 'classroom': self.class_a.id, 'subject': self.math.id})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['school']['students'], 3)
+
+
+class ContraturnoAttendanceBulkTests(APITestCase):
+    def setUp(self):
+        prof_group, _ = Group.objects.get_or_create(name='Professores')
+        self.teacher = User.objects.create_user(username='ct_teacher', password='pass12345')
+        self.teacher.groups.add(prof_group)
+
+        segment = Segment.objects.create(name='Fundamental CT')
+        self.classroom = ClassRoom.objects.create(name='3A', year=2026, segment=segment)
+        other_classroom = ClassRoom.objects.create(name='3B', year=2026, segment=segment)
+        self.contraturno = ContraturnoClassroom.objects.create(
+            classroom=self.classroom, contraturno_period='AFTERNOON', teacher=self.teacher
+        )
+        self.enrollments = []
+        for index in range(12):
+            student = Student.objects.create(
+                name=f'Integral {index}', registration_number=f'CT{index}', is_full_time=True
+            )
+            self.enrollments.append(Enrollment.objects.create(student=student, classroom=self.classroom))
+        outsider = Student.objects.create(name='Outra turma', registration_number='CTX', is_full_time=True)
+        self.outsider_enrollment = Enrollment.objects.create(student=outsider, classroom=other_classroom)
+
+    def _post(self, records, day='2026-03-02'):
+        return self.client.post('/api/contraturno-attendances/bulk_save/', {
+            'contraturno_classroom': self.contraturno.id,
+            'date': day,
+            'records': records,
+        }, format='json')
+
+    def test_bulk_save_uses_constant_queries_and_upserts(self):
+        self.client.force_authenticate(user=self.teacher)
+        records = [{'enrollment_id': e.id, 'present': True} for e in self.enrollments]
+        records.append({'enrollment_id': self.outsider_enrollment.id, 'present': True})
+
+        # contraturno + matrículas válidas + existentes + upsert (+ savepoints)
+        with self.assertNumQueries(6):
+            resp = self._post(records)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['created'], 12)
+        self.assertEqual(ContraturnoAttendance.objects.count(), 12)
+
+        records[0]['present'] = False
+        resp = self._post(records)
+        self.assertEqual((resp.data['created'], resp.data['updated']), (0, 12))
+        self.assertFalse(ContraturnoAttendance.objects.get(enrollment=self.enrollments[0]).present)
+        self.assertFalse(ContraturnoAttendance.objects.filter(enrollment=self.outsider_enrollment).exists())
+
+    def test_bulk_save_accepts_string_ids_and_rejects_bad_ones(self):
+        self.client.force_authenticate(user=self.teacher)
+        resp = self._post([{'enrollment_id': str(self.enrollments[0].id), 'present': False}])
+        self.assertEqual((resp.status_code, resp.data['created']), (200, 1))
+        self.assertFalse(ContraturnoAttendance.objects.get(enrollment=self.enrollments[0]).present)
+
+        resp = self._post([{'enrollment_id': self.enrollments[1].id}, {'enrollment_id': '3,5'}])
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(ContraturnoAttendance.objects.filter(enrollment=self.enrollments[1]).exists())
+
+    def test_stats_groups_by_month_in_one_query(self):
+        enrollment = self.enrollments[0]
+        for day, present in [(date(2026, 3, 2), True), (date(2026, 3, 3), False), (date(2026, 4, 1), True)]:
+            ContraturnoAttendance.objects.create(enrollment=enrollment, date=day, present=present)
+        self.client.force_authenticate(user=self.teacher)
+
+        with self.assertNumQueries(1):
+            resp = self.client.get(f'/api/contraturno-attendances/stats/?enrollment={enrollment.id}')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['periods'], [
+            {'period_name': 'Março/2026', 'presences': 1, 'absences': 1, 'total': 2},
+            {'period_name': 'Abril/2026', 'presences': 1, 'absences': 0, 'total': 1},
+        ])
+        self.assertEqual(resp.data['total'], {'presences': 2, 'absences': 1, 'total': 3})
+
+
+class StudentDailyChecklistBulkTests(APITestCase):
+    def setUp(self):
+        prof_group, _ = Group.objects.get_or_create(name='Professores')
+        self.teacher = User.objects.create_user(
+            username='ck_teacher', password='pass12345', first_name='Ana', last_name='Lima'
+        )
+        self.teacher.groups.add(prof_group)
+
+        segment = Segment.objects.create(name='Educação Infantil CK')
+        StudentChecklistConfig.objects.create(
+            segment=segment, requires_checklist=True, requires_lunch=True, requires_checkin=True
+        )
+        self.classroom = ClassRoom.objects.create(name='Infantil 2', year=2026, segment=segment)
+        TeacherAssignment.objects.create(
+            teacher=self.teacher, subject=Subject.objects.create(name='Rotina CK'), classroom=self.classroom
+        )
+        self.enrollments = []
+        for index in range(10):
+            student = Student.objects.create(name=f'Criança {index:02d}', registration_number=f'CK{index}')
+            self.enrollments.append(Enrollment.objects.create(student=student, classroom=self.classroom))
+        self.client.force_authenticate(user=self.teacher)
+
+    def _save(self, records):
+        return self.client.post('/api/student-checklists/bulk_save/', {
+            'classroom': self.classroom.id,
+            'date': '2026-03-02',
+            'records': records,
+        }, format='json')
+
+    def test_bulk_save_uses_constant_queries_and_upserts(self):
+        records = [
+            {'enrollment_id': e.id, 'had_lunch': True, 'had_snack': True, 'checkin_time': '07:30:00'}
+            for e in self.enrollments[:8]
+        ]
+        # turma + config + atribuição + grupos + matrículas + existentes + upsert (+ savepoints)
+        with self.assertNumQueries(9):
+            resp = self._save(records)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['created'], 8)
+
+        records[0]['had_lunch'] = False
+        resp = self._save(records)
+        self.assertEqual((resp.data['created'], resp.data['updated']), (0, 8))
+        checklist = StudentDailyChecklist.objects.get(enrollment=self.enrollments[0])
+        self.assertFalse(checklist.had_lunch)
+        self.assertEqual(checklist.checkin_time, time(7, 30))
+        self.assertFalse(checklist.had_snack)  # lanche não é exigido no segmento: fica o padrão
+
+    def test_bulk_save_accepts_string_ids_and_rejects_bad_ones(self):
+        resp = self._save([{'enrollment_id': str(self.enrollments[0].id), 'had_lunch': True}])
+        self.assertEqual((resp.status_code, resp.data['created']), (200, 1))
+        self.assertTrue(StudentDailyChecklist.objects.get(enrollment=self.enrollments[0]).had_lunch)
+
+        resp = self._save([{'enrollment_id': self.enrollments[1].id}, {'enrollment_id': {'id': 1}}])
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(StudentDailyChecklist.objects.filter(enrollment=self.enrollments[1]).exists())
+
+    def test_roster_includes_students_without_checklist(self):
+        self._save([{'enrollment_id': self.enrollments[0].id, 'had_lunch': True}])
+
+        url = f'/api/student-checklists/by_classroom_date/?classroom={self.classroom.id}&date=2026-03-02'
+        with self.assertNumQueries(2):
+            resp = self.client.get(url + '&roster=1')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data), 10)
+        self.assertEqual(resp.data[0]['registered_by_name'], 'Ana Lima')
+        self.assertIsNone(resp.data[1]['id'])
+        self.assertEqual(resp.data[1]['student_name'], 'Criança 01')
+
+        with self.assertNumQueries(1):
+            resp = self.client.get(url)
+        self.assertEqual(len(resp.data), 1)
+
+
+class ExtraActivityBillingTests(APITestCase):
+    def setUp(self):
+        secretaria, _ = Group.objects.get_or_create(name='Secretaria')
+        prof_group, _ = Group.objects.get_or_create(name='Professores')
+        self.secretary = User.objects.create_user(username='ea_secretary', password='pass12345')
+        self.secretary.groups.add(secretaria)
+        self.teacher = User.objects.create_user(username='ea_teacher', password='pass12345')
+        self.teacher.groups.add(prof_group)
+
+        self.ballet = ExtraActivity.objects.create(name='Balé', price=Decimal('310.00'))
+        self.judo = ExtraActivity.objects.create(name='Judô', price=Decimal('200.00'))
+        included = ExtraActivity.objects.create(name='Recreação', price=Decimal('99.00'), activity_type='INCLUDED')
+
+        self.guardian = Guardian.objects.create(name='Mãe Cobrança', cpf='111.222.333-44', phone='1')
+        second_guardian = Guardian.objects.create(name='Pai Cobrança', cpf='555.666.777-88', phone='2')
+        self.alice = Student.objects.create(name='Alice EA', registration_number='EA1')
+        self.alice.guardians.add(self.guardian, second_guardian)
+        self.bruno = Student.objects.create(name='Bruno EA', registration_number='EA2')
+        self.bruno.guardians.add(self.guardian)
+
+        # Março/2026 tem 31 dias
+        self.alice_ballet = ExtraActivityEnrollment.objects.create(
+            student=self.alice, activity=self.ballet, start_date=date(2026, 1, 10)
+        )
+        ExtraActivityEnrollment.objects.create(  # entrou em 17/03: 15 dias
+            student=self.alice, activity=self.judo, start_date=date(2026, 3, 17)
+        )
+        ExtraActivityEnrollment.objects.create(  # saiu em 10/03 (inativa): 10 dias
+            student=self.bruno, activity=self.ballet, start_date=date(2025, 8, 1),
+            end_date=date(2026, 3, 10), active=False,
+        )
+        ExtraActivityEnrollment.objects.create(student=self.bruno, activity=included, start_date=date(2026, 1, 1))
+        self.url = '/api/extra-activity-enrollments/billing-report/'
+
+    def test_prorated_billing_per_guardian_student_month(self):
+        self.client.force_authenticate(user=self.secretary)
+        resp = self.client.get(self.url, {'start': '2026-03', 'end': '2026-04'})
+        self.assertEqual(resp.status_code, 200)
+
+        rows = {(row['month'], row['student_name']): row for row in resp.data['rows']}
+        self.assertEqual(len(rows), 3)
+        alice_march = rows[('2026-03', 'Alice EA')]
+        self.assertEqual(alice_march['guardian_name'], 'Mãe Cobrança')  # primeiro vínculo, sem duplicar
+        self.assertEqual(alice_march['activities'], 'Balé, Judô')
+        self.assertEqual(alice_march['amount'], Decimal('310.00') + Decimal('96.77'))  # 200 * 15/31
+        self.assertEqual(rows[('2026-03', 'Bruno EA')]['amount'], Decimal('100.00'))  # 310 * 10/31
+        self.assertEqual(rows[('2026-04', 'Alice EA')]['amount'], Decimal('510.00'))
+        self.assertNotIn(('2026-04', 'Bruno EA'), rows)
+        self.assertEqual(resp.data['totals']['2026-03']['students'], 2)
+
+    def test_csv_and_xlsx_exports(self):
+        import openpyxl
+
+        self.client.force_authenticate(user=self.secretary)
+        resp = self.client.get(self.url, {'start': '2026-03', 'export': 'csv'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        body = b''.join(resp.streaming_content).decode('utf-8')
+        lines = body.strip().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('406,77', body)
+
+        resp = self.client.get(self.url, {'start': '2026-03', 'export': 'xlsx'})
+        self.assertEqual(resp.status_code, 200)
+        workbook = openpyxl.load_workbook(BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(workbook.active.max_row, 3)
+
+    def test_teacher_cannot_read_billing(self):
+        self.client.force_authenticate(user=self.teacher)
+        resp = self.client.get(self.url, {'start': '2026-03'})
+        self.assertEqual(resp.status_code, 403)
+
+    def test_bulk_attendance_upserts_in_constant_queries(self):
+        self.client.force_authenticate(user=self.teacher)
+        extra = [
+            ExtraActivityEnrollment.objects.create(
+                student=Student.objects.create(name=f'Balé {i}', registration_number=f'EAB{i}'),
+                activity=self.ballet, start_date=date(2026, 1, 1),
+            )
+            for i in range(6)
+        ]
+        records = [{'enrollment_id': e.id, 'present': True} for e in [self.alice_ballet] + extra]
+        payload = {'activity': self.ballet.id, 'date': '2026-03-02', 'records': records}
+
+        with self.assertNumQueries(6):  # perfil + vigentes + existentes + upsert (+ savepoints)
+            resp = self.client.post('/api/extra-activity-attendances/bulk_save/', payload, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['created'], 7)
+
+        records[0]['present'] = False
+        resp = self.client.post('/api/extra-activity-attendances/bulk_save/', payload, format='json')
+        self.assertEqual((resp.data['created'], resp.data['updated']), (0, 7))
+        self.assertFalse(ExtraActivityAttendance.objects.get(enrollment=self.alice_ballet).present)
+
+        payload['records'] = [{'enrollment_id': self.alice_ballet.id, 'present': True}]
+        payload['activity'] = self.judo.id  # matrícula de outra atividade
+        resp = self.client.post('/api/extra-activity-attendances/bulk_save/', payload, format='json')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_bulk_attendance_accepts_string_ids_and_rejects_bad_ones(self):
+        self.client.force_authenticate(user=self.teacher)
+        payload = {
+            'activity': self.ballet.id, 'date': '2026-03-02',
+            'records': [{'enrollment_id': str(self.alice_ballet.id), 'present': False}],
+        }
+        resp = self.client.post('/api/extra-activity-attendances/bulk_save/', payload, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(ExtraActivityAttendance.objects.get(enrollment=self.alice_ballet).present)
+
+        payload['records'].append({'enrollment_id': 'abc', 'present': True})
+        resp = self.client.post('/api/extra-activity-attendances/bulk_save/', payload, format='json')
+        self.assertEqual(resp.status_code, 400)
+
+        # Ids mistos (str e int) inexistentes: 400 com a lista, não 500.
+        payload['records'] = [{'enrollment_id': '999998'}, {'enrollment_id': 999999}]
+        resp = self.client.post('/api/extra-activity-attendances/bulk_save/', payload, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['enrollments'], [999998, 999999])
+
+
+class TimetableBulkImportTests(APITestCase):
+    def setUp(self):
+        prof_group, _ = Group.objects.get_or_create(name='Professores')
+        coord_group, _ = Group.objects.get_or_create(name='Coordenadores')
+        self.coord = User.objects.create_user(username='tt_coord', password='pass12345')
+        self.coord.groups.add(coord_group)
+        self.teacher = User.objects.create_user(username='tt_teacher', password='pass12345')
+        self.other_teacher = User.objects.create_user(username='tt_teacher2', password='pass12345')
+        self.teacher.groups.add(prof_group)
+        self.other_teacher.groups.add(prof_group)
+
+        segment = Segment.objects.create(name='Fundamental TT')
+        self.class_a = ClassRoom.objects.create(name='6A', year=2026, segment=segment)
+        self.class_b = ClassRoom.objects.create(name='6B', year=2026, segment=segment)
+        math = Subject.objects.create(name='Matemática TT')
+        science = Subject.objects.create(name='Ciências TT')
+        self.math_a = TeacherAssignment.objects.create(teacher=self.teacher, subject=math, classroom=self.class_a)
+        self.math_b = TeacherAssignment.objects.create(teacher=self.teacher, subject=math, classroom=self.class_b)
+        self.science_a = TeacherAssignment.objects.create(teacher=self.other_teacher, subject=science, classroom=self.class_a)
+
+        ClassSchedule.objects.create(
+            classroom=self.class_a, assignment=self.science_a, day_of_week=5,
+            start_time=time(7, 0), end_time=time(8, 0),
+        )
+        self.url = '/api/schedules/bulk-import/'
+
+    def _entry(self, assignment, day, start, end):
+        return {'assignment': assignment.id, 'day_of_week': day, 'start_time': start, 'end_time': end}
+
+    def test_replace_creates_grid_in_one_request(self):
+        self.client.force_authenticate(user=self.coord)
+        entries = [
+            self._entry(self.math_a, 1, '07:00', '08:00'),
+            self._entry(self.science_a, 1, '08:00', '09:00'),
+            self._entry(self.math_b, 1, '08:00', '09:00'),
+        ]
+        resp = self.client.post(self.url, {'mode': 'replace', 'entries': entries}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['created'], 3)
+        self.assertEqual(resp.data['deleted'], 1)
+        self.assertEqual(ClassSchedule.objects.count(), 3)
+        self.assertFalse(ClassSchedule.objects.filter(day_of_week=5).exists())
+
+    def test_returns_all_conflicts_and_writes_nothing(self):
+        self.client.force_authenticate(user=self.coord)
+        entries = [
+            self._entry(self.math_a, 1, '07:00', '08:00'),
+            self._entry(self.science_a, 1, '07:30', '08:30'),   # sobrepõe na turma A
+            self._entry(self.math_b, 1, '07:15', '07:45'),      # professor em duas turmas
+            self._entry(self.math_a, 2, '10:00', '09:00'),      # fim antes do início
+        ]
+        resp = self.client.post(self.url, {'entries': entries}, format='json')
+
+        self.assertEqual(resp.status_code, 400)
+        kinds = sorted(c['type'] for c in resp.data['conflicts'])
+        self.assertEqual(kinds, ['classroom', 'teacher'])
+        self.assertEqual([(e['index'], e['field']) for e in resp.data['errors']], [(3, 'end_time')])
+        self.assertEqual(ClassSchedule.objects.count(), 1)
+
+    def test_append_detects_conflict_with_existing_schedule(self):
+        self.client.force_authenticate(user=self.coord)
+        entries = [self._entry(self.math_a, 5, '07:30', '08:30')]
+        resp = self.client.post(self.url, {'mode': 'append', 'entries': entries}, format='json')
+
+        self.assertEqual(resp.status_code, 400)
+        conflict = resp.data['conflicts'][0]
+        self.assertEqual(conflict['type'], 'classroom')
+        self.assertIn('schedule_id', conflict['first'])
+
+    def test_classrooms_must_be_a_list_of_ids(self):
+        ClassSchedule.objects.create(
+            classroom=self.class_b, assignment=self.math_b, day_of_week=4,
+            start_time=time(7, 0), end_time=time(8, 0),
+        )
+        self.client.force_authenticate(user=self.coord)
+        for classrooms in (f'{self.class_a.id}{self.class_b.id}', self.class_a.id, [self.class_a.id, 'x'], [True]):
+            resp = self.client.post(
+                self.url, {'mode': 'replace', 'entries': [], 'classrooms': classrooms}, format='json'
+            )
+            self.assertEqual(resp.status_code, 400, classrooms)
+            self.assertEqual([e['field'] for e in resp.data['errors']], ['classrooms'])
+        self.assertEqual(ClassSchedule.objects.count(), 2)
+
+        resp = self.client.post(
+            self.url, {'mode': 'replace', 'entries': [], 'classrooms': [str(self.class_b.id)]}, format='json'
+        )
+        self.assertEqual((resp.status_code, resp.data['deleted']), (200, 1))
+
+    def test_teacher_cannot_bulk_import(self):
+        self.client.force_authenticate(user=self.teacher)
+        resp = self.client.post(self.url, {'entries': []}, format='json')
+        self.assertEqual(resp.status_code, 403)
+
+    def test_sweep_handles_large_grid_linearithmically(self):
+        from apps.academic.timetable import sweep_overlaps
+
+        intervals = [(i, i + 1, i) for i in range(20000)]
+        self.assertEqual(sweep_overlaps(intervals), [])
+        self.assertEqual(len(sweep_overlaps(intervals + [(5, 7, 'x')])), 2)
+
+    def test_sweep_reports_every_pair_of_nested_intervals(self):
+        from apps.academic.timetable import sweep_overlaps
+
+        a, b, c = (time(8, 0), time(12, 0), 'A'), (time(9, 0), time(11, 0), 'B'), (time(10, 0), time(11, 30), 'C')
+        pairs = {(first[2], second[2]) for first, second in sweep_overlaps([c, a, b])}
+        self.assertEqual(pairs, {('A', 'B'), ('A', 'C'), ('B', 'C')})
+        self.assertEqual(sweep_overlaps([a, (time(12, 0), time(13, 0), 'D')]), [])
+
+
 class AttendanceScheduleRulesTests(APITestCase):
     def setUp(self):
         self.teacher = User.objects.create_user(username='att_teacher', password='pass12345')
@@ -729,6 +1754,205 @@ class ReconcileLessonPlanGuardsCommandTests(APITestCase):
         )
         self.assertEqual(LessonPlanSubmissionBlock.objects.count(), 0)
 
+class FullTextSearchTests(APITestCase):
+    def setUp(self):
+        teachers_group, _ = Group.objects.get_or_create(name='Professores')
+        coord_group, _ = Group.objects.get_or_create(name='Coordenacao')
+
+        self.teacher = User.objects.create_user(username='prof_busca', password='123')
+        self.other_teacher = User.objects.create_user(username='prof_outro', password='123')
+        self.coordinator = User.objects.create_user(username='coord_busca', password='123')
+        self.guardian_user = User.objects.create_user(username='resp_busca', password='123')
+        self.teacher.groups.add(teachers_group)
+        self.other_teacher.groups.add(teachers_group)
+        self.coordinator.groups.add(coord_group)
+
+        segment = Segment.objects.create(name='Fundamental I')
+        classroom = ClassRoom.objects.create(name='4A', year=2026, segment=segment)
+        subject = Subject.objects.create(name='Matemática')
+        assignment = TeacherAssignment.objects.create(teacher=self.teacher, subject=subject, classroom=classroom)
+
+        self.student = Student.objects.create(name='Aluno Busca', registration_number='B001')
+        self.guardian = Guardian.objects.create(
+            user=self.guardian_user,
+            name='Resp Busca',
+            cpf='333.333.333-33',
+            phone='11977777777',
+            email='resp.busca@example.com',
+        )
+        self.student.guardians.add(self.guardian)
+        Enrollment.objects.create(student=self.student, classroom=classroom, active=True)
+
+        self.plan = LessonPlan.objects.create(
+            assignment=assignment,
+            start_date=date(2026, 3, 9),
+            end_date=date(2026, 3, 13),
+            topic='Frações equivalentes',
+            description='<p>Resolução de <strong>problemas</strong> com frações &amp; desenhos</p>',
+        )
+        self.content = TaughtContent.objects.create(
+            assignment=assignment,
+            date=date(2026, 3, 10),
+            content='<p>Problemas de frações no caderno</p>',
+            homework='Lista de exercícios',
+        )
+        self.approved_report = StudentReport.objects.create(
+            student=self.student,
+            teacher=self.teacher,
+            date=date(2026, 3, 10),
+            subject='Acompanhamento',
+            content='<p>Resolve problemas com autonomia</p>',
+            status='APPROVED',
+            visible_to_family=True,
+        )
+        self.pending_report = StudentReport.objects.create(
+            student=self.student,
+            teacher=self.teacher,
+            date=date(2026, 3, 11),
+            subject='Rascunho',
+            content='<p>Dificuldade em problemas de divisão</p>',
+            status='PENDING',
+            visible_to_family=False,
+        )
+
+    def _search(self, user, **params):
+        self.client.force_authenticate(user=user)
+        return self.client.get('/api/search/', params)
+
+    def _keys(self, response):
+        return {(item['type'], item['id']) for item in response.data['results']}
+
+    def test_vector_is_maintained_on_save_and_stemmed(self):
+        response = self._search(self.teacher, q='problema')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(('lesson_plan', self.plan.id), self._keys(response))
+        self.assertIn(('taught_content', self.content.id), self._keys(response))
+
+        self.plan.description = '<p>Geometria plana</p>'
+        self.plan.save()
+        response = self._search(self.teacher, q='geometria', types='lesson_plan')
+        self.assertEqual(self._keys(response), {('lesson_plan', self.plan.id)})
+
+    def test_html_is_stripped_from_index_and_snippet(self):
+        response = self._search(self.teacher, q='strong', types='lesson_plan')
+        self.assertEqual(response.data['count'], 0)
+
+        response = self._search(self.teacher, q='problemas', types='lesson_plan')
+        snippet = response.data['results'][0]['snippet']
+        self.assertIn('<mark>problemas</mark>', snippet)
+        self.assertNotIn('<strong>', snippet)
+        self.assertIn('frações &amp; desenhos', snippet)
+
+    def test_escaped_markup_in_description_stays_escaped_in_snippet(self):
+        self.plan.description = (
+            '<p>Problemas &lt;script&gt;alert(1)&lt;/script&gt; e '
+            '&lt;img src=x onerror=alert(1)&gt; problemas</p>'
+        )
+        self.plan.save()
+        response = self._search(self.teacher, q='problemas', types='lesson_plan')
+        snippet = response.data['results'][0]['snippet']
+        self.assertIn('<mark>', snippet)
+        self.assertIn('&lt;script&gt;', snippet)
+        self.assertNotIn('<script', snippet)
+        self.assertNotIn('<img', snippet)
+        self.assertEqual(snippet.replace('<mark>', '').replace('</mark>', '').count('<'), 0)
+
+    def test_results_are_scoped_by_user(self):
+        response = self._search(self.other_teacher, q='problemas')
+        self.assertEqual(response.data['count'], 0)
+
+        response = self._search(self.guardian_user, q='problemas')
+        keys = self._keys(response)
+        self.assertIn(('student_report', self.approved_report.id), keys)
+        self.assertIn(('taught_content', self.content.id), keys)
+        self.assertNotIn(('student_report', self.pending_report.id), keys)
+        self.assertNotIn(('lesson_plan', self.plan.id), keys)
+
+        response = self._search(self.coordinator, q='problemas', types='student_report')
+        self.assertEqual(
+            self._keys(response),
+            {('student_report', self.approved_report.id), ('student_report', self.pending_report.id)},
+        )
+
+    def test_invalid_params_return_400(self):
+        self.assertEqual(self._search(self.teacher, q='a').status_code, 400)
+        self.assertEqual(self._search(self.teacher, q='frações', types='grade').status_code, 400)
+
+    def test_rebuild_search_index_command(self):
+        LessonPlan.objects.update(search_vector=None)
+        out = StringIO()
+        call_command('rebuild_search_index', '--only-missing', '--type', 'lesson_plan', stdout=out)
+        self.assertIn('lesson_plan: 1', out.getvalue())
+        response = self._search(self.teacher, q='frações', types='lesson_plan')
+        self.assertEqual(response.data['count'], 1)
+
+
+class StudentGuardianAutocompleteTests(APITestCase):
+    def setUp(self):
+        coord_group, _ = Group.objects.get_or_create(name='Coordenacao')
+        self.coordinator = User.objects.create_user(username='coord_auto', password='123')
+        self.coordinator.groups.add(coord_group)
+        self.guardian_user = User.objects.create_user(username='resp_auto', password='123')
+
+        self.joao = Student.objects.create(name='João da Conceição', registration_number='2026-001', cpf='123.456.789-00')
+        self.maria = Student.objects.create(name='Maria Joaquina', registration_number='2026-002')
+        self.ana = Student.objects.create(name='Ana Souza', registration_number='2026-003')
+
+        self.guardian = Guardian.objects.create(
+            user=self.guardian_user,
+            name='Conceição Araújo',
+            cpf='987.654.321-00',
+            phone='11966666666',
+        )
+        self.ana.guardians.add(self.guardian)
+
+    def _get(self, url, user, **params):
+        self.client.force_authenticate(user=user)
+        return self.client.get(url, params)
+
+    def test_normalized_columns_are_maintained_on_save(self):
+        self.joao.refresh_from_db()
+        self.assertEqual(self.joao.cpf_digits, '12345678900')
+        self.assertEqual(self.joao.registration_key, '2026001')
+        self.guardian.refresh_from_db()
+        self.assertEqual(self.guardian.cpf_digits, '98765432100')
+
+    def test_student_name_is_accent_insensitive_and_prefix_ranked(self):
+        response = self._get('/api/students/autocomplete/', self.coordinator, q='joao')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['id'], self.joao.id)
+        self.assertEqual(set(response.data[0].keys()), {'id', 'name', 'registration_number'})
+
+        # Prefixo de 2 caracteres: nome começando com o termo vem antes de palavra interna.
+        response = self._get('/api/students/autocomplete/', self.coordinator, q='Jo')
+        self.assertEqual([item['id'] for item in response.data], [self.joao.id, self.maria.id])
+
+        response = self._get('/api/students/autocomplete/', self.coordinator, q='CONCEICAO')
+        self.assertEqual([item['id'] for item in response.data], [self.joao.id])
+
+    def test_student_lookup_by_registration_and_cpf(self):
+        response = self._get('/api/students/autocomplete/', self.coordinator, q='2026002')
+        self.assertEqual(response.data[0]['id'], self.maria.id)
+        response = self._get('/api/students/autocomplete/', self.coordinator, q='123.456')
+        self.assertEqual([item['id'] for item in response.data], [self.joao.id])
+
+    def test_short_query_and_limit(self):
+        self.assertEqual(self._get('/api/students/autocomplete/', self.coordinator, q='j').data, [])
+        response = self._get('/api/students/autocomplete/', self.coordinator, q='2026', limit=2)
+        self.assertEqual(len(response.data), 2)
+
+    def test_guardian_autocomplete_is_scoped(self):
+        response = self._get('/api/guardians/autocomplete/', self.coordinator, q='conceicao')
+        self.assertEqual([item['id'] for item in response.data], [self.guardian.id])
+        response = self._get('/api/guardians/autocomplete/', self.coordinator, q='98765')
+        self.assertEqual([item['id'] for item in response.data], [self.guardian.id])
+
+        response = self._get('/api/students/autocomplete/', self.guardian_user, q='an')
+        self.assertEqual([item['id'] for item in response.data], [self.ana.id])
+        response = self._get('/api/students/autocomplete/', self.guardian_user, q='joao')
+        self.assertEqual(response.data, [])
+
+
 class CalendarXlsxImportTests(SimpleTestCase):
     def test_parse_range(self):
         from apps.academic.calendar_xlsx_import import parse_calendar_line
@@ -786,3 +2010,91 @@ class CalendarXlsxImportTests(SimpleTestCase):
         self.assertGreater(len(evs), 40)
         titles = {e.title for e in evs}
         self.assertTrue(any('Recesso Escolar' in t for t in titles))
+
+
+class CalendarXlsxBulkImportTests(APITestCase):
+    def setUp(self):
+        try:
+            import openpyxl
+        except ImportError:
+            self.skipTest('openpyxl não instalado')
+        import tempfile
+
+        wb = openpyxl.Workbook()
+        ws_2026 = wb.active
+        ws_2026.title = 'CALENDÁRIO 2026'
+        ws_2026['B14'] = '02 a 14 - Recesso Escolar'
+        ws_2026['K14'] = '16, 17 e 18 - Recesso (Aulas Suspensas) - Carnaval'
+        ws_2026['B31'] = '10 - Reunião de Pais'
+        ws_2027 = wb.create_sheet('CALENDÁRIO 2027')
+        ws_2027['B14'] = '04 a 15 - Recesso Escolar'
+        ws_2027['AU31'] = '08 - Feriado Imaculada Conceição'
+
+        tmp = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        tmp.close()
+        wb.save(tmp.name)
+        self.path = tmp.name
+        self.addCleanup(os.remove, tmp.name)
+
+    def test_all_sheets_use_year_from_title_and_report_per_sheet(self):
+        from apps.academic.calendar_xlsx_import import import_calendar_events
+
+        stats = import_calendar_events(self.path, year=None, all_sheets=True, skip_existing=True)
+
+        self.assertEqual(stats['created'], 5)
+        self.assertEqual(
+            [(s['sheet'], s['year'], s['parsed'], s['created']) for s in stats['sheets']],
+            [('CALENDÁRIO 2026', 2026, 3, 3), ('CALENDÁRIO 2027', 2027, 2, 2)],
+        )
+        years = sorted(SchoolEvent.objects.values_list('start_time__year', flat=True))
+        self.assertEqual(years, [2026, 2026, 2026, 2027, 2027])
+        self.assertTrue(SchoolEvent.objects.filter(title__contains='Imaculada', start_time__month=12).exists())
+
+    def test_imported_events_are_all_day_in_ics_feed(self):
+        from django.utils import timezone
+        from apps.academic.calendar_feed import render_ics
+        from apps.academic.calendar_xlsx_import import import_calendar_events
+
+        import_calendar_events(self.path, year=None, all_sheets=True, skip_existing=True)
+        recess = SchoolEvent.objects.get(title__contains='Recesso Escolar', start_time__year=2026)
+        start, end = (timezone.localtime(value).date() for value in (recess.start_time, recess.end_time))
+        meeting = SchoolEvent.objects.create(
+            title='Reunião 8h', start_time=recess.start_time, end_time=recess.end_time,
+        )
+
+        body = render_ics([recess, meeting], 'Teste').decode()
+        recess_block = body.split(f'UID:schoolevent-{recess.id}@')[1].split('END:VEVENT')[0]
+        self.assertIn(f'DTSTART;VALUE=DATE:{start:%Y%m%d}', recess_block)
+        self.assertIn(f'DTEND;VALUE=DATE:{end + timedelta(days=1):%Y%m%d}', recess_block)
+        meeting_block = body.split(f'UID:schoolevent-{meeting.id}@')[1].split('END:VEVENT')[0]
+        self.assertNotIn('VALUE=DATE', meeting_block)
+
+    def test_reimport_with_skip_existing_creates_nothing(self):
+        from apps.academic.calendar_xlsx_import import import_calendar_events
+
+        import_calendar_events(self.path, year=None, all_sheets=True, skip_existing=True)
+        stats = import_calendar_events(self.path, year=None, all_sheets=True, skip_existing=True)
+
+        self.assertEqual(stats['created'], 0)
+        self.assertEqual(stats['skipped_duplicate'], 5)
+        self.assertEqual(SchoolEvent.objects.count(), 5)
+
+    def test_query_count_does_not_grow_with_events(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from apps.academic.calendar_xlsx_import import import_calendar_events
+
+        with CaptureQueriesContext(connection) as ctx:
+            import_calendar_events(self.path, year=None, all_sheets=True, skip_existing=True)
+        # 1 SELECT das chaves existentes + 1 INSERT em lote (+ savepoint do atomic)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+    def test_command_selects_sheet_by_name(self):
+        out = StringIO()
+        call_command('import_school_calendar_xlsx', file=self.path, sheets=['CALENDÁRIO 2027'], stdout=out)
+
+        self.assertEqual(SchoolEvent.objects.count(), 2)
+        self.assertIn('Aba "CALENDÁRIO 2027" (2027)', out.getvalue())
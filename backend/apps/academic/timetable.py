@@ -0,0 +1,261 @@
+"""
+Importação em lote da grade horária (uma requisição para a grade da escola).
+
+A grade recebida é validada inteira antes de gravar: intervalos sobrepostos na
+mesma turma e professor alocado em duas turmas ao mesmo tempo são detectados
+por varredura de intervalos ordenados (O(n log n) mais os pares) agrupados por
+(turma, dia) e (professor, dia). Todos os problemas voltam de uma vez; só sem
+nenhum erro a grade é aplicada, numa transação, com ``bulk_create``.
+
+Modos:
+- ``replace``: apaga a grade atual das turmas presentes no lote (e das listadas
+  em ``classrooms``) e grava a nova;
+- ``append``: mantém a grade atual e acrescenta as entradas (conflitos com as
+  aulas já gravadas também são reportados).
+"""
+import heapq
+from datetime import time
+
+from django.db import transaction
+
+MODES = ('replace', 'append')
+MAX_ENTRIES = 5000
+VALID_DAYS = {0, 1, 2, 3, 4, 5, 6}
+
+
+class TimetableImportError(Exception):
+    """Lote inválido; carrega os erros por linha e os conflitos encontrados."""
+
+    def __init__(self, errors=None, conflicts=None):
+        super().__init__('Grade horária inválida.')
+        self.errors = errors or []
+        self.conflicts = conflicts or []
+
+
+def _parse_time(value):
+    if isinstance(value, time):
+        return value
+    try:
+        return time.fromisoformat(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def sweep_overlaps(intervals):
+    """
+    Todos os pares sobrepostos numa lista de (início, fim, ref) do mesmo grupo.
+    Ordena uma vez pelo início e mantém os intervalos ainda abertos num heap
+    por fim: os que terminam até o início do item atual saem, e o item
+    conflita com cada um dos que restam (O(n log n + pares)). Aulas encostadas
+    (fim == início) não conflitam.
+    """
+    overlaps = []
+    active = []
+    for order, item in enumerate(sorted(intervals, key=lambda it: (it[0], it[1]))):
+        while active and active[0][0] <= item[0]:
+            heapq.heappop(active)
+        overlaps.extend((other, item) for _, _, other in sorted(active, key=lambda entry: entry[1]))
+        heapq.heappush(active, (item[1], order, item))
+    return overlaps
+
+
+def _parse_entries(entries, assignments):
+    """Valida campo a campo; retorna (linhas normalizadas, erros)."""
+    rows = []
+    errors = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append({'index': index, 'field': None, 'message': 'Entrada inválida.'})
+            continue
+
+        row_errors = []
+        assignment = assignments.get(_parse_int(entry.get('assignment')))
+        if assignment is None:
+            row_errors.append(('assignment', 'Atribuição inexistente.'))
+
+        classroom_id = _parse_int(entry.get('classroom'))
+        if assignment is not None:
+            if entry.get('classroom') in (None, ''):
+                classroom_id = assignment['classroom_id']
+            elif classroom_id != assignment['classroom_id']:
+                row_errors.append(('classroom', 'Esta atribuição (Matéria/Professor) não pertence a esta turma.'))
+
+        day = _parse_int(entry.get('day_of_week'))
+        if day not in VALID_DAYS:
+            row_errors.append(('day_of_week', 'Dia da semana inválido (0 a 6).'))
+
+        start = _parse_time(entry.get('start_time'))
+        end = _parse_time(entry.get('end_time'))
+        if start is None:
+            row_errors.append(('start_time', 'Horário inválido (use HH:MM).'))
+        if end is None:
+            row_errors.append(('end_time', 'Horário inválido (use HH:MM).'))
+        if start is not None and end is not None and end <= start:
+            row_errors.append(('end_time', 'O fim deve ser posterior ao início.'))
+
+        if row_errors:
+            errors.extend({'index': index, 'field': field, 'message': msg} for field, msg in row_errors)
+            continue
+
+        rows.append({
+            'index': index,
+            'classroom_id': classroom_id,
+            'assignment_id': assignment['id'],
+            'teacher_id': assignment['teacher_id'],
+            'day_of_week': day,
+            'start_time': start,
+            'end_time': end,
+        })
+    return rows, errors
+
+
+def _describe(row):
+    ref = {'index': row['index']} if row.get('index') is not None else {'schedule_id': row['id']}
+    ref.update({
+        'classroom': row['classroom_id'],
+        'assignment': row['assignment_id'],
+        'start_time': row['start_time'].strftime('%H:%M'),
+        'end_time': row['end_time'].strftime('%H:%M'),
+    })
+    return ref
+
+
+def find_conflicts(rows, existing=()):
+    """
+    Conflitos de turma e de professor entre as linhas novas e as aulas mantidas.
+    Conflitos só entre aulas já gravadas não são reportados (não vêm deste lote).
+    """
+    groups = {}
+    for row in list(rows) + list(existing):
+        item = (row['start_time'], row['end_time'], row)
+        groups.setdefault(('classroom', row['classroom_id'], row['day_of_week']), []).append(item)
+        groups.setdefault(('teacher', row['teacher_id'], row['day_of_week']), []).append(item)
+
+    conflicts = []
+    for (kind, owner_id, day), intervals in groups.items():
+        if len(intervals) < 2:
+            continue
+        for first, second in sweep_overlaps(intervals):
+            first_row, second_row = first[2], second[2]
+            if first_row.get('index') is None and second_row.get('index') is None:
+                continue
+            conflicts.append({
+                'type': kind,
+                'classroom' if kind == 'classroom' else 'teacher': owner_id,
+                'day_of_week': day,
+                'first': _describe(first_row),
+                'second': _describe(second_row),
+            })
+    conflicts.sort(key=lambda c: (c['type'], c['day_of_week'], c['first']['start_time']))
+    return conflicts
+
+
+def import_timetable(entries, *, mode='replace', classroom_ids=None, dry_run=False):
+    """
+    Valida e aplica a grade. Levanta TimetableImportError com todos os erros e
+    conflitos; caso contrário retorna o resumo da operação.
+    """
+    from .models import ClassRoom, ClassSchedule, TeacherAssignment
+
+    if mode not in MODES:
+        raise TimetableImportError(errors=[{'index': None, 'field': 'mode', 'message': f'Modo inválido: {mode}.'}])
+    if not isinstance(entries, list):
+        raise TimetableImportError(errors=[{'index': None, 'field': 'entries', 'message': 'Envie uma lista de aulas.'}])
+    if len(entries) > MAX_ENTRIES:
+        raise TimetableImportError(errors=[{
+            'index': None, 'field': 'entries', 'message': f'Máximo de {MAX_ENTRIES} aulas por lote.',
+        }])
+
+    # Validada antes de tudo: no modo replace estas turmas têm a grade apagada.
+    if classroom_ids is None:
+        classroom_ids = []
+    if not isinstance(classroom_ids, list) or any(
+        isinstance(cid, bool) or _parse_int(cid) is None for cid in classroom_ids
+    ):
+        raise TimetableImportError(errors=[{
+            'index': None, 'field': 'classrooms', 'message': 'Envie uma lista de ids de turma.',
+        }])
+
+    assignment_ids = {_parse_int(e.get('assignment')) for e in entries if isinstance(e, dict)}
+    assignments = {
+        a['id']: a
+        for a in TeacherAssignment.objects.filter(id__in=assignment_ids - {None}).values('id', 'classroom_id', 'teacher_id')
+    }
+    rows, errors = _parse_entries(entries, assignments)
+
+    target_classrooms = {row['classroom_id'] for row in rows}
+    explicit = {_parse_int(cid) for cid in classroom_ids}
+    if explicit:
+        found = set(ClassRoom.objects.filter(id__in=explicit).values_list('id', flat=True))
+        errors.extend(
+            {'index': None, 'field': 'classrooms', 'message': f'Turma inexistente: {cid}.'}
+            for cid in sorted(explicit - found)
+        )
+    replaced = (target_classrooms | explicit) if mode == 'replace' else set()
+
+    with transaction.atomic():
+        # Trava as turmas afetadas: duas importações simultâneas não se intercalam.
+        list(ClassRoom.objects.select_for_update().filter(id__in=target_classrooms | explicit).values_list('id', flat=True))
+
+        teacher_ids = {row['teacher_id'] for row in rows}
+        existing = [
+            {
+                'index': None,
+                'id': s['id'],
+                'classroom_id': s['classroom_id'],
+                'assignment_id': s['assignment_id'],
+                'teacher_id': s['assignment__teacher_id'],
+                'day_of_week': s['day_of_week'],
+                'start_time': s['start_time'],
+                'end_time': s['end_time'],
+            }
+            for s in (
+                ClassSchedule.objects.filter(classroom_id__in=target_classrooms)
+                | ClassSchedule.objects.filter(assignment__teacher_id__in=teacher_ids)
+            )
+            .exclude(classroom_id__in=replaced)
+            .values(
+                'id', 'classroom_id', 'assignment_id', 'assignment__teacher_id',
+                'day_of_week', 'start_time', 'end_time',
+            )
+        ]
+
+        conflicts = find_conflicts(rows, existing)
+        if errors or conflicts:
+            raise TimetableImportError(errors=errors, conflicts=conflicts)
+
+        summary = {
+            'mode': mode,
+            'dry_run': dry_run,
+            'classrooms': sorted(target_classrooms | explicit),
+            'deleted': 0,
+            'created': len(rows),
+        }
+        current = ClassSchedule.objects.filter(classroom_id__in=replaced)
+        if dry_run:
+            summary['deleted'] = current.count() if replaced else 0
+            return summary
+
+        if replaced:
+            summary['deleted'], _ = current.delete()
+        ClassSchedule.objects.bulk_create(
+            [
+                ClassSchedule(
+                    classroom_id=row['classroom_id'],
+                    assignment_id=row['assignment_id'],
+                    day_of_week=row['day_of_week'],
+                    start_time=row['start_time'],
+                    end_time=row['end_time'],
+                )
+                for row in rows
+            ],
+            batch_size=500,
+        )
+    return summary
@@ -5,11 +5,11 @@ from .views import (
     SegmentViewSet, ClassRoomViewSet, StudentViewSet,
     EnrollmentViewSet, SubjectViewSet, TeacherAssignmentViewSet,
     GradeViewSet, AttendanceViewSet, AcademicPeriodViewSet,
-    DashboardDataView, DashboardRiskStudentsView, ReportDiaryPDFView, ReportAttendancePDFView,
+    DashboardDataView, DashboardRiskStudentsView, SearchView, ReportDiaryPDFView, ReportAttendancePDFView,
     GuardianViewSet, LessonPlanViewSet,
     CoordinatorViewSet, AbsenceJustificationViewSet,
     ExtraActivityViewSet, ExtraActivityEnrollmentViewSet, ExtraActivityAttendanceViewSet,
-    TaughtContentViewSet, SchoolEventViewSet,
+    TaughtContentViewSet, SchoolEventViewSet, CalendarFeedView,
     ClassScheduleViewSet, AcademicHistoryViewSet,
     ContraturnoClassroomViewSet, ContraturnoAttendanceViewSet,
     StudentChecklistConfigViewSet, StudentDailyChecklistViewSet
@@ -44,6 +44,8 @@ router.register(r'student-checklists', StudentDailyChecklistViewSet)
 urlpatterns = [
     path('dashboard/data/', DashboardDataView.as_view(), name='dashboard_data'),
     path('dashboard/risk-students/', DashboardRiskStudentsView.as_view(), name='dashboard_risk_students'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('calendar/feed/<str:token>.ics', CalendarFeedView.as_view(), name='calendar_feed'),
     path('reports/student_card/<int:enrollment_id>/', reports.generate_student_report_card, name='student_report_card'),
     path('reports/diary-pdf/', ReportDiaryPDFView.as_view(), name='report_diary_pdf'),
     path('reports/attendance-pdf/', ReportAttendancePDFView.as_view(), name='report_attendance_pdf'),
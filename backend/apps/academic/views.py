@@ -7,13 +7,17 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.exceptions import ValidationError, PermissionDenied
 from django.db import transaction
-from django.db.models import Count, Avg, Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
+from django.db.models import Count, Avg, Prefetch, Q
+from django.db.models.functions import TruncMonth
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.db.utils import ProgrammingError, OperationalError
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
-from apps.core.pagination import LargeResultsSetPagination
+from apps.core.pagination import KeysetPaginationMixin, LargeResultsSetPagination
 User = get_user_model()
 from .models import (
     Segment, ClassRoom, Guardian, Student, Enrollment, Subject,
@@ -21,7 +25,7 @@ from .models import (
     ExtraActivityEnrollment, ExtraActivityAttendance,
     TaughtContent, SchoolEvent, ClassSchedule, AcademicHistory, LessonPlan, LessonPlanFile,
     ContraturnoClassroom, ContraturnoAttendance,
-    StudentChecklistConfig, StudentDailyChecklist, LessonPlanSubmissionBlock
+    StudentChecklistConfig, StudentDailyChecklist, LessonPlanSubmissionBlock, CalendarFeedToken
 )
 from .serializers import (
     SegmentSerializer, ClassRoomSerializer, StudentSerializer, 
@@ -38,8 +42,42 @@ from .serializers import (
 from .permissions import IsGuardianOwner, IsGuardianOfStudent
 from apps.coordination.models import StudentReport
 from apps.core.audit import register_access_audit
+from apps.core.db_routing import ReplicaReadMixin, current_read_alias
 from apps.core.models import Notification, SchoolAccount
+from apps.core.thumbnails import thumbnail_urls
+from . import analytics
+from . import autocomplete
+from . import billing
+from . import calendar_feed
+from . import family
+from . import gradebook
 from . import reports
+from . import search
+from . import timetable
+
+
+def _records_by_enrollment(records):
+    """
+    Registros de lançamento em lote indexados pelo ``enrollment_id`` como int
+    (o JSON pode trazer "10" ou 10). Retorna None se algum id não for inteiro.
+    """
+    if not isinstance(records, list):
+        return None
+    requested = {}
+    for item in records:
+        if not isinstance(item, dict):
+            return None
+        raw = item.get('enrollment_id')
+        if raw in (None, ''):
+            continue
+        if isinstance(raw, bool):
+            return None
+        try:
+            requested[int(raw)] = item
+        except (TypeError, ValueError):
+            return None
+    return requested
+
 
 class FlexiblePagination(PageNumberPagination):
     page_size = 10
@@ -97,6 +135,7 @@ class ClassRoomViewSet(viewsets.ModelViewSet):
                 'name': enroll.student.name,
                 'status': 'Ativo' if enroll.active else 'Inativo',
                 'photo': request.build_absolute_uri(enroll.student.photo.url) if enroll.student.photo else None,
+                'photo_thumbnails': thumbnail_urls(enroll.student.photo, request=request),
             })
 
         # 4. Corpo Docente (Mantém igual)
@@ -164,6 +203,16 @@ class GuardianViewSet(viewsets.ModelViewSet):
         # Se for Admin/Staff, usa o completo (com Nome, CPF, Secundário...)
         return GuardianSerializer
 
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request):
+        """Typeahead por nome (sem acento) ou CPF. ?q=<mín. 2 caracteres>&limit=10"""
+        text = (request.query_params.get('q') or '').strip()
+        if len(text) < autocomplete.MIN_QUERY_LENGTH:
+            return Response([])
+        return Response(autocomplete.autocomplete_guardians(
+            self.get_queryset(), text, request.query_params.get('limit'),
+        ))
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
         if hasattr(request.user, 'guardian_profile'):
@@ -176,12 +225,62 @@ class ExtraActivityViewSet(viewsets.ModelViewSet):
     serializer_class = ExtraActivitySerializer
 
 
-class ExtraActivityEnrollmentViewSet(viewsets.ModelViewSet):
+class ExtraActivityEnrollmentViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = ExtraActivityEnrollment.objects.all().select_related('student', 'activity')
+    replica_actions = {'billing_report'}
     serializer_class = ExtraActivityEnrollmentSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['student', 'activity', 'active']
 
+    _POWER_GROUPS = ['Coordenadores', 'Coordenação', 'Coordenacao', 'Direção', 'Direcao', 'Diretoria', 'Secretaria']
+
+    @action(detail=False, methods=['get'], url_path='billing-report')
+    def billing_report(self, request):
+        """
+        Cobrança mensal das atividades pagas por responsável/aluno/mês (proporcional
+        a start_date/end_date). GET ?start=2026-03&end=2026-05&export=csv|xlsx
+        Sem 'export' retorna JSON com totais por mês.
+        """
+        user = request.user
+        if not (user.is_superuser or user.groups.filter(name__in=self._POWER_GROUPS).exists()):
+            raise PermissionDenied('Sem permissão para consultar a cobrança das atividades.')
+
+        today = timezone.localdate()
+        try:
+            start = billing.parse_month(request.query_params.get('start') or today.strftime('%Y-%m'))
+            end = billing.parse_month(request.query_params.get('end') or start.strftime('%Y-%m'))
+        except ValueError:
+            return Response({"error": "Mês inválido. Use YYYY-MM."}, status=400)
+        try:
+            billing.month_range(start, end)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        export = request.query_params.get('export')
+        filename = f'cobranca-atividades-{start:%Y-%m}_{end:%Y-%m}'
+        register_access_audit(
+            request=request,
+            action='EXTRA_ACTIVITY_BILLING_EXPORT',
+            resource_type='extra_activity_billing',
+            resource_id=f'{start:%Y-%m}:{end:%Y-%m}',
+            details={'export': export or 'json'},
+        )
+
+        # Alias escolhido agora: no CSV as linhas só são lidas durante o streaming.
+        rows = billing.iter_billing_rows(start, end, using=current_read_alias())
+        if export == 'csv':
+            response = StreamingHttpResponse(billing.stream_csv(rows), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
+        if export == 'xlsx':
+            return FileResponse(
+                billing.build_xlsx(rows),
+                as_attachment=True,
+                filename=f'{filename}.xlsx',
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        return Response({'start': f'{start:%Y-%m}', 'end': f'{end:%Y-%m}', **billing.summarize(rows)})
+
 
 class ExtraActivityAttendanceViewSet(viewsets.ModelViewSet):
     queryset = ExtraActivityAttendance.objects.all().select_related('enrollment', 'enrollment__student', 'enrollment__activity')
@@ -189,9 +288,74 @@ class ExtraActivityAttendanceViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['enrollment', 'date']
 
+    @action(detail=False, methods=['post'])
+    def bulk_save(self, request):
+        """
+        Lança a presença de uma atividade extra numa data, de uma vez.
+        Esperado: {
+            "activity": 1,
+            "date": "2026-03-02",
+            "records": [{"enrollment_id": 10, "present": true, "observation": ""}]
+        }
+        """
+        if hasattr(request.user, 'guardian_profile'):
+            raise PermissionDenied('Responsáveis não podem lançar presença.')
+
+        activity_id = request.data.get('activity')
+        records = request.data.get('records', [])
+        if not activity_id or not request.data.get('date'):
+            return Response({"error": "Atividade e Data são obrigatórios"}, status=400)
+        try:
+            date_obj = datetime.strptime(str(request.data.get('date')), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "Formato de data inválido. Use YYYY-MM-DD."}, status=400)
+
+        # Uma consulta: matrículas da atividade vigentes na data
+        requested = _records_by_enrollment(records)
+        if requested is None:
+            return Response({"error": "Registros inválidos: enrollment_id deve ser um número inteiro."}, status=400)
+        valid_ids = set(
+            ExtraActivityEnrollment.objects.filter(
+                pk__in=requested, activity_id=activity_id, active=True, start_date__lte=date_obj
+            ).filter(Q(end_date__isnull=True) | Q(end_date__gte=date_obj)).values_list('pk', flat=True)
+        )
+        invalid = sorted(set(requested) - valid_ids)
+        if invalid:
+            return Response(
+                {"error": "Há alunos sem matrícula vigente nesta atividade.", "enrollments": invalid},
+                status=400
+            )
 
-class StudentViewSet(viewsets.ModelViewSet):
-    queryset = Student.objects.all().order_by('name')
+        with transaction.atomic():
+            existing = set(
+                ExtraActivityAttendance.objects.filter(enrollment_id__in=valid_ids, date=date_obj)
+                .values_list('enrollment_id', flat=True)
+            )
+            ExtraActivityAttendance.objects.bulk_create(
+                [
+                    ExtraActivityAttendance(
+                        enrollment_id=enrollment_id,
+                        date=date_obj,
+                        present=item.get('present', True),
+                        observation=item.get('observation', ''),
+                    )
+                    for enrollment_id, item in requested.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['enrollment', 'date'],
+                update_fields=['present', 'observation'],
+            )
+
+        return Response({
+            "message": "Presença salva com sucesso!",
+            "created": len(requested) - len(existing),
+            "updated": len(existing)
+        })
+
+
+class StudentViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = Student.objects.select_related('current_enrollment__classroom').order_by('name')
+    replica_actions = {'report_card', 'report_card_pdf', 'attendance_report', 'class_diary'}
     serializer_class = StudentSerializer
     pagination_class = FlexiblePagination
     parser_classes = (MultiPartParser, FormParser)
@@ -229,6 +393,19 @@ class StudentViewSet(viewsets.ModelViewSet):
 
         return guardian, None
 
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request):
+        """Typeahead por nome (sem acento), matrícula ou CPF. ?q=<mín. 2 caracteres>&limit=10"""
+        text = (request.query_params.get('q') or '').strip()
+        if len(text) < autocomplete.MIN_QUERY_LENGTH:
+            return Response([])
+
+        user = request.user
+        queryset = self.get_queryset()
+        if not user.is_staff and not user.is_superuser and hasattr(user, 'guardian_profile'):
+            queryset = queryset.filter(guardians=user.guardian_profile)
+        return Response(autocomplete.autocomplete_students(queryset, text, request.query_params.get('limit')))
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], url_path='my-children')
     def my_children(self, request):
         user = request.user
@@ -242,12 +419,26 @@ class StudentViewSet(viewsets.ModelViewSet):
         
         # 3. Busca os alunos onde este responsável está na lista de 'guardians'
         # CORREÇÃO: Usamos o filtro direto no Modelo Student, é mais seguro.
-        my_kids = Student.objects.filter(guardians=guardian_profile)
+        my_kids = ParentStudentSerializer.with_current_enrollment(
+            Student.objects.filter(guardians=guardian_profile)
+        )
         
         # 4. Serializa e retorna
         serializer = ParentStudentSerializer(my_kids, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], url_path='family-summary')
+    def family_summary(self, request):
+        """
+        Resumo de todos os filhos do responsável em uma única chamada: turma atual,
+        médias por período, faltas, próximos eventos e relatórios aprovados recentes.
+        """
+        user = request.user
+        if not hasattr(user, 'guardian_profile'):
+            return Response({"detail": "Usuário não é um responsável vinculado."}, status=403)
+
+        return Response(family.get_family_summary(user.guardian_profile))
+
     # --- BOLETIM (Notas Agrupadas) ---
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated], url_path='report-card')
     def report_card(self, request, pk=None):
@@ -257,7 +448,7 @@ class StudentViewSet(viewsets.ModelViewSet):
             return error_response
 
         # 2. Busca Notas e Matrícula
-        enrollment = student.enrollment_set.last()
+        enrollment = student.current_enrollment
         if not enrollment:
             return Response([])
 
@@ -316,11 +507,9 @@ class StudentViewSet(viewsets.ModelViewSet):
         if error_response:
             return error_response
 
-        # Mantém compatibilidade com histórico: tenta matrícula ativa, e se não houver,
-        # usa a última matrícula existente para não bloquear geração de boletim.
-        enrollment = student.enrollment_set.filter(active=True).select_related('classroom').last()
-        if not enrollment:
-            enrollment = student.enrollment_set.select_related('classroom').last()
+        # Mantém compatibilidade com histórico: current_enrollment é a matrícula ativa ou,
+        # se não houver, a última existente, para não bloquear geração de boletim.
+        enrollment = student.current_enrollment
         if not enrollment:
             return Response({"detail": "Aluno sem matrícula ativa."}, status=404)
 
@@ -423,8 +612,8 @@ class StudentViewSet(viewsets.ModelViewSet):
             }
         )
 
-        enrollment = student.enrollment_set.filter(active=True).select_related('classroom').last()
-        if not enrollment:
+        enrollment = student.current_enrollment
+        if not enrollment or not enrollment.active:
             return Response([])
 
         queryset = TaughtContent.objects.filter(
@@ -556,16 +745,96 @@ class TeacherAssignmentViewSet(viewsets.ModelViewSet):
         
         return Response(options)
 
-class GradeViewSet(viewsets.ModelViewSet):
+class GradeViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     # Ordenação estável para paginação consistente:
     # quando várias notas têm a mesma data, o "id" desempata e evita
     # itens faltando/duplicando entre páginas.
     queryset = Grade.objects.all().order_by('date', 'id')
+    keyset_ordering = ('date', 'id')
     serializer_class = GradeSerializer
     filterset_fields = ['enrollment', 'subject', 'enrollment__classroom', 'period']
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+    _POWER_GROUPS = ['Coordenadores', 'Coordenação', 'Coordenacao', 'Direção', 'Direcao', 'Diretoria', 'Secretaria']
+
+    def _assert_gradebook_access(self, user, classroom_id, subject_id):
+        if user.is_superuser or user.groups.filter(name__in=self._POWER_GROUPS).exists():
+            return
+        if TeacherAssignment.objects.filter(teacher=user, classroom_id=classroom_id, subject_id=subject_id).exists():
+            return
+        raise PermissionDenied('Sem permissão para lançar notas desta turma/matéria.')
+
+    @action(detail=False, methods=['get', 'put'], url_path='gradebook')
+    def gradebook(self, request):
+        """
+        Diário de notas em matriz (alunos × avaliações) de turma/matéria/período.
+        GET  ?classroom=1&subject=2&period=3
+        PUT  {"classroom": 1, "subject": 2, "period": 3,
+              "assessments": [{"name": "Prova 1", "weight": 2}],
+              "grades": [{"enrollment_id": 10, "values": {"Prova 1": 8.5}}]}
+        No PUT, valor nulo remove a nota; a matriz inteira é gravada numa transação.
+        """
+        params = request.query_params if request.method == 'GET' else request.data
+        try:
+            classroom_id = int(params.get('classroom'))
+            subject_id = int(params.get('subject'))
+            period_id = int(params.get('period'))
+        except (TypeError, ValueError):
+            return Response({"error": "Parâmetros 'classroom', 'subject' e 'period' são obrigatórios."}, status=400)
+        if not AcademicPeriod.objects.filter(pk=period_id).exists():
+            return Response({"error": "Período acadêmico não encontrado."}, status=400)
+
+        self._assert_gradebook_access(request.user, classroom_id, subject_id)
+
+        if request.method == 'PUT':
+            try:
+                result = gradebook.save_gradebook(
+                    classroom_id, subject_id, period_id,
+                    request.data.get('assessments'), request.data.get('grades'),
+                )
+            except gradebook.GradebookError as exc:
+                return Response({"error": str(exc), "errors": exc.errors}, status=400)
+            register_access_audit(
+                request=request,
+                action='GRADEBOOK_BULK_SAVE',
+                resource_type='grade',
+                resource_id=f'{classroom_id}:{subject_id}:{period_id}',
+                details={'classroom_id': classroom_id, 'subject_id': subject_id, 'period_id': period_id, **result},
+            )
+
+        return Response(gradebook.build_gradebook(classroom_id, subject_id, period_id))
+
+    @action(detail=False, methods=['get'], url_path='analytics')
+    def analytics(self, request):
+        """
+        Estatísticas de notas do período (média ponderada, mediana/percentis,
+        histograma, aprovados/recuperação) por turma×matéria, matéria e escola.
+        GET ?period=3[&classroom=1][&subject=2] — sem período usa o período ativo.
+        Professores consultam apenas turma+matéria da própria atribuição.
+        """
+        params = request.query_params
+        try:
+            classroom_id = int(params['classroom']) if params.get('classroom') else None
+            subject_id = int(params['subject']) if params.get('subject') else None
+            period_id = int(params['period']) if params.get('period') else None
+        except ValueError:
+            return Response({"error": "Parâmetros 'period', 'classroom' e 'subject' devem ser numéricos."}, status=400)
+
+        if period_id is None:
+            period_id = AcademicPeriod.objects.filter(is_active=True).values_list('id', flat=True).first()
+        if period_id is None or not AcademicPeriod.objects.filter(pk=period_id).exists():
+            return Response({"error": "Período acadêmico não encontrado."}, status=400)
+
+        user = request.user
+        if not (user.is_superuser or user.groups.filter(name__in=self._POWER_GROUPS).exists()):
+            if classroom_id is None or subject_id is None:
+                raise PermissionDenied('Informe turma e matéria da sua atribuição.')
+            self._assert_gradebook_access(user, classroom_id, subject_id)
+
+        return Response(analytics.get_grade_analytics(period_id, classroom_id, subject_id))
+
+class AttendanceViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all().order_by('date')
+    keyset_ordering = ('date', 'id')
     serializer_class = AttendanceSerializer
     filterset_fields = [
         'enrollment', 
@@ -968,7 +1237,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            with transaction.atomic():
+            with transaction.atomic(), family.defer_row_invalidation():
                 created_count = 0
                 updated_count = 0
 
@@ -987,6 +1256,10 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                     else:
                         updated_count += 1
 
+            family.invalidate_family_summary(
+                Enrollment.objects.filter(id__in=valid_enrollment_ids).values_list('student_id', flat=True)
+            )
+
             register_access_audit(
                 request=request,
                 action='ATTENDANCE_BULK_SAVE',
@@ -1193,41 +1466,53 @@ class ContraturnoAttendanceViewSet(viewsets.ModelViewSet):
         # Verifica permissão: só o professor responsável pode salvar
         user = request.user
         power_groups = ['Coordenadores', 'Coordenação', 'Coordenacao', 'Direção', 'Secretaria']
-        if not (user.is_superuser or user.groups.filter(name__in=power_groups).exists() or contraturno.teacher == user):
+        if not (user.is_superuser or contraturno.teacher_id == user.id or user.groups.filter(name__in=power_groups).exists()):
             return Response({"error": "Você não tem permissão para registrar frequência neste contraturno"}, status=403)
 
         # Filtra apenas alunos de período integral da turma
-        classroom = contraturno.classroom
         enrollments = Enrollment.objects.filter(
-            classroom=classroom,
+            classroom_id=contraturno.classroom_id,
             active=True,
             student__is_full_time=True
         )
 
+        try:
+            date_obj = datetime.strptime(str(date), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "Formato de data inválido. Use YYYY-MM-DD."}, status=400)
+
+        # Uma consulta valida todas as matrículas enviadas (alunos de outra turma são ignorados)
+        requested = _records_by_enrollment(records)
+        if requested is None:
+            return Response({"error": "Registros inválidos: enrollment_id deve ser um número inteiro."}, status=400)
+        valid = dict(enrollments.filter(pk__in=requested).values_list('pk', 'student_id'))
+        records_by_enrollment = {pk: item for pk, item in requested.items() if pk in valid}
+
         # Transaction Atomic: Ou salva tudo, ou não salva nada (segurança)
         with transaction.atomic():
-            created_count = 0
-            updated_count = 0
-            
-            for item in records:
-                enrollment_id = item['enrollment_id']
-                
-                # Verifica se a matrícula pertence à turma do contraturno
-                if not enrollments.filter(pk=enrollment_id).exists():
-                    continue
-                
-                # update_or_create: Se já lançou chamada nesse dia, atualiza. Se não, cria.
-                obj, created = ContraturnoAttendance.objects.update_or_create(
-                    enrollment_id=enrollment_id,
-                    date=date,
-                    defaults={
-                        'present': item['present'],
-                        'justified': item.get('justified', False),
-                        'observation': item.get('observation', '')
-                    }
-                )
-                if created: created_count += 1
-                else: updated_count += 1
+            existing = set(
+                ContraturnoAttendance.objects.filter(
+                    enrollment_id__in=records_by_enrollment, date=date_obj
+                ).values_list('enrollment_id', flat=True)
+            )
+            # Upsert único: se já lançou chamada nesse dia, atualiza. Se não, cria.
+            ContraturnoAttendance.objects.bulk_create(
+                [
+                    ContraturnoAttendance(
+                        enrollment_id=enrollment_id,
+                        date=date_obj,
+                        present=item['present'],
+                        justified=item.get('justified', False),
+                        observation=item.get('observation', ''),
+                    )
+                    for enrollment_id, item in records_by_enrollment.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['enrollment', 'date'],
+                update_fields=['present', 'justified', 'observation'],
+            )
+            created_count = len(records_by_enrollment) - len(existing)
+            updated_count = len(existing)
 
         return Response({
             "message": "Chamada do contraturno realizada com sucesso!",
@@ -1308,57 +1593,42 @@ class ContraturnoAttendanceViewSet(viewsets.ModelViewSet):
         if not enrollment_id:
             return Response({"error": "Parâmetro 'enrollment' é obrigatório"}, status=400)
         
-        from django.db.models import Count, Q
-        from .models import AcademicPeriod
-        
-        # Busca todas as frequências do aluno no contraturno
-        attendances = ContraturnoAttendance.objects.filter(enrollment_id=enrollment_id)
-        
-        # Estatísticas por período (simplificado - contraturno não tem período acadêmico vinculado)
-        # Vamos agrupar por mês/trimestre
-        from collections import defaultdict
-        from datetime import datetime
-        
-        periods_data = []
-        monthly_stats = defaultdict(lambda: {'presences': 0, 'absences': 0, 'total': 0})
-        
-        for att in attendances:
-            month_key = att.date.strftime('%Y-%m')
-            monthly_stats[month_key]['total'] += 1
-            if att.present:
-                monthly_stats[month_key]['presences'] += 1
-            else:
-                monthly_stats[month_key]['absences'] += 1
-        
+        # Uma consulta: agrupamento por mês e contagens condicionais no banco
+        # (contraturno não tem período acadêmico vinculado)
+        monthly = (
+            ContraturnoAttendance.objects.filter(enrollment_id=enrollment_id)
+            .annotate(month=TruncMonth('date'))
+            .values('month')
+            .annotate(
+                total=Count('id'),
+                presences=Count('id', filter=Q(present=True)),
+                absences=Count('id', filter=Q(present=False)),
+            )
+            .order_by('month')
+        )
+
         # Mapeamento de meses em português
         month_names = {
-            '01': 'Janeiro', '02': 'Fevereiro', '03': 'Março', '04': 'Abril',
-            '05': 'Maio', '06': 'Junho', '07': 'Julho', '08': 'Agosto',
-            '09': 'Setembro', '10': 'Outubro', '11': 'Novembro', '12': 'Dezembro'
+            1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril',
+            5: 'Maio', 6: 'Junho', 7: 'Julho', 8: 'Agosto',
+            9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'
         }
-        
-        for month_key, stats in sorted(monthly_stats.items()):
-            year, month = month_key.split('-')
-            month_name = f"{month_names.get(month, month)}/{year}"
+
+        periods_data = []
+        totals = {'presences': 0, 'absences': 0, 'total': 0}
+        for row in monthly:
             periods_data.append({
-                'period_name': month_name,
-                'presences': stats['presences'],
-                'absences': stats['absences'],
-                'total': stats['total']
+                'period_name': f"{month_names[row['month'].month]}/{row['month'].year}",
+                'presences': row['presences'],
+                'absences': row['absences'],
+                'total': row['total']
             })
-        
-        # Estatísticas totais
-        total_count = attendances.count()
-        total_presences = attendances.filter(present=True).count()
-        total_absences = total_count - total_presences
-        
+            for key in totals:
+                totals[key] += row[key]
+
         return Response({
             'periods': periods_data,
-            'total': {
-                'presences': total_presences,
-                'absences': total_absences,
-                'total': total_count
-            }
+            'total': totals
         })
 
 class AcademicPeriodViewSet(viewsets.ModelViewSet):
@@ -1448,7 +1718,7 @@ class StudentDailyChecklistViewSet(viewsets.ModelViewSet):
         # Verifica se a turma requer checklist
         try:
             classroom = ClassRoom.objects.get(pk=classroom_id)
-            config = StudentChecklistConfig.objects.filter(segment=classroom.segment, requires_checklist=True).first()
+            config = StudentChecklistConfig.objects.filter(segment_id=classroom.segment_id, requires_checklist=True).first()
             
             if not config:
                 return Response({"error": "Este segmento não requer checklist diário"}, status=400)
@@ -1463,47 +1733,53 @@ class StudentDailyChecklistViewSet(viewsets.ModelViewSet):
         if not (user.is_superuser or user.groups.filter(name__in=power_groups).exists() or has_assignment):
             return Response({"error": "Você não tem permissão para registrar checklist nesta turma"}, status=403)
 
-        enrollments = Enrollment.objects.filter(classroom=classroom, active=True)
+        try:
+            date_obj = datetime.strptime(str(date), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "Formato de data inválido. Use YYYY-MM-DD."}, status=400)
+
+        # Campos gravados conforme a configuração do segmento (os demais ficam com o padrão)
+        optional_fields = [
+            ('had_lunch', config.requires_lunch),
+            ('had_snack', config.requires_snack),
+            ('checkin_time', config.requires_checkin),
+            ('checkout_time', config.requires_checkout),
+        ]
+        fields = [name for name, required in optional_fields if required]
+
+        # Uma consulta verifica se todas as matrículas pertencem à turma (as demais são ignoradas)
+        requested = _records_by_enrollment(records)
+        if requested is None:
+            return Response({"error": "Registros inválidos: enrollment_id deve ser um número inteiro."}, status=400)
+        valid_ids = set(
+            Enrollment.objects.filter(classroom=classroom, active=True, pk__in=requested).values_list('pk', flat=True)
+        )
+        checklists = [
+            StudentDailyChecklist(
+                enrollment_id=enrollment_id,
+                date=date_obj,
+                observation=item.get('observation', ''),
+                registered_by=user,
+                **{name: item.get(name) for name in fields},
+            )
+            for enrollment_id, item in requested.items()
+            if enrollment_id in valid_ids
+        ]
 
         # Transaction Atomic
         with transaction.atomic():
-            created_count = 0
-            updated_count = 0
-            
-            for item in records:
-                enrollment_id = item.get('enrollment_id')
-                
-                # Verifica se a matrícula pertence à turma
-                if not enrollments.filter(pk=enrollment_id).exists():
-                    continue
-                
-                # Prepara os dados do checklist
-                checklist_data = {
-                    'had_lunch': item.get('had_lunch'),
-                    'had_snack': item.get('had_snack'),
-                    'checkin_time': item.get('checkin_time'),
-                    'checkout_time': item.get('checkout_time'),
-                    'observation': item.get('observation', ''),
-                    'registered_by': user
-                }
-                
-                # Remove campos None/vazios se não são obrigatórios
-                if not config.requires_lunch:
-                    checklist_data.pop('had_lunch', None)
-                if not config.requires_snack:
-                    checklist_data.pop('had_snack', None)
-                if not config.requires_checkin:
-                    checklist_data.pop('checkin_time', None)
-                if not config.requires_checkout:
-                    checklist_data.pop('checkout_time', None)
-                
-                obj, created = StudentDailyChecklist.objects.update_or_create(
-                    enrollment_id=enrollment_id,
-                    date=date,
-                    defaults=checklist_data
-                )
-                if created: created_count += 1
-                else: updated_count += 1
+            existing = set(
+                StudentDailyChecklist.objects.filter(enrollment_id__in=valid_ids, date=date_obj)
+                .values_list('enrollment_id', flat=True)
+            )
+            StudentDailyChecklist.objects.bulk_create(
+                checklists,
+                update_conflicts=True,
+                unique_fields=['enrollment', 'date'],
+                update_fields=fields + ['observation', 'registered_by', 'updated_at'],
+            )
+            created_count = len(checklists) - len(existing)
+            updated_count = len(existing)
 
         return Response({
             "message": "Checklist salvo com sucesso!",
@@ -1520,16 +1796,57 @@ class StudentDailyChecklistViewSet(viewsets.ModelViewSet):
         if not classroom_id or not date:
             return Response({"error": "Parâmetros 'classroom' e 'date' são obrigatórios"}, status=400)
 
-        enrollments = Enrollment.objects.filter(classroom_id=classroom_id, active=True)
-        checklists = StudentDailyChecklist.objects.filter(
-            enrollment__in=enrollments,
-            date=date
-        )
+        try:
+            date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "Formato de data inválido. Use YYYY-MM-DD."}, status=400)
 
-        serializer = self.get_serializer(checklists, many=True)
-        return Response(serializer.data)
+        if request.query_params.get('roster') not in ('1', 'true'):
+            checklists = StudentDailyChecklist.objects.filter(
+                enrollment__classroom_id=classroom_id,
+                enrollment__active=True,
+                date=date_obj
+            ).select_related('enrollment__student', 'enrollment__classroom', 'registered_by')
 
-class DashboardDataView(APIView):
+            serializer = self.get_serializer(checklists, many=True)
+            return Response(serializer.data)
+
+        # ?roster=1: um item por aluno ativo da turma, com ou sem checklist no dia
+        # (dispensa a consulta separada de matrículas no cliente)
+        enrollments = (
+            Enrollment.objects.filter(classroom_id=classroom_id, active=True)
+            .select_related('student', 'classroom')
+            .prefetch_related(Prefetch(
+                'daily_checklists',
+                queryset=StudentDailyChecklist.objects.filter(date=date_obj).select_related('registered_by'),
+                to_attr='day_checklists',
+            ))
+            .order_by('student__name', 'id')
+        )
+        rows = []
+        for enrollment in enrollments:
+            if enrollment.day_checklists:
+                rows.append(self.get_serializer(enrollment.day_checklists[0]).data)
+                continue
+            rows.append({
+                'id': None,
+                'enrollment': enrollment.id,
+                'student_name': enrollment.student.name,
+                'classroom_name': enrollment.classroom.name,
+                'date': date_obj.isoformat(),
+                'had_lunch': None,
+                'had_snack': None,
+                'checkin_time': None,
+                'checkout_time': None,
+                'observation': '',
+                'registered_by': None,
+                'registered_by_name': None,
+                'created_at': None,
+                'updated_at': None,
+            })
+        return Response(rows)
+
+class DashboardDataView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
@@ -1621,7 +1938,7 @@ class DashboardDataView(APIView):
         return Response(data)
 
 
-class DashboardRiskStudentsView(APIView):
+class DashboardRiskStudentsView(ReplicaReadMixin, APIView):
     """
     Lista alunos em risco (+5 faltas).
     Coordenadores: todas as turmas.
@@ -1667,7 +1984,43 @@ class DashboardRiskStudentsView(APIView):
         return Response(result)
 
 
-class ReportDiaryPDFView(APIView):
+class SearchView(APIView):
+    """
+    Busca textual unificada em Planejamentos, Conteúdos Ministrados e Relatórios.
+    Parâmetros: q (obrigatório), types (ex.: lesson_plan,student_report), limit.
+    Cada tipo respeita as mesmas regras de visibilidade das listagens.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        text = (request.query_params.get('q') or '').strip()
+        if len(text) < search.MIN_QUERY_LENGTH:
+            return Response(
+                {"error": f"Informe ao menos {search.MIN_QUERY_LENGTH} caracteres para a busca."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        types = None
+        raw_types = request.query_params.get('types')
+        if raw_types:
+            types = [t.strip() for t in raw_types.split(',') if t.strip()]
+            invalid = [t for t in types if t not in search.SEARCH_TYPES]
+            if invalid:
+                return Response(
+                    {"error": f"Tipos inválidos: {', '.join(invalid)}. Use: {', '.join(search.SEARCH_TYPES)}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        try:
+            limit = int(request.query_params.get('limit', search.DEFAULT_LIMIT))
+        except (TypeError, ValueError):
+            return Response({"error": "limit deve ser um número inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search.search_documents(request.user, text, types=types, limit=limit)
+        return Response({'query': text, 'count': len(results), 'results': results})
+
+
+class ReportDiaryPDFView(ReplicaReadMixin, APIView):
     """Diário de classe em PDF. Professor: suas turmas. Coordenador: escolhe turma."""
     permission_classes = [permissions.IsAuthenticated]
 
@@ -1675,7 +2028,7 @@ class ReportDiaryPDFView(APIView):
         return reports.generate_diary_report(request)
 
 
-class ReportAttendancePDFView(APIView):
+class ReportAttendancePDFView(ReplicaReadMixin, APIView):
     """Relatório de Frequências em PDF. Professor: suas turmas. Coordenador: escolhe turma."""
     permission_classes = [permissions.IsAuthenticated]
 
@@ -2089,6 +2442,8 @@ class AbsenceJustificationViewSet(viewsets.ModelViewSet):
         previous_status = serializer.instance.status if serializer.instance else None
         justification = serializer.save()
         if previous_status != justification.status:
+            # Aprovar/rejeitar muda "justified" da falta, que aparece no resumo da família.
+            family.invalidate_family_summary([justification.attendance.enrollment.student_id])
             register_access_audit(
                 request=self.request,
                 action='ABSENCE_JUSTIFICATION_STATUS_CHANGE',
@@ -2102,8 +2457,9 @@ class AbsenceJustificationViewSet(viewsets.ModelViewSet):
                 }
             )
 
-class TaughtContentViewSet(viewsets.ModelViewSet):
+class TaughtContentViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     queryset = TaughtContent.objects.all()
+    keyset_ordering = ('-date', '-id')
     serializer_class = TaughtContentSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['assignment', 'date'] # Permite filtrar por ID da atribuição ou data na URL
@@ -2134,38 +2490,37 @@ class SchoolEventViewSet(viewsets.ModelViewSet):
         if start and end:
             queryset = queryset.filter(start_time__range=[start, end])
 
-        # 1. COORDENADORES / DIREÇÃO / SECRETARIA
-        power_groups = self._POWER_GROUPS
-        
-        # Verifica se tem intersecção entre os grupos do usuário e a lista de poder
-        user_groups = set(user.groups.values_list('name', flat=True))
-        is_power_user = user.is_superuser or bool(set(power_groups) & user_groups)
+        # Regras de público compartilhadas com o feed ICS (calendar_feed.visible_events)
+        return calendar_feed.visible_events(user, queryset)
 
-        if is_power_user:
-            return queryset 
+    @action(detail=False, methods=['get', 'post', 'delete'], url_path='feed-token')
+    def feed_token(self, request):
+        """
+        Link de assinatura do calendário (ICS) do usuário.
+        GET: retorna (criando se preciso); POST: gera novo e revoga o anterior; DELETE: revoga.
+        """
+        user = request.user
+        active_tokens = CalendarFeedToken.objects.filter(user=user, revoked_at__isnull=True)
 
-        # 2. PROFESSORES
-        if user.groups.filter(name='Professores').exists():
-            return queryset.filter(target_audience__in=['ALL', 'TEACHERS', 'CLASSROOM'])
-
-        # 3. RESPONSÁVEIS
-        if user.groups.filter(name__in=['Responsáveis', 'Responsaveis', 'Pais']).exists():
-            guardian = Guardian.objects.filter(user=user).first()
-            if not guardian:
-                return queryset.filter(target_audience='ALL')
-
-            student_ids = guardian.students.values_list('id', flat=True)
-            my_classrooms_ids = Enrollment.objects.filter(
-                student__id__in=student_ids
-            ).values_list('classroom_id', flat=True).distinct()
-            
-            return queryset.filter(
-                Q(target_audience='ALL') | 
-                Q(target_audience='CLASSROOM', classroom__id__in=my_classrooms_ids)
-            ).distinct()
+        if request.method in ('POST', 'DELETE'):
+            revoked = active_tokens.update(revoked_at=timezone.now())
+            register_access_audit(
+                request=request,
+                action='CALENDAR_FEED_TOKEN_REVOKE' if request.method == 'DELETE' else 'CALENDAR_FEED_TOKEN_ROTATE',
+                resource_type='calendar_feed_token',
+                details={'revoked': revoked},
+            )
+            if request.method == 'DELETE':
+                return Response(status=status.HTTP_204_NO_CONTENT)
 
-        # 4. PADRÃO
-        return queryset.filter(target_audience='ALL')
+        feed = active_tokens.first() or CalendarFeedToken.objects.create(user=user)
+        feed_url = request.build_absolute_uri(reverse('calendar_feed', args=[feed.token]))
+        return Response({
+            'token': feed.token,
+            'url': feed_url,
+            'webcal_url': feed_url.replace('https://', 'webcal://').replace('http://', 'webcal://'),
+            'created_at': feed.created_at,
+        })
 
     def create(self, request, *args, **kwargs):
         user = request.user
@@ -2244,6 +2599,40 @@ class SchoolEventViewSet(viewsets.ModelViewSet):
             
         return False
 
+class CalendarFeedView(APIView):
+    """
+    Feed ICS por token (sem JWT: apps de calendário só conseguem usar a URL).
+    Responde 304 quando o If-None-Match bate com o ETag atual.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, token):
+        feed = CalendarFeedToken.objects.select_related('user').filter(
+            token=token, revoked_at__isnull=True, user__is_active=True
+        ).first()
+        if not feed:
+            raise Http404
+
+        body, etag = calendar_feed.get_feed(feed.user, host=request.get_host().split(':')[0])
+        quoted = quote_etag(etag)
+
+        # Atualiza no máximo uma vez por hora para não gravar a cada sincronização
+        now = timezone.now()
+        if not feed.last_used_at or now - feed.last_used_at > timedelta(hours=1):
+            CalendarFeedToken.objects.filter(pk=feed.pk).update(last_used_at=now)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (quoted in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+            response['Content-Disposition'] = 'inline; filename="calendario.ics"'
+        response['ETag'] = quoted
+        response['Cache-Control'] = 'private, max-age=300'
+        return response
+
+
 class ClassScheduleViewSet(viewsets.ModelViewSet):
     queryset = ClassSchedule.objects.all().order_by('day_of_week', 'start_time')
     serializer_class = ClassScheduleSerializer
@@ -2289,6 +2678,30 @@ class ClassScheduleViewSet(viewsets.ModelViewSet):
         self._assert_can_manage()
         return super().destroy(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post'], url_path='bulk-import')
+    def bulk_import(self, request):
+        """
+        Importa/substitui a grade horária em lote.
+        Body: {"mode": "replace"|"append", "dry_run": bool, "classrooms": [ids],
+               "entries": [{"classroom", "assignment", "day_of_week", "start_time", "end_time"}]}
+        Retorna todos os erros e conflitos (turma/professor) de uma vez, sem gravar nada.
+        """
+        self._assert_can_manage()
+        data = request.data
+        try:
+            summary = timetable.import_timetable(
+                data.get('entries'),
+                mode=data.get('mode') or 'replace',
+                classroom_ids=data.get('classrooms'),
+                dry_run=str(data.get('dry_run', '')).lower() in ('1', 'true'),
+            )
+        except timetable.TimetableImportError as exc:
+            return Response(
+                {"error": str(exc), "errors": exc.errors, "conflicts": exc.conflicts},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(summary, status=status.HTTP_200_OK)
+
     def get_queryset(self):
         user = self.request.user
         qs = (
@@ -2339,10 +2752,13 @@ class AcademicHistoryViewSet(viewsets.ModelViewSet):
         # Se estiver filtrando por aluno, vamos tentar injetar a matrícula atual visualmente
         student_id = request.query_params.get('student')
         if student_id:
-            # Pega matrículas ativas desse aluno
-            active_enrollments = Enrollment.objects.filter(student_id=student_id, active=True)
-            
-            for enroll in active_enrollments:
+            # Pega a matrícula atual (ponteiro desnormalizado) desse aluno, se ativa
+            student = Student.objects.filter(pk=student_id).select_related(
+                'current_enrollment__classroom__segment'
+            ).first()
+            enroll = student.current_enrollment if student else None
+
+            if enroll and enroll.active:
                 # Verifica se já não existe um histórico gravado para este ano (evita duplicata)
                 exists = self.get_queryset().filter(student_id=student_id, year=enroll.classroom.year).exists()
                 
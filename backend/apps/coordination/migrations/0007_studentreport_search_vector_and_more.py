@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0022_lessonplan_search_vector_taughtcontent_search_vector_and_more'),
+        ('coordination', '0006_meetingminute_guests'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentreport',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='studentreport',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='studentreport_search_gin'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:29
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY não trava escrita na tabela em produção;
+    # exige migração fora de transação.
+    atomic = False
+
+    dependencies = [
+        ('academic', '0027_hot_path_indexes'),
+        ('coordination', '0007_studentreport_search_vector_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='studentreport',
+            index=models.Index(condition=models.Q(('status', 'APPROVED'), ('visible_to_family', True)), fields=['student', '-date'], name='studentreport_family_idx'),
+        ),
+    ]
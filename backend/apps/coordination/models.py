@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from apps.academic.models import TeacherAssignment, Student
 
 class WeeklyReport(models.Model):
@@ -112,5 +114,33 @@ class StudentReport(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Índice de busca textual (mantido no save, ver apps/academic/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='studentreport_search_gin'),
+            # Relatórios liberados para a família, mais recentes por aluno.
+            models.Index(
+                fields=['student', '-date'],
+                condition=models.Q(status='APPROVED', visible_to_family=True),
+                name='studentreport_family_idx',
+            ),
+        ]
+
     def __str__(self):
-        return f"[{self.get_report_type_display()}] {self.student.name} - {self.subject}"
\ No newline at end of file
+        return f"[{self.get_report_type_display()}] {self.student.name} - {self.subject}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from apps.academic.family import invalidate_family_summary
+        from apps.academic.search import refresh_search_vector
+        refresh_search_vector(self)
+        invalidate_family_summary([self.student_id])
+
+    def delete(self, *args, **kwargs):
+        from apps.academic.family import invalidate_family_summary
+        student_id = self.student_id
+        result = super().delete(*args, **kwargs)
+        invalidate_family_summary([student_id])
+        return result
\ No newline at end of file
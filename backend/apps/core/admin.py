@@ -5,7 +5,11 @@ from django.core.mail import send_mail
 from django.utils.crypto import get_random_string
 from django.utils.html import strip_tags
 from django.conf import settings
-from .models import User, SchoolAccount, AccessAuditLog
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import User, SchoolAccount, AccessAuditLog, RequestProfile, SlowQuery
 from apps.academic.models import SchoolEvent
 from apps.core.audit import register_access_audit
 
@@ -235,4 +239,85 @@ class AccessAuditLogAdmin(admin.ModelAdmin):
     list_display = ('created_at', 'action', 'resource_type', 'resource_id', 'student_id', 'user', 'ip_address')
     search_fields = ('action', 'resource_type', 'resource_id', 'user__username', 'user__email')
     list_filter = ('action', 'resource_type', 'created_at')
-    readonly_fields = ('created_at', 'user', 'action', 'resource_type', 'resource_id', 'student_id', 'ip_address', 'user_agent', 'details')
\ No newline at end of file
+    readonly_fields = ('created_at', 'user', 'action', 'resource_type', 'resource_id', 'student_id', 'ip_address', 'user_agent', 'details')
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Perfis gerados pelo ProfilingMiddleware: só superusuários veem e baixam."""
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'db_ms', 'query_count', 'user', 'download_link')
+    search_fields = ('path', 'view_name', 'user__username')
+    list_filter = ('method', 'status_code', 'created_at')
+    readonly_fields = (
+        'created_at', 'user', 'method', 'path', 'query_string', 'view_name', 'status_code',
+        'duration_ms', 'db_ms', 'query_count', 'duplicate_queries', 'summary', 'download_link',
+    )
+    exclude = ('stats',)
+
+    def has_module_permission(self, request):
+        return request.user.is_active and request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_active and request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_active and request.user.is_superuser
+
+    def get_urls(self):
+        custom = [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='core_requestprofile_download',
+            ),
+        ]
+        return custom + super().get_urls()
+
+    @admin.display(description='Arquivo .prof')
+    def download_link(self, obj):
+        url = reverse('admin:core_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">baixar</a>', url)
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}-{profile.created_at:%Y%m%d-%H%M%S}.prof"'
+        return response
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Consultas lentas gravadas pelo SlowQueryMiddleware (somente leitura, só superusuários)."""
+    list_display = ('created_at', 'duration_ms', 'fingerprint', 'view_name', 'location', 'short_sql')
+    search_fields = ('sql', 'view_name', 'path', 'location', 'fingerprint')
+    list_filter = ('view_name', 'database', 'created_at')
+    readonly_fields = (
+        'created_at', 'duration_ms', 'fingerprint', 'database', 'view_name', 'path', 'location', 'sql', 'params', 'plan',
+    )
+
+    def has_module_permission(self, request):
+        return request.user.is_active and request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_active and request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_active and request.user.is_superuser
+
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        return obj.sql[:120] + ('…' if len(obj.sql) > 120 else '')
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+        from .metrics import instrument_db_connections, instrument_management_commands
+        instrument_management_commands()
+        instrument_db_connections()
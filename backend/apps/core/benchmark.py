@@ -0,0 +1,273 @@
+"""
+Benchmark dos endpoints críticos, executado em processo com o ``APIClient`` do
+DRF (sem rede nem servidor): mede a pilha Django/DRF + banco como o usuário a
+percebe, com autenticação forçada (sem custo de JWT).
+
+Para cada cenário: ``warmup`` requisições descartadas e ``iterations`` medidas.
+Latência de parede por requisição (p50/p95/média) e, via
+``connection.execute_wrapper``, número de consultas e tempo gasto no banco.
+Ao fim de cada requisição as conexões vencidas são fechadas como no servidor
+(o ``APIClient`` não faz isso), então ``connections_opened`` mostra quantas
+requisições medidas abriram conexão nova: ~0 com ``CONN_MAX_AGE`` > 0,
+``iterations`` com ``DB_CONN_MAX_AGE=0`` (e o custo de abrir entra no p50/p95).
+
+Os dados usados (professor, turma, data, responsável...) são escolhidos na
+base atual de forma determinística; o esperado é rodar sobre a massa do
+``generate_load_data``. A comparação com um baseline versionado acusa regressão
+de p95 (relativa, acima de um piso absoluto em ms), aumento de consultas e
+mudança de status HTTP.
+"""
+import json
+import platform
+import time
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .instrumentation import QueryStats
+
+BASELINE_VERSION = 1
+
+
+class BenchmarkError(Exception):
+    """Base sem os dados necessários para algum cenário."""
+
+
+def percentile(values, fraction):
+    """Percentil com interpolação linear (mesma regra do percentile_cont)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+# Cenários: (nome, perfil, método, caminho, corpo). Caminho/corpo são formatados
+# com os dados resolvidos em resolve_fixtures().
+SCENARIOS = [
+    ('attendance_daily_log', 'teacher', 'get',
+     '/api/attendance/daily-log/?date={date}&classroom={classroom}&subject={subject}', None),
+    ('attendance_bulk_save', 'coordinator', 'post', '/api/attendance/bulk_save/', 'attendance_payload'),
+    ('attendance_pending_overview', 'teacher', 'get', '/api/attendance/pending-overview/', None),
+    ('dashboard_data_coordinator', 'coordinator', 'get', '/api/dashboard/data/', None),
+    ('dashboard_data_teacher', 'teacher', 'get', '/api/dashboard/data/', None),
+    ('dashboard_risk_students', 'coordinator', 'get', '/api/dashboard/risk-students/', None),
+    ('student_report_card', 'guardian', 'get', '/api/students/{student}/report-card/', None),
+    ('lesson_plans_teacher', 'teacher', 'get', '/api/lesson-plans/?view_mode=teacher', None),
+    ('lesson_plans_coordinator', 'coordinator', 'get', '/api/lesson-plans/?status=SUBMITTED', None),
+    ('notifications', 'notified', 'get', '/api/notifications/', None),
+]
+SCENARIO_NAMES = [scenario[0] for scenario in SCENARIOS]
+
+
+def resolve_fixtures():
+    """Escolhe usuários e ids para os cenários; levanta BenchmarkError se faltar algo."""
+    from apps.academic.models import Attendance, ClassSchedule, Enrollment, Guardian
+    from apps.core.models import User
+
+    missing = []
+    coordinator = (
+        User.objects.filter(Q(is_superuser=True) | Q(groups__name='Coordenacao'), is_active=True)
+        .order_by('id').first()
+    )
+    if coordinator is None:
+        missing.append('usuário da coordenação (grupo Coordenacao ou superusuário)')
+
+    # Aula da grade da turma mais recente: define professor, turma, matéria e data.
+    schedule = (
+        ClassSchedule.objects.select_related('assignment__teacher')
+        .order_by('-classroom__year', 'classroom_id', 'id').first()
+    )
+    fixtures = {}
+    if schedule is None:
+        missing.append('grade horária (ClassSchedule)')
+    else:
+        assignment = schedule.assignment
+        last_date = (
+            Attendance.objects.filter(enrollment__classroom_id=assignment.classroom_id, subject_id=assignment.subject_id)
+            .order_by('-date').values_list('date', flat=True).first()
+        )
+        if last_date is None:
+            missing.append('frequências da turma/matéria escolhida')
+        enrollment_ids = list(
+            Enrollment.objects.filter(classroom_id=assignment.classroom_id, active=True)
+            .order_by('id').values_list('id', flat=True)
+        )
+        fixtures.update({
+            'teacher': assignment.teacher,
+            'classroom': assignment.classroom_id,
+            'subject': assignment.subject_id,
+            'date': last_date.isoformat() if last_date else None,
+            'attendance_payload': {
+                'classroom': assignment.classroom_id,
+                'subject': assignment.subject_id,
+                'date': last_date.isoformat() if last_date else None,
+                # Lote estável: regrava presença para todos (update, sem crescer a tabela).
+                'records': [{'enrollment_id': pk, 'present': True} for pk in enrollment_ids],
+            },
+        })
+
+    guardian = (
+        Guardian.objects.filter(user__isnull=False, students__current_enrollment__isnull=False)
+        .select_related('user').order_by('id').first()
+    )
+    if guardian is None:
+        missing.append('responsável com aluno matriculado')
+    else:
+        fixtures['guardian'] = guardian.user
+        fixtures['student'] = (
+            guardian.students.filter(current_enrollment__isnull=False).order_by('id').values_list('id', flat=True).first()
+        )
+
+    notified = (
+        User.objects.annotate(total=Count('notifications')).filter(total__gt=0).order_by('-total', 'id').first()
+    )
+    fixtures['notified'] = notified or fixtures.get('teacher')
+    fixtures['coordinator'] = coordinator
+
+    if missing:
+        raise BenchmarkError('Base sem dados para o benchmark: ' + '; '.join(missing) + '. Rode generate_load_data.')
+    return fixtures
+
+
+def _client(user):
+    from rest_framework.test import APIClient
+
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*',) and not host.startswith('.')]
+    extra = {}
+    if 'testserver' not in settings.ALLOWED_HOSTS and '*' not in settings.ALLOWED_HOSTS and hosts:
+        extra['HTTP_HOST'] = hosts[0]
+    client = APIClient(**extra)
+    client.force_authenticate(user=user)
+    return client
+
+
+def _finish_request():
+    """Fim de requisição como no WSGI (``request_finished``); dentro de transação (testes) não fecha nada."""
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+def run_scenario(scenario, fixtures, iterations, warmup):
+    name, role, method, path, body = scenario
+    client = _client(fixtures[role])
+    url = path.format(**fixtures)
+    payload = fixtures[body] if body else None
+
+    def call():
+        if method == 'get':
+            return client.get(url)
+        return client.generic(method.upper(), url, json.dumps(payload), content_type='application/json')
+
+    for _ in range(warmup):
+        call()
+        _finish_request()
+
+    opened = []
+
+    def count_opened(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    latencies, sql_times, query_counts, statuses = [], [], [], set()
+    connection_created.connect(count_opened)
+    try:
+        for _ in range(iterations):
+            stats = QueryStats()
+            with connection.execute_wrapper(stats):
+                started = time.perf_counter()
+                response = call()
+                elapsed = time.perf_counter() - started
+            latencies.append(elapsed * 1000)
+            sql_times.append(stats.duration * 1000)
+            query_counts.append(stats.count)
+            statuses.add(response.status_code)
+            _finish_request()
+    finally:
+        connection_created.disconnect(count_opened)
+
+    return {
+        'method': method.upper(),
+        'path': url,
+        'role': role,
+        'status': max(statuses),
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'queries': int(percentile(query_counts, 0.5)),
+        'queries_max': max(query_counts),
+        'sql_ms': round(percentile(sql_times, 0.5), 2),
+        'connections_opened': len(opened),
+    }
+
+
+def dataset_summary():
+    from apps.academic.models import Attendance, Grade, LessonPlan, Student
+    from apps.core.models import Notification
+
+    return {
+        'students': Student.objects.count(),
+        'attendance': Attendance.objects.count(),
+        'grades': Grade.objects.count(),
+        'lesson_plans': LessonPlan.objects.count(),
+        'notifications': Notification.objects.count(),
+    }
+
+
+def run_benchmark(names=None, iterations=20, warmup=2, progress=None):
+    fixtures = resolve_fixtures()
+    # Antes dos cenários: alguns gravam (bulk_save, notificações de pendência).
+    dataset = dataset_summary()
+    endpoints = {}
+    for scenario in SCENARIOS:
+        if names and scenario[0] not in names:
+            continue
+        endpoints[scenario[0]] = run_scenario(scenario, fixtures, iterations, warmup)
+        if progress:
+            progress(scenario[0], endpoints[scenario[0]])
+    return {
+        'version': BASELINE_VERSION,
+        'generated_at': timezone.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'db_version': getattr(connection, 'pg_version', None),
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'db_pool': bool(connection.settings_dict['OPTIONS'].get('pool')),
+        },
+        'dataset': dataset,
+        'iterations': iterations,
+        'endpoints': endpoints,
+    }
+
+
+def compare(results, baseline, latency_threshold=0.25, min_latency_delta_ms=5.0, query_threshold=0):
+    """
+    Regressões de ``results`` frente ao ``baseline`` (lista de mensagens).
+    Latência: p95 acima de (1 + latency_threshold) × baseline e, ao mesmo tempo,
+    pelo menos ``min_latency_delta_ms`` mais lento (evita ruído em endpoints rápidos).
+    Consultas: mediana acima do baseline + ``query_threshold``.
+    """
+    regressions = []
+    for name, current in results['endpoints'].items():
+        reference = baseline.get('endpoints', {}).get(name)
+        if reference is None:
+            continue
+        if current['status'] != reference['status']:
+            regressions.append(f"{name}: status {reference['status']} -> {current['status']}")
+        if current['queries'] > reference['queries'] + query_threshold:
+            regressions.append(f"{name}: consultas {reference['queries']} -> {current['queries']}")
+        limit = reference['p95_ms'] * (1 + latency_threshold)
+        if current['p95_ms'] > limit and current['p95_ms'] - reference['p95_ms'] >= min_latency_delta_ms:
+            regressions.append(
+                f"{name}: p95 {reference['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms "
+                f"(+{(current['p95_ms'] / max(reference['p95_ms'], 0.01) - 1) * 100:.0f}%)"
+            )
+    return regressions
@@ -0,0 +1,87 @@
+"""
+Validação da configuração de conexões com o banco (system checks).
+
+Roda em ``manage.py check``, ``migrate`` e ``runserver``: erros de
+configuração do pool ou das conexões persistentes aparecem antes do primeiro
+acesso ao banco. ``manage.py check --database default`` também abre uma
+conexão e compara o tamanho do pool com o ``max_connections`` do servidor.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, connections
+
+
+@register(Tags.database)
+def check_database_server(app_configs, databases=None, **kwargs):
+    messages = []
+    for alias in databases or []:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SHOW max_connections')
+                max_connections = int(cursor.fetchone()[0])
+        except (DatabaseError, ImproperlyConfigured) as exc:
+            messages.append(Error(
+                f"Não foi possível conectar ao banco '{alias}': {exc}",
+                hint='Confira DB_HOST, DB_PORT, DB_NAME, DB_USER e DB_PASSWORD no .env.',
+                id='core.E004',
+            ))
+            continue
+        pool = settings.DATABASES[alias].get('OPTIONS', {}).get('pool')
+        max_size = pool.get('max_size') if isinstance(pool, dict) else None
+        if max_size and max_size >= max_connections:
+            messages.append(Warning(
+                f"DB_POOL_MAX_SIZE ({max_size}) por processo não cabe no max_connections "
+                f"({max_connections}) do banco '{alias}'.",
+                hint='O total é DB_POOL_MAX_SIZE × número de workers; reduza o pool ou aumente max_connections.',
+                id='core.W002',
+            ))
+    return messages
+
+
+@register()
+def check_database_connections(app_configs, **kwargs):
+    messages = []
+    for alias, config in settings.DATABASES.items():
+        messages.extend(validate_connection_settings(alias, config))
+    return messages
+
+
+def validate_connection_settings(alias, config):
+    """Erros/avisos de CONN_MAX_AGE e do pool de um item de ``DATABASES``."""
+    messages = []
+    max_age = config.get('CONN_MAX_AGE', 0)
+    if max_age is not None and max_age < 0:
+        messages.append(Error(
+            f"CONN_MAX_AGE do banco '{alias}' não pode ser negativo ({max_age}).",
+            hint='Use DB_CONN_MAX_AGE=0 para fechar a conexão a cada requisição.',
+            id='core.E001',
+        ))
+    pool = config.get('OPTIONS', {}).get('pool')
+    if not pool:
+        return messages
+    pool = {} if pool is True else pool
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        messages.append(Error(
+            'DB_POOL=True exige psycopg 3 com o pool instalado.',
+            hint='pip install "psycopg[binary,pool]" ou desligue DB_POOL.',
+            id='core.E002',
+        ))
+        return messages
+    min_size, max_size = pool.get('min_size', 4), pool.get('max_size')
+    timeout = pool.get('timeout', 30)
+    if min_size < 0 or (max_size is not None and (max_size < 1 or max_size < min_size)) or timeout <= 0:
+        messages.append(Error(
+            f"Pool do banco '{alias}' inválido: min_size={min_size}, max_size={max_size}, timeout={timeout}.",
+            hint='Exige 0 <= DB_POOL_MIN_SIZE <= DB_POOL_MAX_SIZE, DB_POOL_MAX_SIZE >= 1 e DB_POOL_TIMEOUT > 0.',
+            id='core.E003',
+        ))
+    if max_age:
+        messages.append(Warning(
+            f"Banco '{alias}' com pool e CONN_MAX_AGE={max_age}: o pool substitui as conexões persistentes.",
+            id='core.W001',
+        ))
+    return messages
@@ -0,0 +1,177 @@
+"""
+Leitura em réplica (opt-in por view).
+
+Tudo continua indo para ``default``; só as views marcadas com
+``ReplicaReadMixin`` (ou ``@replica_reads``) fazem as leituras de GET/HEAD na
+réplica (alias ``replica``, configurado por ``DB_REPLICA_HOST``). Escritas
+feitas dentro dessas views (auditoria, notificações) continuam no ``default``.
+
+A réplica é ignorada, voltando para ``default``, quando:
+
+- não está configurada, não responde ou ``REPLICA_READS`` está desligado;
+- o atraso de replicação passa de ``REPLICA_MAX_LAG_SECONDS`` (medido no
+  máximo a cada ``REPLICA_LAG_CHECK_SECONDS`` por processo);
+- o usuário gravou algo há menos de ``REPLICA_STICKY_SECONDS`` (ele precisa
+  ver o que acabou de gravar). ``ReplicaStickinessMiddleware`` marca o usuário
+  após qualquer requisição de escrita num cookie assinado, que volta em
+  qualquer worker (o cache padrão é por processo), e também no cache.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+REPLICA_ALIAS = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'lumis_recent_write'
+_STICKY_SALT = 'lumis.db_routing.sticky'
+
+_read_alias = ContextVar('lumis_read_alias', default=None)
+_lag_state = {'checked_at': None, 'lag': None}
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def replica_lag():
+    """
+    Atraso da réplica em segundos ou None se inacessível. 0 fora de recuperação
+    e quando todo o WAL recebido já foi reaplicado (principal ocioso).
+    """
+    now = time.monotonic()
+    checked_at = _lag_state['checked_at']
+    if checked_at is not None and now - checked_at < getattr(settings, 'REPLICA_LAG_CHECK_SECONDS', 5):
+        return _lag_state['lag']
+    try:
+        with connections[REPLICA_ALIAS].cursor() as cursor:
+            cursor.execute(
+                "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+                "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )
+            lag = float(cursor.fetchone()[0])
+    except DatabaseError:
+        lag = None
+    _lag_state.update(checked_at=now, lag=lag)
+    return lag
+
+
+def reset_lag_cache():
+    _lag_state.update(checked_at=None, lag=None)
+
+
+def _sticky_key(user):
+    return f'replica:sticky:{user.pk}'
+
+
+def _sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+
+def mark_recent_write(user, response=None):
+    """
+    O usuário gravou: leituras dele vão para o default durante a janela de
+    stickiness. Com ``response``, a marca também vai num cookie assinado.
+    """
+    if not replica_configured() or user is None or not user.is_authenticated:
+        return
+    cache.set(_sticky_key(user), 1, _sticky_seconds())
+    if response is not None:
+        response.set_signed_cookie(
+            STICKY_COOKIE, str(user.pk), salt=_STICKY_SALT, max_age=_sticky_seconds(),
+            httponly=True, samesite='Lax', secure=not settings.DEBUG,
+        )
+
+
+def _recent_write(user, request):
+    if user is None or not user.is_authenticated:
+        return False
+    if request is not None:
+        try:
+            value = request.get_signed_cookie(STICKY_COOKIE, salt=_STICKY_SALT, max_age=_sticky_seconds())
+        except (KeyError, signing.BadSignature):
+            value = None
+        if value == str(user.pk):
+            return True
+    return bool(cache.get(_sticky_key(user)))
+
+
+def choose_read_alias(user, request=None):
+    if not replica_configured() or not getattr(settings, 'REPLICA_READS', True):
+        return 'default'
+    if _recent_write(user, request):
+        return 'default'
+    lag = replica_lag()
+    if lag is None or lag > getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5):
+        return 'default'
+    return REPLICA_ALIAS
+
+
+@contextmanager
+def read_alias_for(user, request=None):
+    token = _read_alias.set(choose_read_alias(user, request))
+    try:
+        yield _read_alias.get()
+    finally:
+        _read_alias.reset(token)
+
+
+def current_read_alias():
+    return _read_alias.get() or 'default'
+
+
+class ReplicaRouter:
+    """Leituras vão para o alias escolhido pela view (padrão: default); escritas e migrações só no default."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadMixin:
+    """
+    Views do DRF cujas leituras podem ir para a réplica. ``replica_actions``
+    restringe às actions listadas num ViewSet (None = todos os GET).
+    """
+    replica_actions = None
+
+    def initial(self, request, *args, **kwargs):
+        # Depois da autenticação/permissões: o usuário já é conhecido e o
+        # próprio lookup do token não passa pela réplica.
+        super().initial(request, *args, **kwargs)
+        action = getattr(self, 'action', None)
+        if request.method in SAFE_METHODS and (self.replica_actions is None or action in self.replica_actions):
+            self._replica_token = _read_alias.set(choose_read_alias(request.user, request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def replica_reads(view_func):
+    """Mesmo efeito do mixin para uma função/action (no ViewSet, logo abaixo do ``@action``)."""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        request = args[0] if hasattr(args[0], 'method') else args[1]
+        if request.method not in SAFE_METHODS:
+            return view_func(*args, **kwargs)
+        with read_alias_for(request.user, request):
+            return view_func(*args, **kwargs)
+    return wrapper
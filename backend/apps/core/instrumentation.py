@@ -0,0 +1,108 @@
+"""
+Coleta de consultas SQL por requisição (``connection.execute_wrapper``).
+
+``QueryStats`` só conta consultas e soma o tempo no banco (usado pelo
+benchmark). ``QueryCollector`` também agrupa as consultas pelo "formato"
+(fingerprint: SQL sem literais e com listas ``IN (...)`` colapsadas) para
+apontar N+1: a mesma consulta repetida N vezes numa requisição. Quando um
+formato atinge o limite, guarda uma única vez o ponto do código (arquivo da
+aplicação, linha e função) que disparou a consulta.
+"""
+import hashlib
+import re
+import time
+import traceback
+from functools import lru_cache
+
+from django.conf import settings
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+# Módulos de instrumentação (wrappers/middlewares): não contam como origem da consulta.
+_SKIPPED_FRAMES = tuple(
+    f'/apps/core/{name}.py' for name in ('instrumentation', 'middleware', 'slow_queries', 'profiling', 'metrics')
+)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Formato normalizado da consulta (mesma forma = mesmo fingerprint)."""
+    shape = _IN_LIST.sub('(...)', sql)
+    shape = _STRING.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+def fingerprint_id(shape):
+    return hashlib.sha1(shape.encode('utf-8')).hexdigest()[:12]
+
+
+def app_location():
+    """Último frame do código da aplicação (apps/) na pilha atual."""
+    base = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = frame.filename
+        if filename.startswith(base) and '/apps/' in filename and not filename.endswith(_SKIPPED_FRAMES):
+            return f"{filename[len(base) + 1:]}:{frame.lineno} in {frame.name}"
+    return None
+
+
+class QueryStats:
+    """``execute_wrapper`` que conta consultas e soma o tempo gasto nelas."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class QueryCollector(QueryStats):
+    """QueryStats + contagem por fingerprint e local das consultas repetidas."""
+
+    def __init__(self, duplicate_threshold=5):
+        super().__init__()
+        self.duplicate_threshold = duplicate_threshold
+        self.shapes = {}  # fingerprint -> [contagem, tempo, sql de exemplo, local]
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.duration += elapsed
+            self.count += 1
+            shape = fingerprint(sql)
+            entry = self.shapes.get(shape)
+            if entry is None:
+                self.shapes[shape] = [1, elapsed, sql, None]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if entry[0] == self.duplicate_threshold and entry[3] is None:
+                    entry[3] = app_location()
+
+    def duplicates(self):
+        """Formatos repetidos pelo menos ``duplicate_threshold`` vezes, do mais frequente ao menos."""
+        found = [
+            {
+                'fingerprint': fingerprint_id(shape),
+                'count': count,
+                'db_ms': round(duration * 1000, 2),
+                'sql': sample[:300],
+                'location': location,
+            }
+            for shape, (count, duration, sample, location) in self.shapes.items()
+            if count >= self.duplicate_threshold
+        ]
+        return sorted(found, key=lambda item: -item['count'])
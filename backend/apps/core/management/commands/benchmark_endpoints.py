@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.benchmark import SCENARIO_NAMES, BenchmarkError, compare, run_benchmark
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede p50/p95, consultas e tempo de SQL dos endpoints críticos (APIClient em processo) "
+        "e compara com o baseline versionado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Requisições medidas por endpoint.')
+        parser.add_argument('--warmup', type=int, default=2, help='Requisições descartadas antes da medição.')
+        parser.add_argument('--only', help=f"Endpoints separados por vírgula ({', '.join(SCENARIO_NAMES)}).")
+        parser.add_argument('--output', help='Grava o resultado completo em JSON neste arquivo.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Arquivo de baseline para comparação.')
+        parser.add_argument('--no-compare', action='store_true', help='Só mede, sem comparar com o baseline.')
+        parser.add_argument('--update-baseline', action='store_true', help='Grava o resultado como novo baseline.')
+        parser.add_argument('--latency-threshold', type=float, default=0.25,
+                            help='Aumento relativo de p95 tolerado (0.25 = 25%%).')
+        parser.add_argument('--min-latency-delta', type=float, default=5.0,
+                            help='Diferença mínima de p95 (ms) para contar como regressão.')
+        parser.add_argument('--query-threshold', type=int, default=0, help='Consultas extras toleradas por endpoint.')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError('--iterations deve ser positivo e --warmup não pode ser negativo.')
+        names = None
+        if options.get('only'):
+            names = {name.strip() for name in options['only'].split(',') if name.strip()}
+            unknown = names - set(SCENARIO_NAMES)
+            if unknown:
+                raise CommandError(f"Endpoint(s) desconhecido(s): {', '.join(sorted(unknown))}.")
+
+        self.stdout.write(
+            f"{'endpoint':<30} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'consultas':>9} {'sql ms':>9} {'conexões':>9}"
+        )
+
+        def progress(name, row):
+            line = (
+                f"{name:<30} {row['status']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+                f"{row['queries']:>9} {row['sql_ms']:>9.1f} {row['connections_opened']:>9}"
+            )
+            self.stdout.write(self.style.WARNING(line) if row['status'] >= 400 else line)
+
+        try:
+            results = run_benchmark(names, options['iterations'], options['warmup'], progress)
+        except BenchmarkError as exc:
+            raise CommandError(str(exc))
+
+        if options.get('output'):
+            Path(options['output']).write_text(json.dumps(results, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(f"Resultado gravado em {options['output']}.")
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Baseline atualizado: {baseline_path}."))
+            return
+        if options['no_compare']:
+            return
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f"Baseline não encontrado ({baseline_path}); nada a comparar."))
+            return
+
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+        if baseline.get('dataset') != results['dataset']:
+            self.stdout.write(self.style.WARNING(
+                f"Massa de dados diferente do baseline: {baseline.get('dataset')} x {results['dataset']}."
+            ))
+        connection_keys = ('conn_max_age', 'db_pool')
+        current_connections = {key: results['environment'].get(key) for key in connection_keys}
+        baseline_connections = {key: baseline.get('environment', {}).get(key) for key in connection_keys}
+        if baseline_connections != current_connections:
+            self.stdout.write(self.style.WARNING(
+                f"Conexões configuradas de outro modo que no baseline: {baseline_connections} x {current_connections}."
+            ))
+        regressions = compare(
+            results, baseline,
+            latency_threshold=options['latency_threshold'],
+            min_latency_delta_ms=options['min_latency_delta'],
+            query_threshold=options['query_threshold'],
+        )
+        if regressions:
+            for message in regressions:
+                self.stderr.write(f"  REGRESSÃO {message}")
+            raise CommandError(f"{len(regressions)} regressão(ões) frente ao baseline {baseline_path}.")
+        self.stdout.write(self.style.SUCCESS(f"Sem regressões frente ao baseline ({len(results['endpoints'])} endpoints)."))
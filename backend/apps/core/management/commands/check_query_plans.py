@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.plan_checks import PlanCheckError, run_plan_checks
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda EXPLAIN nas consultas quentes (frequência, matrículas, planejamentos, notificações, "
+        "relatórios, calendário) e falha se alguma não usar o índice esperado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force-index",
+            action="store_true",
+            help="Desliga seq scan (SET LOCAL enable_seqscan = off) e confere também as tabelas pequenas.",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Atualiza as estatísticas (ANALYZE) antes de conferir os planos.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = run_plan_checks(force_index=options["force_index"], analyze=options["analyze"])
+        except PlanCheckError as exc:
+            raise CommandError(str(exc))
+
+        for row in results:
+            if row["ok"] is None:
+                self.stdout.write(f"PULO  {row['name']:<36} tabela pequena demais para o plano natural")
+                continue
+            mark = "OK   " if row["ok"] else "FALHA"
+            used = ", ".join(row["indexes"]) or "seq scan"
+            self.stdout.write(f"{mark} {row['name']:<36} esperado {row['expected']:<44} usado: {used}")
+
+        failed = [row["name"] for row in results if row["ok"] is False]
+        if failed:
+            raise CommandError("Consultas sem o índice esperado: " + ", ".join(failed))
+        checked = sum(1 for row in results if row["ok"])
+        self.stdout.write(self.style.SUCCESS(f"{checked} planos conferidos, {len(results) - checked} pulados."))
@@ -0,0 +1,697 @@
+"""
+Gera uma massa de dados sintética e reprodutível para testes de carga,
+profiling e benchmarks.
+
+Ao contrário do ``seed_db`` (poucos registros, um ``create()`` por vez e banco
+zerado antes), este comando:
+
+- recebe o tamanho da escola por parâmetros (alunos, turmas, anos letivos,
+  densidade de frequência, notas por período, notificações, auditoria);
+- é determinístico: cada etapa usa um ``random.Random`` semeado por
+  ``--seed`` e nome da etapa, e os registros são gerados sempre na mesma ordem;
+- grava tudo com ``bulk_create`` em lotes (``--batch-size``), consumindo
+  geradores (frequência com milhões de linhas não fica inteira em memória);
+- monta grade horária sem conflitos de turma/professor, um calendário de
+  eventos (feriados, provas por turma, reuniões, eventos gerais) e os
+  planejamentos semanais de cada atribuição;
+- não apaga nada por padrão: os registros gerados são marcados pela ``--tag``
+  (usernames, matrículas e nomes de turma) e ``--wipe`` remove apenas eles.
+
+``bulk_create`` não passa pelos ``save()``: matrícula atual dos alunos e caches
+(resumo das famílias, feeds de calendário, estatísticas de notas) são
+atualizados ao final.
+"""
+import math
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.academic.analytics import invalidate_grade_analytics
+from apps.academic.autocomplete import normalize_digits, normalize_registration
+from apps.academic.calendar_feed import invalidate_calendar_feeds
+from apps.academic.family import invalidate_family_summary
+from apps.academic.models import (
+    AcademicPeriod, Attendance, ClassRoom, ClassSchedule, Enrollment, Grade, Guardian, LessonPlan,
+    SchoolEvent, Segment, Student, Subject, TeacherAssignment,
+)
+from apps.core.models import AccessAuditLog, Notification, User
+
+DEFAULT_PASSWORD = '123mudar'
+
+SUBJECT_NAMES = [
+    'Matemática', 'Língua Portuguesa', 'Ciências', 'História', 'Geografia',
+    'Inglês', 'Arte', 'Educação Física', 'Música', 'Francês', 'Filosofia', 'Tecnologia',
+]
+LEVELS = [
+    ('Nursery', 'Educação Infantil'), ('Reception', 'Educação Infantil'),
+    ('Year 1', 'Ensino Fundamental'), ('Year 2', 'Ensino Fundamental'), ('Year 3', 'Ensino Fundamental'),
+    ('Year 4', 'Ensino Fundamental'), ('Year 5', 'Ensino Fundamental'), ('Year 6', 'Ensino Fundamental'),
+    ('Year 7', 'Ensino Fundamental'), ('Year 8', 'Ensino Fundamental'), ('Year 9', 'Ensino Fundamental'),
+]
+FIRST_NAMES = [
+    'Ana', 'Arthur', 'Beatriz', 'Bento', 'Cecília', 'Davi', 'Eduarda', 'Enzo', 'Gabriel', 'Helena',
+    'Heitor', 'Isabela', 'João', 'Julia', 'Laura', 'Lorenzo', 'Manuela', 'Miguel', 'Maria', 'Nicolas',
+    'Olívia', 'Pedro', 'Rafael', 'Sofia', 'Theo', 'Valentina', 'Yasmin', 'Lucas', 'Alice', 'Bernardo',
+]
+LAST_NAMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas',
+]
+# (mês, dia) de início/fim dos bimestres
+BIMESTERS = [((2, 2), (4, 17)), ((4, 20), (7, 3)), ((7, 27), (10, 2)), ((10, 5), (12, 11))]
+NATIONAL_HOLIDAYS = [
+    ((1, 1), 'Confraternização Universal'), ((4, 21), 'Tiradentes'), ((5, 1), 'Dia do Trabalho'),
+    ((9, 7), 'Independência do Brasil'), ((10, 12), 'Nossa Senhora Aparecida'), ((11, 2), 'Finados'),
+    ((11, 15), 'Proclamação da República'), ((11, 20), 'Consciência Negra'), ((12, 25), 'Natal'),
+]
+# Aulas de 50 minutos: manhã (turmas pares) e tarde (turmas ímpares)
+SLOT_STARTS = {
+    'MORNING': [dt_time(7, 30), dt_time(8, 20), dt_time(9, 10), dt_time(10, 0), dt_time(10, 50)],
+    'AFTERNOON': [dt_time(13, 0), dt_time(13, 50), dt_time(14, 40), dt_time(15, 30), dt_time(16, 20)],
+}
+LESSON_MINUTES = 50
+SCHOOL_DAYS = (1, 2, 3, 4, 5)  # ClassSchedule: 1=Seg ... 5=Sex
+AUDIT_ACTIONS = [
+    ('PARENT_REPORT_CARD_PDF_VIEW', 'student_report_card_pdf'),
+    ('PARENT_ATTENDANCE_REPORT_VIEW', 'attendance_report'),
+    ('PARENT_CLASS_DIARY_VIEW', 'class_diary'),
+    ('PARENT_STUDENT_REPORT_LIST_VIEW', 'student_report_list'),
+    ('GRADEBOOK_BULK_SAVE', 'grade'),
+]
+NOTIFICATION_TITLES = [
+    ('Planejamento em atraso', '/teacher/planning'),
+    ('Novo relatório disponível', '/family/reports'),
+    ('Evento no calendário', '/calendar'),
+    ('Nota lançada', '/family/grades'),
+]
+
+
+def cpf_check_digits(base):
+    """Dígitos verificadores de um CPF (base com 9 dígitos)."""
+    digits = [int(d) for d in base]
+    for size in (9, 10):
+        total = sum(d * w for d, w in zip(digits, range(size + 1, 1, -1)))
+        digits.append((total * 10 % 11) % 10)
+    return ''.join(str(d) for d in digits[9:])
+
+
+def format_cpf(number):
+    base = f"{number:09d}"
+    raw = base + cpf_check_digits(base)
+    return f"{raw[:3]}.{raw[3:6]}.{raw[6:9]}-{raw[9:]}"
+
+
+def school_days(start, end, skip):
+    day = start
+    while day <= end:
+        if day.weekday() < 5 and day not in skip:
+            yield day
+        day += timedelta(days=1)
+
+
+def add_minutes(value, minutes):
+    return (datetime.combine(date.min, value) + timedelta(minutes=minutes)).time()
+
+
+class Plan:
+    """
+    Estrutura da escola calculada só em memória (índices, sem ids do banco).
+    Dry-run e execução percorrem o mesmo plano, com a mesma sequência aleatória.
+    """
+
+    def __init__(self, options):
+        self.seed = options['seed']
+        self.tag = options['tag']
+        self.students = options['students']
+        self.classrooms = options['classrooms']
+        self.subjects = options['subjects']
+        self.teachers = options['teachers'] or max(self.subjects, math.ceil(self.classrooms * self.subjects / 6))
+        self.years = list(range(options['start_year'], options['start_year'] + options['years']))
+        self.attendance_density = options['attendance_density']
+        self.grades_per_period = options['grades_per_period']
+        self.notifications = options['notifications']
+        self.audit_rows = options['audit_rows']
+        self.guardians = math.ceil(self.students * 2 / 3)  # ~1/3 dos alunos tem irmão na escola
+
+        self.periods = [
+            (year, number, date(year, *start), date(year, *end))
+            for year in self.years
+            for number, (start, end) in enumerate(BIMESTERS, start=1)
+        ]
+        self.teacher_for = self._teacher_for()
+        self.timetable = self._timetable()
+        self.holidays = {
+            date(year, month, day) for year in self.years for (month, day), _ in NATIONAL_HOLIDAYS
+        }
+
+    def rng(self, stage):
+        # Semente por etapa: mudar o tamanho de uma etapa não altera as demais.
+        return random.Random(f"{self.seed}:{stage}")
+
+    def classroom_name(self, year_index, index):
+        level, _ = LEVELS[index % len(LEVELS)]
+        letter = chr(ord('A') + (index // len(LEVELS)) % 26)
+        return f"{level} {letter} {self.years[year_index]} ({self.tag})"
+
+    def shift(self, index):
+        return 'MORNING' if index % 2 == 0 else 'AFTERNOON'
+
+    def _teacher_for(self):
+        """Professor de cada (turma, matéria): professores especializados por matéria."""
+        per_subject = max(1, self.teachers // self.subjects)
+        mapping = {}
+        for subject in range(self.subjects):
+            block = [(subject * per_subject + k) % self.teachers for k in range(per_subject)]
+            for classroom in range(self.classrooms):
+                mapping[(classroom, subject)] = block[classroom % len(block)]
+        return mapping
+
+    def _timetable(self):
+        """
+        Aulas semanais por turma (índice) -> lista de (matéria, dia, horário).
+        Alocação gulosa em ordem embaralhada pela semente; professor nunca fica em
+        duas turmas no mesmo horário (aula sem horário livre é descartada).
+        """
+        rng = self.rng('timetable')
+        busy = set()
+        timetable = {}
+        slots = [(day, slot) for day in SCHOOL_DAYS for slot in range(len(SLOT_STARTS['MORNING']))]
+        for classroom in range(self.classrooms):
+            shift = self.shift(classroom)
+            order = list(range(self.subjects))
+            rng.shuffle(order)
+            lessons = []
+            for position, subject in enumerate(order):
+                count = len(slots) // self.subjects + (1 if position < len(slots) % self.subjects else 0)
+                lessons.extend([subject] * count)
+            free = slots[:]
+            rng.shuffle(free)
+            placed = []
+            for subject in lessons:
+                teacher = self.teacher_for[(classroom, subject)]
+                for candidate in free:
+                    if (teacher, shift, candidate) not in busy:
+                        busy.add((teacher, shift, candidate))
+                        free.remove(candidate)
+                        placed.append((subject, candidate[0], SLOT_STARTS[shift][candidate[1]]))
+                        break
+            timetable[classroom] = sorted(placed, key=lambda item: (item[1], item[2]))
+        return timetable
+
+    def subjects_on(self, classroom, weekday):
+        """Matérias com aula na turma no dia (date.weekday(): 0=Seg)."""
+        return sorted({subject for subject, day, _ in self.timetable[classroom] if day == weekday + 1})
+
+
+class Command(BaseCommand):
+    help = 'Gera massa de dados sintética (determinística) para testes de carga e benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Alunos (matriculados em todos os anos).')
+        parser.add_argument('--classrooms', type=int, default=20, help='Turmas por ano letivo.')
+        parser.add_argument('--subjects', type=int, default=8, help=f'Matérias por turma (máx. {len(SUBJECT_NAMES)}).')
+        parser.add_argument('--teachers', type=int, default=0, help='Professores (padrão: ~6 atribuições cada).')
+        parser.add_argument('--years', type=int, default=2, help='Anos letivos.')
+        parser.add_argument('--start-year', type=int, default=None, help='Primeiro ano letivo (padrão: termina no ano atual).')
+        parser.add_argument('--attendance-density', type=float, default=1.0,
+                            help='Fração (0 a 1) das aulas com chamada lançada.')
+        parser.add_argument('--grades-per-period', type=int, default=3, help='Avaliações por matéria em cada bimestre.')
+        parser.add_argument('--notifications', type=int, default=5000, help='Notificações.')
+        parser.add_argument('--audit-rows', type=int, default=20000, help='Registros de auditoria de acesso.')
+        parser.add_argument('--seed', type=int, default=42, help='Semente (mesma semente = mesmos dados).')
+        parser.add_argument('--tag', default='lt', help='Marca dos registros gerados (usernames, matrículas, turmas).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tamanho dos lotes de bulk_create.')
+        parser.add_argument('--wipe', action='store_true', help='Remove antes os dados gerados com a mesma --tag.')
+        parser.add_argument('--dry-run', action='store_true', help='Percorre o plano e conta as linhas, sem gravar.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options.get('verbosity', 1)
+        self.batch_size = options['batch_size']
+        self.dry_run = bool(options.get('dry_run'))
+        if options['start_year'] is None:
+            options['start_year'] = timezone.localdate().year - options['years'] + 1
+        self._validate(options)
+        plan = Plan(options)
+        self.tag = plan.tag
+        self.counts = {}
+
+        started = time.monotonic()
+        mode_label = "SIMULAÇÃO" if self.dry_run else "EXECUÇÃO"
+        self.stdout.write(
+            f"--- Massa sintética '{plan.tag}' (seed {plan.seed}): {plan.students} alunos, "
+            f"{plan.classrooms} turmas x {len(plan.years)} ano(s) ({plan.years[0]}-{plan.years[-1]}), "
+            f"{plan.subjects} matérias, {plan.teachers} professores ---"
+        )
+
+        existing = User.objects.filter(username__startswith=f"{plan.tag}.").exists()
+        if existing and not options['wipe']:
+            raise CommandError(f"Já existem dados gerados com a tag '{plan.tag}'. Use --wipe ou outra --tag.")
+
+        if self.dry_run:
+            self._generate(plan, ids=None)
+        else:
+            with transaction.atomic():
+                if options['wipe'] and existing:
+                    self._wipe(plan.tag)
+                self._generate(plan, ids={})
+            # bulk_create/queryset.delete() não passam pelos save()/delete() dos modelos
+            invalidate_family_summary()
+            invalidate_calendar_feeds()
+            invalidate_grade_analytics(AcademicPeriod.objects.values_list('id', flat=True))
+
+        self.stdout.write("\nResumo:")
+        for label, total in self.counts.items():
+            self.stdout.write(f"  {label}: {total}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{mode_label} concluída em {time.monotonic() - started:.1f}s. "
+            f"Linhas: {sum(self.counts.values())}."
+        ))
+
+    def _validate(self, options):
+        if not 1 <= options['subjects'] <= len(SUBJECT_NAMES):
+            raise CommandError(f'--subjects deve estar entre 1 e {len(SUBJECT_NAMES)}.')
+        if not 0 <= options['attendance_density'] <= 1:
+            raise CommandError('--attendance-density deve estar entre 0 e 1.')
+        for name in ('students', 'classrooms', 'years', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} deve ser positivo.")
+        for name in ('teachers', 'grades_per_period', 'notifications', 'audit_rows'):
+            if options[name] < 0:
+                raise CommandError(f"--{name.replace('_', '-')} não pode ser negativo.")
+        if len(options['tag']) > 6 or not options['tag'].isalnum():
+            raise CommandError('--tag deve ser alfanumérica com até 6 caracteres.')
+
+    # --- gravação ---------------------------------------------------------
+
+    def _bulk(self, model, objects, label, ids_out=None):
+        """
+        Consome o iterável em lotes. Em dry-run só conta; na execução, se
+        ``ids_out`` for uma lista, acumula os pks criados (PostgreSQL devolve ids).
+        """
+        started = time.monotonic()
+        total = 0
+        iterator = iter(objects)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                break
+            if self.dry_run:
+                if ids_out is not None:
+                    ids_out.extend(range(total + 1, total + len(batch) + 1))
+            else:
+                model.objects.bulk_create(batch)
+                if ids_out is not None:
+                    ids_out.extend(obj.pk for obj in batch)
+            total += len(batch)
+            if self.verbosity >= 2:
+                self.stdout.write(f"  {label}: {total}")
+        self.counts[label] = self.counts.get(label, 0) + total
+        if self.verbosity >= 1:
+            self.stdout.write(f"{label}: {total} ({time.monotonic() - started:.1f}s)")
+        return ids_out
+
+    def _get_or_create_named(self, model, names):
+        """Reaproveita registros pelo nome (segmentos e matérias são da escola toda)."""
+        if self.dry_run:
+            return {name: index + 1 for index, name in enumerate(names)}
+        found = {}
+        for pk, name in model.objects.filter(name__in=names).order_by('id').values_list('id', 'name'):
+            found.setdefault(name, pk)
+        missing = [model(name=name) for name in names if name not in found]
+        model.objects.bulk_create(missing)
+        found.update({obj.name: obj.pk for obj in missing})
+        return found
+
+    def _periods(self, plan):
+        """Bimestres dos anos gerados; reaproveita os já cadastrados (mesmo nome e datas)."""
+        wanted = [(f"{number}º Bimestre {year}", start, end) for year, number, start, end in plan.periods]
+        if self.dry_run:
+            return [index + 1 for index in range(len(wanted))]
+        existing = {
+            (name, start, end): pk
+            for pk, name, start, end in AcademicPeriod.objects.filter(
+                name__in=[name for name, _, _ in wanted]
+            ).values_list('id', 'name', 'start_date', 'end_date')
+        }
+        missing = [AcademicPeriod(name=n, start_date=s, end_date=e) for n, s, e in wanted if (n, s, e) not in existing]
+        AcademicPeriod.objects.bulk_create(missing)
+        existing.update({(p.name, p.start_date, p.end_date): p.pk for p in missing})
+        self.counts['Períodos'] = len(missing)
+        return [existing[key] for key in wanted]
+
+    def _wipe(self, tag):
+        self.stdout.write(f"Removendo dados gerados anteriormente com a tag '{tag}'...")
+        users = User.objects.filter(username__startswith=f"{tag}.")
+        students = Student.objects.filter(registration_number__startswith=tag.upper())
+        SchoolEvent.objects.filter(created_by__in=users).delete()
+        AccessAuditLog.objects.filter(user__in=users).delete()
+        # Filhos primeiro: deletes em SQL direto, sem carregar milhões de linhas no coletor.
+        Attendance.objects.filter(enrollment__student__in=students).delete()
+        Grade.objects.filter(enrollment__student__in=students).delete()
+        students.update(current_enrollment=None)
+        Enrollment.objects.filter(student__in=students).delete()
+        students.delete()
+        ClassRoom.objects.filter(name__endswith=f"({tag})").delete()
+        Guardian.objects.filter(user__in=users).delete()
+        users.delete()
+
+    def _generate(self, plan, ids):
+        stage_users = plan.rng('people')
+        password = make_password(DEFAULT_PASSWORD) if not self.dry_run else ''
+
+        # Estrutura: segmentos, matérias, períodos, turmas
+        segments = self._get_or_create_named(Segment, sorted({segment for _, segment in LEVELS}))
+        subjects = self._get_or_create_named(Subject, SUBJECT_NAMES[:plan.subjects])
+        subject_ids = [subjects[name] for name in SUBJECT_NAMES[:plan.subjects]]
+        period_ids = self._periods(plan)
+
+        classroom_ids = self._bulk(ClassRoom, (
+            ClassRoom(
+                name=plan.classroom_name(y, c),
+                year=year,
+                segment_id=segments[LEVELS[c % len(LEVELS)][1]],
+            )
+            for y, year in enumerate(plan.years) for c in range(plan.classrooms)
+        ), 'Turmas', [])
+        classroom_at = {
+            (y, c): classroom_ids[y * plan.classrooms + c]
+            for y in range(len(plan.years)) for c in range(plan.classrooms)
+        }
+
+        # Pessoas: coordenação, professores, responsáveis
+        staff = [
+            User(username=f"{plan.tag}.coord", first_name='Coordenação', last_name=f"({plan.tag})",
+                 email=f"coord@{plan.tag}.lumis.test", is_coordinator=True, password=password),
+        ] + [
+            User(username=f"{plan.tag}.prof{t:04d}", first_name=stage_users.choice(FIRST_NAMES),
+                 last_name=stage_users.choice(LAST_NAMES), email=f"prof{t:04d}@{plan.tag}.lumis.test",
+                 is_teacher=True, is_staff=True, password=password)
+            for t in range(plan.teachers)
+        ]
+        guardian_names = [
+            f"{stage_users.choice(FIRST_NAMES)} {stage_users.choice(LAST_NAMES)} {stage_users.choice(LAST_NAMES)}"
+            for _ in range(plan.guardians)
+        ]
+        guardian_users = [
+            User(username=f"{plan.tag}.resp{g:05d}", first_name=name.split()[0], last_name=' '.join(name.split()[1:]),
+                 email=f"resp{g:05d}@{plan.tag}.lumis.test", password=password)
+            for g, name in enumerate(guardian_names)
+        ]
+        user_ids = self._bulk(User, staff + guardian_users, 'Usuários', [])
+        coordinator_id, teacher_ids = user_ids[0], user_ids[1:len(staff)]
+        guardian_user_ids = user_ids[len(staff):]
+
+        if not self.dry_run:
+            groups = {name: Group.objects.get_or_create(name=name)[0].pk
+                      for name in ('Coordenacao', 'Professores', 'Responsáveis')}
+            memberships = [User.groups.through(user_id=coordinator_id, group_id=groups['Coordenacao'])]
+            memberships += [User.groups.through(user_id=pk, group_id=groups['Professores']) for pk in teacher_ids]
+            memberships += [User.groups.through(user_id=pk, group_id=groups['Responsáveis']) for pk in guardian_user_ids]
+            self._bulk(User.groups.through, memberships, 'Grupos de usuário')
+
+        taken_cpfs = set() if self.dry_run else set(
+            Guardian.objects.filter(cpf_digits__startswith='9').values_list('cpf_digits', flat=True)
+        )
+
+        def guardians():
+            number = 900000000 + plan.seed % 1000 * 10000
+            for g, name in enumerate(guardian_names):
+                cpf = format_cpf(number)
+                while normalize_digits(cpf) in taken_cpfs:
+                    number += 1
+                    cpf = format_cpf(number)
+                number += 1
+                yield Guardian(
+                    user_id=guardian_user_ids[g], name=name, cpf=cpf, cpf_digits=normalize_digits(cpf),
+                    email=f"resp{g:05d}@{plan.tag}.lumis.test", phone=f"11 9{g:08d}"[:20],
+                )
+        guardian_ids = self._bulk(Guardian, guardians(), 'Responsáveis', [])
+
+        # Alunos (um "nível de desempenho" por aluno deixa as notas coerentes entre matérias)
+        stage_students = plan.rng('students')
+        ability = []
+
+        def students():
+            for i in range(plan.students):
+                guardian = guardian_names[i * 2 // 3]
+                registration = f"{plan.tag.upper()}{i:07d}"
+                ability.append(min(9.5, max(3.0, stage_students.gauss(7.2, 1.1))))
+                yield Student(
+                    name=f"{stage_students.choice(FIRST_NAMES)} {' '.join(guardian.split()[1:])}",
+                    registration_number=registration,
+                    registration_key=normalize_registration(registration),
+                    birth_date=date(plan.years[-1] - 4 - i % len(LEVELS), 1 + i % 12, 1 + i % 28),
+                    gender='MF'[i % 2],
+                    period=plan.shift(i % plan.classrooms),
+                    is_full_time=stage_students.random() < 0.3,
+                )
+        student_ids = self._bulk(Student, students(), 'Alunos', [])
+        self._bulk(Student.guardians.through, (
+            Student.guardians.through(student_id=student_ids[i], guardian_id=guardian_ids[i * 2 // 3])
+            for i in range(plan.students)
+        ), 'Vínculos aluno/responsável')
+
+        # Matrículas: aluno i fica na turma i % turmas em todos os anos; só a do último ano ativa.
+        enrollment_ids = self._bulk(Enrollment, (
+            Enrollment(
+                student_id=student_ids[i],
+                classroom_id=classroom_at[(y, i % plan.classrooms)],
+                active=(y == len(plan.years) - 1),
+            )
+            for y in range(len(plan.years)) for i in range(plan.students)
+        ), 'Matrículas', [])
+        roster = {}  # (ano, turma) -> [(índice do aluno, enrollment_id)]
+        for position, enrollment_id in enumerate(enrollment_ids):
+            y, i = divmod(position, plan.students)
+            roster.setdefault((y, i % plan.classrooms), []).append((i, enrollment_id))
+        if not self.dry_run:
+            Student.sync_current_enrollments(Student.objects.filter(id__in=student_ids))
+
+        # Atribuições e grade horária
+        assignment_keys = [
+            (y, c, s) for y in range(len(plan.years)) for c in range(plan.classrooms) for s in range(plan.subjects)
+        ]
+        assignment_ids = self._bulk(TeacherAssignment, (
+            TeacherAssignment(
+                teacher_id=teacher_ids[plan.teacher_for[(c, s)]],
+                subject_id=subject_ids[s],
+                classroom_id=classroom_at[(y, c)],
+            )
+            for y, c, s in assignment_keys
+        ), 'Atribuições', [])
+        assignment_at = dict(zip(assignment_keys, assignment_ids))
+        # ClassSchedule não tem ano: só as turmas do último ano recebem a grade semanal
+        # (a frequência dos anos anteriores segue o mesmo plano em memória).
+        current = len(plan.years) - 1
+        self._bulk(ClassSchedule, (
+            ClassSchedule(
+                classroom_id=classroom_at[(current, c)],
+                assignment_id=assignment_at[(current, c, subject)],
+                day_of_week=day,
+                start_time=start,
+                end_time=add_minutes(start, LESSON_MINUTES),
+            )
+            for c in range(plan.classrooms)
+            for subject, day, start in plan.timetable[c]
+        ), 'Grade horária')
+
+        self._events(plan, classroom_at, subject_ids, coordinator_id)
+        self._lesson_plans(plan, assignment_at)
+
+        # Frequência: cada aula da grade em dia letivo; a chamada é lançada com
+        # probabilidade --attendance-density e a falta segue a taxa do aluno.
+        stage_attendance = plan.rng('attendance')
+        absence_rate = [0.02 + 0.1 * (9.5 - a) / 6.5 for a in ability]
+
+        def attendances():
+            for p, (year, _, start, end) in enumerate(plan.periods):
+                y = plan.years.index(year)
+                for day in school_days(start, end, plan.holidays):
+                    for c in range(plan.classrooms):
+                        for s in plan.subjects_on(c, day.weekday()):
+                            if stage_attendance.random() >= plan.attendance_density:
+                                continue
+                            for i, enrollment_id in roster.get((y, c), ()):
+                                yield Attendance(
+                                    enrollment_id=enrollment_id,
+                                    subject_id=subject_ids[s],
+                                    date=day,
+                                    present=stage_attendance.random() >= absence_rate[i],
+                                    period_id=period_ids[p],
+                                )
+        self._bulk(Attendance, attendances(), 'Frequências')
+
+        # Notas: --grades-per-period avaliações por matéria em cada bimestre.
+        stage_grades = plan.rng('grades')
+        assessment_dates = {}
+
+        def grades():
+            for p, (year, _, start, end) in enumerate(plan.periods):
+                y = plan.years.index(year)
+                span = (end - start).days
+                for a in range(plan.grades_per_period):
+                    name = f"Avaliação {a + 1}"
+                    assessment_dates[(period_ids[p], name)] = start + timedelta(days=span * (a + 1) // (plan.grades_per_period + 1))
+                    weight = Decimal(stage_grades.choice(('1.00', '1.00', '2.00')))
+                    for c in range(plan.classrooms):
+                        for s in range(plan.subjects):
+                            for i, enrollment_id in roster.get((y, c), ()):
+                                value = min(10.0, max(0.0, stage_grades.gauss(ability[i], 1.2)))
+                                yield Grade(
+                                    enrollment_id=enrollment_id,
+                                    subject_id=subject_ids[s],
+                                    period_id=period_ids[p],
+                                    name=name,
+                                    value=Decimal(f"{value:.2f}"),
+                                    weight=weight,
+                                )
+        self._bulk(Grade, grades(), 'Notas')
+        if not self.dry_run:
+            # Grade.date é auto_now_add: ajusta a data de cada avaliação dentro do bimestre.
+            for (period_id, name), when in assessment_dates.items():
+                Grade.objects.filter(
+                    period_id=period_id, name=name, enrollment_id__in=enrollment_ids
+                ).update(date=when)
+
+        self._notifications_and_audit(plan, teacher_ids, guardian_user_ids, student_ids)
+
+    def _events(self, plan, classroom_at, subject_ids, coordinator_id):
+        stage = plan.rng('events')
+        tz = timezone.get_current_timezone()
+
+        def at(day, hour, minute=0):
+            return timezone.make_aware(datetime.combine(day, dt_time(hour, minute)), tz)
+
+        def events():
+            for y, year in enumerate(plan.years):
+                for (month, day), title in NATIONAL_HOLIDAYS:
+                    when = date(year, month, day)
+                    yield SchoolEvent(title=title, event_type='HOLIDAY', target_audience='ALL',
+                                      start_time=at(when, 0), end_time=at(when, 23, 59), created_by_id=coordinator_id)
+                recess = date(year, 7, 6)
+                yield SchoolEvent(title='Recesso escolar', event_type='HOLIDAY', target_audience='ALL',
+                                  start_time=at(recess, 0), end_time=at(recess + timedelta(days=18), 23, 59),
+                                  created_by_id=coordinator_id)
+                for month in range(2, 13):
+                    first = date(year, month, 1)
+                    meeting = first + timedelta(days=(2 - first.weekday()) % 7)  # 1ª quarta-feira
+                    yield SchoolEvent(title='Reunião pedagógica', event_type='MEETING', target_audience='TEACHERS',
+                                      start_time=at(meeting, 17, 30), end_time=at(meeting, 19),
+                                      created_by_id=coordinator_id)
+                for title, (month, day) in (('Festa Junina', (6, 20)), ('Mostra Cultural', (9, 26)),
+                                            ('Formatura', (12, 12))):
+                    when = date(year, month, day)
+                    yield SchoolEvent(title=title, event_type='EVENT', target_audience='ALL',
+                                      start_time=at(when, 9), end_time=at(when, 13), created_by_id=coordinator_id)
+                # Provas e entregas: uma por matéria e bimestre em cada turma, na segunda metade do bimestre.
+                for year_, number, start, end in plan.periods:
+                    if year_ != year:
+                        continue
+                    for c in range(plan.classrooms):
+                        for s in range(plan.subjects):
+                            day_ = start + timedelta(days=stage.randint((end - start).days // 2, (end - start).days))
+                            while day_.weekday() >= 5:
+                                day_ -= timedelta(days=1)
+                            kind = 'EXAM' if stage.random() < 0.7 else 'ASSIGNMENT'
+                            label = 'Prova' if kind == 'EXAM' else 'Entrega de trabalho'
+                            yield SchoolEvent(
+                                title=f"{label} {number}º bimestre - {SUBJECT_NAMES[s]}",
+                                event_type=kind, target_audience='CLASSROOM',
+                                classroom_id=classroom_at[(y, c)], subject_id=subject_ids[s],
+                                start_time=at(day_, 8), end_time=at(day_, 9, 40),
+                                created_by_id=coordinator_id,
+                            )
+        self._bulk(SchoolEvent, events(), 'Eventos')
+
+    def _lesson_plans(self, plan, assignment_at):
+        """
+        Um planejamento por semana letiva em cada atribuição. Semanas antigas já
+        vistadas (algumas devolvidas); as duas últimas de cada bimestre ainda em
+        envio/rascunho. O índice textual fica vazio (rode rebuild_search_index).
+        """
+        stage = plan.rng('lesson_plans')
+
+        def lesson_plans():
+            for p, (year, number, start, end) in enumerate(plan.periods):
+                y = plan.years.index(year)
+                monday = start - timedelta(days=start.weekday())
+                weeks = []
+                while monday <= end:
+                    weeks.append(monday)
+                    monday += timedelta(days=7)
+                for w, week in enumerate(weeks):
+                    recent = w >= len(weeks) - 2
+                    for c in range(plan.classrooms):
+                        for s in range(plan.subjects):
+                            if recent:
+                                status = stage.choice(('SUBMITTED', 'SUBMITTED', 'DRAFT'))
+                            else:
+                                status = 'RETURNED' if stage.random() < 0.05 else 'APPROVED'
+                            yield LessonPlan(
+                                assignment_id=assignment_at[(y, c, s)],
+                                start_date=week,
+                                end_date=week + timedelta(days=4),
+                                topic=f"{SUBJECT_NAMES[s]} - {number}º bimestre, semana {w + 1}",
+                                description=f"<p>Objetivos e atividades da semana {w + 1}.</p>",
+                                status=status,
+                            )
+        self._bulk(LessonPlan, lesson_plans(), 'Planejamentos')
+
+    def _notifications_and_audit(self, plan, teacher_ids, guardian_user_ids, student_ids):
+        stage = plan.rng('notifications')
+        recipients = list(teacher_ids) + list(guardian_user_ids)
+        notification_ids = self._bulk(Notification, (
+            Notification(
+                recipient_id=recipients[stage.randrange(len(recipients))],
+                title=title,
+                message=f"{title}.",
+                link=link,
+                # notificações antigas tendem a estar lidas
+                read=stage.random() < 0.95 - 0.7 * n / max(1, plan.notifications),
+            )
+            for n in range(plan.notifications)
+            for title, link in [stage.choice(NOTIFICATION_TITLES)]
+        ), 'Notificações', [])
+
+        stage = plan.rng('audit')
+        audit_ids = self._bulk(AccessAuditLog, (
+            AccessAuditLog(
+                user_id=guardian_user_ids[stage.randrange(len(guardian_user_ids))] if action.startswith('PARENT_')
+                else teacher_ids[stage.randrange(len(teacher_ids))],
+                action=action,
+                resource_type=resource_type,
+                resource_id=str(student_id),
+                student_id=student_id,
+                ip_address=f"10.0.{n % 250}.{n % 200 + 1}",
+                user_agent='lumis-load/1.0',
+            )
+            for n in range(plan.audit_rows)
+            for (action, resource_type), student_id in [
+                (stage.choice(AUDIT_ACTIONS), student_ids[stage.randrange(len(student_ids))])
+            ]
+        ), 'Auditoria', [])
+
+        if self.dry_run:
+            return
+        # created_at é auto_now_add: espalha as linhas geradas pelo período letivo, em ordem de id.
+        first_day = timezone.make_aware(datetime.combine(plan.periods[0][2], dt_time(8)))
+        last_day = timezone.make_aware(datetime.combine(plan.periods[-1][3], dt_time(18)))
+        for model, ids in ((Notification, notification_ids), (AccessAuditLog, audit_ids)):
+            if not ids:
+                continue
+            step = (last_day - first_day).total_seconds() / max(1, len(ids))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {model._meta.db_table} SET created_at = %s + (id - %s) * %s * interval '1 second' "
+                    f"WHERE id = ANY(%s)",
+                    [first_day, min(ids), step, ids],
+                )
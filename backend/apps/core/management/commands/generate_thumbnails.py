@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.academic.models import Student
+from apps.core.models import SchoolAccount
+from apps.core.thumbnails import generate_thumbnails, thumbnail_state
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as miniaturas de fotos de alunos e logos de escola que ainda não têm "
+        "(arquivos anteriores ao pipeline). Abre cada original uma única vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regera também as miniaturas que já existem.')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Tenta de novo os arquivos que falharam recentemente.')
+
+    def handle(self, *args, **options):
+        sources = (
+            ('fotos', Student.objects.exclude(photo='').exclude(photo__isnull=True).only('id', 'photo'), 'photo', True),
+            ('logos', SchoolAccount.objects.exclude(logo='').exclude(logo__isnull=True).only('id', 'logo'), 'logo', False),
+        )
+        for label, queryset, field, crop in sources:
+            generated = skipped = failed = 0
+            for obj in queryset.iterator(chunk_size=500):
+                fieldfile = getattr(obj, field)
+                state = thumbnail_state(fieldfile)
+                if (state == 'ready' and not options['force']) or (state == 'failed' and not options['retry_failed']):
+                    skipped += 1
+                    continue
+                if generate_thumbnails(fieldfile, crop=crop):
+                    generated += 1
+                else:
+                    failed += 1
+            line = f"{label}: {generated} geradas, {skipped} ignoradas, {failed} com falha."
+            self.stdout.write(self.style.WARNING(line) if failed else line)
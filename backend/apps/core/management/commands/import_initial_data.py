@@ -1,24 +1,40 @@
-from django.core.management.base import BaseCommand
+"""
+Carga inicial de Professores, Turmas, Alunos e Responsáveis.
+
+Pipeline em etapas, com custo de consultas independente do tamanho da fonte:
+
+1. leitura: as linhas (``;``) viram estruturas de staging, já deduplicadas;
+2. resolução: chaves existentes (usernames, nomes, CPFs, matrículas, turmas,
+   matérias, vínculos) são carregadas com poucas consultas de prefetch;
+3. geração em memória: usernames únicos, CPFs fictícios e matrículas novas são
+   calculados contra os conjuntos carregados, sem consulta por linha;
+4. gravação: ``bulk_create`` em lotes (``--batch-size``) numa transação.
+
+``bulk_create`` não passa pelos ``save()`` dos modelos: os campos normalizados
+(``cpf_digits``/``registration_key``) são preenchidos aqui e o resumo das
+famílias é invalidado ao final.
+"""
+import re
+import unicodedata
+
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from apps.core.models import User
+from django.db.models.functions import Lower
+
+from apps.academic.autocomplete import normalize_digits, normalize_registration
+from apps.academic.family import invalidate_family_summary
 from apps.academic.models import (
     Student, Guardian, Subject, ClassRoom, TeacherAssignment, Segment
 )
-import unicodedata
-import re
+from apps.core.models import User
 
-class Command(BaseCommand):
-    help = 'Importa dados reais de Professores, Alunos e Responsáveis com CPFs fictícios corrigidos'
+DEFAULT_PASSWORD = '123mudar'
+TITLES = ('Mrs.', 'Mr.', 'Ms.')
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write("--- Iniciando Carga de Dados Reais ---")
-        
-        group_teachers, _ = Group.objects.get_or_create(name='Professores')
-        group_guardians, _ = Group.objects.get_or_create(name='Responsáveis')
-        
-        # --- DADOS DOS PROFESSORES ---
-        DATA_TEACHERS = """
+# --- DADOS DOS PROFESSORES (Matéria;Turma;Professor) ---
+DATA_TEACHERS = """
 Geografia;Year 2 manhã e tarde - Fundamental;Mr.Francolino
 História;Year 3 manhã e tarde - Fundamental;Ms.Goulart
 Nave;Year 4 manhã - Fundamental;Ms.Gomes
@@ -35,8 +51,8 @@ Educação física;Year 1 - Infantil;Ms. Aguiar
 ;;Ms. Marfil
 """
 
-        # --- DADOS DOS ALUNOS ---
-        DATA_STUDENTS = """
+# --- DADOS DOS ALUNOS (Aluno;Responsável) ---
+DATA_STUDENTS = """
 Alexandre Hideki Maldonado;Raul Felipe Maldonado Herbas
 Alice Ribeiro de Moraes;Jair Ribeiro de Jesus Junior
 Aline Rosa Rodrigues;Elaine Cristina Rodrigues Rosa
@@ -280,147 +296,361 @@ Zach Braga Ribeiro dos Santos;Gabriel Braga Ribeiro dos Santos
 Zayan Muniz Ancelotti El Kadri;Natale Muniz
 """
 
-        # Funções Auxiliares
-        def clean_text(text):
-            if not text: return ""
-            return text.strip()
-
-        def generate_username(name):
-            nfkd_form = unicodedata.normalize('NFKD', name)
-            only_ascii = nfkd_form.encode('ASCII', 'ignore').decode('utf-8')
-            clean = re.sub(r'[^a-zA-Z0-9\s]', '', only_ascii).lower().split()
-            
-            if len(clean) >= 2:
-                base = f"{clean[0]}.{clean[-1]}"
-            else:
-                base = clean[0]
-            
-            counter = 1
-            username = base
-            while User.objects.filter(username=username).exists():
-                username = f"{base}{counter}"
-                counter += 1
-            return username
 
+def clean_text(text):
+    return (text or '').strip()
+
+
+def username_base(name):
+    nfkd_form = unicodedata.normalize('NFKD', name)
+    only_ascii = nfkd_form.encode('ASCII', 'ignore').decode('utf-8')
+    clean = re.sub(r'[^a-zA-Z0-9\s]', '', only_ascii).lower().split()
+    if not clean:
+        return 'usuario'
+    return f"{clean[0]}.{clean[-1]}" if len(clean) >= 2 else clean[0]
+
+
+def unique_username(name, taken):
+    """Gera o username contra o conjunto ``taken`` (já carregado) e o reserva."""
+    base = username_base(name)
+    username, counter = base, 1
+    while username in taken:
+        username = f"{base}{counter}"
+        counter += 1
+    taken.add(username)
+    return username
+
+
+def segment_for(classroom_name):
+    if any(word in classroom_name for word in ('Infantil', 'Nursery', 'Recepcion')):
+        return 'Educação Infantil'
+    if 'Fundamental' in classroom_name or 'Year' in classroom_name:
+        return 'Ensino Fundamental'
+    return None
+
+
+def parse_teachers(text):
+    """Linhas 'Matéria;Turma;Professor' -> lista de dicts (professor obrigatório)."""
+    rows = []
+    for line in text.strip().split('\n'):
+        parts = line.split(';')
+        if len(parts) < 3 or "Aulas" in line:
+            continue
+        teacher_name = clean_text(parts[2])
+        if not teacher_name:
+            continue
+        short_name = teacher_name
+        for title in TITLES:
+            short_name = short_name.replace(title, '')
+        rows.append({
+            'subject': clean_text(parts[0]),
+            'classroom': clean_text(parts[1]),
+            'teacher': teacher_name,
+            'teacher_short': short_name.strip(),
+        })
+    return rows
+
+
+def parse_students(text):
+    """
+    Linhas 'Aluno;Responsável' -> (lista de dicts, repetidas). Aluno repetido na
+    fonte vale pela primeira linha (as demais costumam ser grafias do mesmo responsável).
+    """
+    rows, seen, repeated = [], set(), 0
+    for line in text.strip().split('\n'):
+        parts = line.split(';')
+        if len(parts) < 2 or "Nome do Aluno" in line:
+            continue
+        student_name = clean_text(parts[0]).title()
+        guardian_name = clean_text(parts[1]).title()
+        if not student_name or not guardian_name:
+            continue
+        if student_name in seen:
+            repeated += 1
+            continue
+        seen.add(student_name)
+        rows.append({'student': student_name, 'guardian': guardian_name})
+    return rows, repeated
+
+
+def fake_cpf(number):
+    raw = f"{number:011d}"
+    return f"{raw[:3]}.{raw[3:6]}.{raw[6:9]}-{raw[9:]}"
+
+
+class Command(BaseCommand):
+    help = 'Importa dados reais de Professores, Alunos e Responsáveis (carga em lote, com CPFs fictícios)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers-file', help='Arquivo texto "Matéria;Turma;Professor" (padrão: dados embutidos).')
+        parser.add_argument('--students-file', help='Arquivo texto "Aluno;Responsável" (padrão: dados embutidos).')
+        parser.add_argument('--year', type=int, default=2026, help='Ano letivo das turmas novas e prefixo das matrículas.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Tamanho dos lotes de bulk_create.')
+        parser.add_argument('--dry-run', action='store_true', help='Resolve tudo e mostra o resumo, sem gravar.')
+
+    def _read(self, path, default):
+        if not path:
+            return default
+        try:
+            with open(path, encoding='utf-8-sig') as handle:
+                return handle.read()
+        except OSError as exc:
+            raise CommandError(f'Não foi possível ler {path}: {exc}')
+
+    def _progress(self, label, done, total):
+        if self.verbosity >= 1:
+            self.stdout.write(f"  {label}: {done}/{total}")
+
+    def _bulk_create(self, model, objects, label, **kwargs):
+        """bulk_create em lotes com progresso; no PostgreSQL os objetos voltam com pk."""
+        total = len(objects)
+        for start in range(0, total, self.batch_size):
+            model.objects.bulk_create(objects[start:start + self.batch_size], **kwargs)
+            self._progress(label, min(start + self.batch_size, total), total)
+        return objects
+
+    def _detail(self, message):
+        if self.verbosity >= 2:
+            self.stdout.write(f"  {message}")
+
+    def handle(self, *args, **options):
+        self.verbosity = options.get('verbosity', 1)
+        self.batch_size = options['batch_size']
+        dry_run = bool(options.get('dry_run'))
+        year = options['year']
+        if self.batch_size < 1:
+            raise CommandError('--batch-size deve ser positivo.')
+
+        self.stdout.write("--- Iniciando Carga de Dados Reais ---")
+
+        # 1) Leitura -> staging
+        teachers = parse_teachers(self._read(options.get('teachers_file'), DATA_TEACHERS))
+        students, repeated = parse_students(self._read(options.get('students_file'), DATA_STUDENTS))
+        self.stdout.write(f"Fonte: {len(teachers)} linha(s) de professores, {len(students)} aluno(s) ({repeated} repetido(s) ignorado(s)).")
+
+        # 2) Resolução das chaves existentes (poucas consultas, independente do volume)
+        person_names = {row['teacher'].lower() for row in teachers} | {row['guardian'].lower() for row in students}
+        users_by_name = {}
+        for user_id, name in (
+            User.objects.annotate(name_key=Lower('first_name'))
+            .filter(name_key__in=person_names)
+            .order_by('id')
+            .values_list('id', 'name_key')
+        ):
+            users_by_name.setdefault(name, user_id)
+        taken_usernames = set(User.objects.values_list('username', flat=True))
+        guardian_by_user = dict(
+            Guardian.objects.filter(user_id__in=users_by_name.values()).values_list('user_id', 'id')
+        )
+        taken_cpfs = set(Guardian.objects.values_list('cpf_digits', flat=True))
+        student_by_name = {}
+        for student_id, name in Student.objects.filter(
+            name__in=[row['student'] for row in students]
+        ).order_by('id').values_list('id', 'name'):
+            student_by_name.setdefault(name, student_id)
+        taken_registrations = set(
+            Student.objects.filter(registration_number__startswith=str(year)).values_list('registration_number', flat=True)
+        )
+        segment_by_name = dict(Segment.objects.values_list('name', 'id'))
+        subject_by_name = {}
+        for subject_id, name in Subject.objects.filter(
+            name__in={row['subject'] for row in teachers if row['subject']}
+        ).order_by('id').values_list('id', 'name'):
+            subject_by_name.setdefault(name, subject_id)
+        classroom_by_name = {}
+        for classroom_id, name in ClassRoom.objects.filter(
+            name__in={row['classroom'] for row in teachers if row['classroom']}
+        ).order_by('id').values_list('id', 'name'):
+            classroom_by_name.setdefault(name, classroom_id)
+        existing_assignments = set(
+            TeacherAssignment.objects.filter(teacher_id__in=users_by_name.values()).values_list('teacher_id', 'subject_id', 'classroom_id')
+        )
+        existing_links = set(
+            Student.guardians.through.objects.filter(student_id__in=student_by_name.values()).values_list('student_id', 'guardian_id')
+        )
+
+        # 3) Geração em memória (usernames, CPFs, matrículas) e objetos a gravar.
+        # Uma única senha inicial para todos: o hash é calculado uma vez (o PBKDF2 domina o custo por usuário).
+        password = make_password(DEFAULT_PASSWORD) if not dry_run else ''
+        summary = {key: 0 for key in (
+            'segments', 'subjects', 'classrooms', 'teachers', 'teachers_existing', 'guardian_users',
+            'guardian_users_existing', 'guardians', 'students', 'students_existing', 'links', 'assignments',
+            'skipped_classrooms',
+        )}
+
+        new_segments, new_subjects, new_classrooms = {}, {}, {}
+        new_users = {}  # nome (minúsculo) -> (User, grupo)
+        for row in teachers:
+            key = row['teacher'].lower()
+            if key in users_by_name or key in new_users:
+                continue
+            username = unique_username(row['teacher_short'], taken_usernames)
+            new_users[key] = (User(
+                username=username, first_name=row['teacher'], email=f"{username}@lumis.com",
+                is_staff=True, password=password,
+            ), 'Professores')
+            self._detail(f"[PROF] {row['teacher']} ({username})")
+
+        for row in teachers:
+            if row['subject'] and row['subject'] not in subject_by_name and row['subject'] not in new_subjects:
+                new_subjects[row['subject']] = Subject(name=row['subject'])
+            name = row['classroom']
+            if not name or name in classroom_by_name or name in new_classrooms:
+                continue
+            segment_name = segment_for(name)
+            if segment_name is None:
+                summary['skipped_classrooms'] += 1
+                self.stdout.write(self.style.WARNING(f"  Turma sem segmento reconhecido, ignorada: {name}"))
+                continue
+            if segment_name not in segment_by_name and segment_name not in new_segments:
+                new_segments[segment_name] = Segment(name=segment_name)
+            new_classrooms[name] = (ClassRoom(name=name, year=year), segment_name)
+
+        for row in students:
+            key = row['guardian'].lower()
+            if key in users_by_name or key in new_users:
+                continue
+            username = unique_username(row['guardian'], taken_usernames)
+            new_users[key] = (User(
+                username=username, first_name=row['guardian'], email=f"{username}@pais.com", password=password,
+            ), 'Responsáveis')
+            self._detail(f"[PAI] {row['guardian']} ({username})")
+
+        cpf_counter = 0
+        new_guardians = {}  # nome (minúsculo) -> Guardian
+        for row in students:
+            key = row['guardian'].lower()
+            if key in new_guardians or guardian_by_user.get(users_by_name.get(key)):
+                continue
+            cpf_counter += 1
+            while normalize_digits(fake_cpf(cpf_counter)) in taken_cpfs:
+                cpf_counter += 1
+            cpf = fake_cpf(cpf_counter)
+            new_guardians[key] = Guardian(
+                name=row['guardian'], cpf=cpf, cpf_digits=normalize_digits(cpf), phone='11999999999',
+            )
+
+        registration_counter = 0
+        new_students = {}
+        for row in students:
+            if row['student'] in student_by_name:
+                summary['students_existing'] += 1
+                continue
+            registration_counter += 1
+            while f"{year}{registration_counter:04d}" in taken_registrations:
+                registration_counter += 1
+            registration = f"{year}{registration_counter:04d}"
+            new_students[row['student']] = Student(
+                name=row['student'], registration_number=registration,
+                registration_key=normalize_registration(registration),
+            )
+            self._detail(f"[ALUNO] {row['student']} ({registration})")
+
+        summary.update({
+            'segments': len(new_segments),
+            'subjects': len(new_subjects),
+            'classrooms': len(new_classrooms),
+            'teachers': sum(1 for _, group in new_users.values() if group == 'Professores'),
+            'guardian_users': sum(1 for _, group in new_users.values() if group == 'Responsáveis'),
+            'teachers_existing': len({row['teacher'].lower() for row in teachers} & users_by_name.keys()),
+            'guardian_users_existing': len({row['guardian'].lower() for row in students} & users_by_name.keys()),
+            'guardians': len(new_guardians),
+            'students': len(new_students),
+        })
+
+        if dry_run:
+            # Vínculos e atribuições de registros novos ainda não têm id: conta pelas chaves.
+            summary['links'] = sum(
+                1 for row in students
+                if (student_by_name.get(row['student']), guardian_by_user.get(users_by_name.get(row['guardian'].lower())))
+                not in existing_links
+            )
+            summary['assignments'] = len({
+                (row['teacher'].lower(), row['subject'], row['classroom'])
+                for row in teachers
+                if row['subject'] and row['classroom'] and (row['classroom'] in classroom_by_name or row['classroom'] in new_classrooms)
+                and (users_by_name.get(row['teacher'].lower()), subject_by_name.get(row['subject']), classroom_by_name.get(row['classroom']))
+                not in existing_assignments
+            })
+            self._write_summary(summary, dry_run)
+            return
+
+        # 4) Gravação em lotes
         with transaction.atomic():
-            self.stdout.write("Processando Professores e Turmas...")
-            
-            for line in DATA_TEACHERS.strip().split('\n'):
-                parts = line.split(';')
-                if len(parts) < 3 or "Aulas" in line: continue
-                
-                subject_name = clean_text(parts[0])
-                classroom_raw = clean_text(parts[1])
-                teacher_name = clean_text(parts[2])
-                
-                if not teacher_name: continue
-
-                clean_t_name = teacher_name.replace("Mr.", "").replace("Ms.", "").replace("Mrs.", "").strip()
-                teacher_username = generate_username(clean_t_name)
-                
-                teacher_user, created = User.objects.get_or_create(
-                    username=teacher_username,
-                    defaults={
-                        'first_name': teacher_name,
-                        'email': f"{teacher_username}@lumis.com",
-                        'is_staff': True
-                    }
-                )
-                if created:
-                    teacher_user.set_password('123mudar')
-                    teacher_user.groups.add(group_teachers)
-                    teacher_user.save()
-                    self.stdout.write(f"  [PROF] Criado: {teacher_name}")
-
-                subject = None
-                if subject_name:
-                    subject, _ = Subject.objects.get_or_create(name=subject_name)
-
-                classroom = None
-                if classroom_raw:
-                    segment = None
-                    if "Infantil" in classroom_raw or "Nursery" in classroom_raw or "Recepcion" in classroom_raw:
-                        segment, _ = Segment.objects.get_or_create(name="Educação Infantil")
-                    elif "Fundamental" in classroom_raw or "Year" in classroom_raw:
-                        segment, _ = Segment.objects.get_or_create(name="Ensino Fundamental")
-                    
-                    classroom, _ = ClassRoom.objects.get_or_create(
-                        name=classroom_raw,
-                        defaults={'year': 2026, 'segment': segment}
-                    )
-
-                if teacher_user and subject and classroom:
-                    TeacherAssignment.objects.get_or_create(
-                        teacher=teacher_user,
-                        subject=subject,
-                        classroom=classroom
-                    )
-
-            self.stdout.write("\nProcessando Famílias...")
-            processed_students = set()
-            
-            global_counter = 1
-
-            for line in DATA_STUDENTS.strip().split('\n'):
-                parts = line.split(';')
-                if len(parts) < 2 or "Nome do Aluno" in line: continue
-                
-                student_name = clean_text(parts[0]).title()
-                guardian_name = clean_text(parts[1]).title()
-                
-                if not student_name or not guardian_name: continue
-                if student_name in processed_students: continue
-
-                # Responsável
-                g_username = generate_username(guardian_name)
-                guardian_user = User.objects.filter(first_name__iexact=guardian_name).first()
-                
-                if not guardian_user:
-                    guardian_user = User.objects.create(
-                        username=g_username,
-                        first_name=guardian_name,
-                        email=f"{g_username}@pais.com"
-                    )
-                    guardian_user.set_password('123mudar')
-                    guardian_user.groups.add(group_guardians)
-                    guardian_user.save()
-                    self.stdout.write(f"  [PAI] Criado: {guardian_name}")
-                
-                # CORREÇÃO CRÍTICA AQUI:
-                # Gerar CPF com 11 dígitos exatos
-                raw_nums = f"{global_counter:011d}"  # Ex: 00000000001
-                # Formatar: 000.000.000-01 (14 caracteres)
-                fake_cpf_fmt = f"{raw_nums[:3]}.{raw_nums[3:6]}.{raw_nums[6:9]}-{raw_nums[9:]}"
-                
-                guardian_profile, created = Guardian.objects.get_or_create(
-                    user=guardian_user,
-                    defaults={
-                        'name': guardian_name,
-                        'cpf': fake_cpf_fmt,
-                        'phone': '11999999999'
-                    }
-                )
-
-                # Aluno
-                # Usar matrícula curta para não estourar o limite
-                clean_name_slug = re.sub(r'[^a-zA-Z]', '', student_name.lower())[:10]
-                temp_matricula = f"T-{clean_name_slug}-{global_counter}"
-
-                student, created = Student.objects.get_or_create(
-                    name=student_name,
-                    defaults={
-                        'registration_number': temp_matricula
-                    }
-                )
-                
-                if created:
-                    student.registration_number = f"2026{student.id:04d}"
-                    student.save()
-                    self.stdout.write(f"  [ALUNO] Criado: {student_name}")
-                    processed_students.add(student_name)
-                
-                student.guardians.add(guardian_profile)
-                
-                global_counter += 1
-
-        self.stdout.write(self.style.SUCCESS('\nImportação Concluída com Sucesso!'))
\ No newline at end of file
+            groups = {name: Group.objects.get_or_create(name=name)[0] for name in ('Professores', 'Responsáveis')}
+
+            self._bulk_create(Segment, list(new_segments.values()), 'Segmentos')
+            segment_by_name.update({name: obj.pk for name, obj in new_segments.items()})
+            self._bulk_create(Subject, list(new_subjects.values()), 'Matérias')
+            subject_by_name.update({name: obj.pk for name, obj in new_subjects.items()})
+            for classroom, segment_name in new_classrooms.values():
+                classroom.segment_id = segment_by_name[segment_name]
+            self._bulk_create(ClassRoom, [classroom for classroom, _ in new_classrooms.values()], 'Turmas')
+            classroom_by_name.update({name: obj.pk for name, (obj, _) in new_classrooms.items()})
+
+            self._bulk_create(User, [user for user, _ in new_users.values()], 'Usuários')
+            users_by_name.update({key: user.pk for key, (user, _) in new_users.items()})
+            self._bulk_create(
+                User.groups.through,
+                [User.groups.through(user_id=user.pk, group_id=groups[group].pk) for user, group in new_users.values()],
+                'Grupos',
+                ignore_conflicts=True,
+            )
+
+            for key, guardian in new_guardians.items():
+                guardian.user_id = users_by_name[key]
+            self._bulk_create(Guardian, list(new_guardians.values()), 'Responsáveis')
+            guardian_by_user.update({guardian.user_id: guardian.pk for guardian in new_guardians.values()})
+
+            self._bulk_create(Student, list(new_students.values()), 'Alunos')
+            student_by_name.update({name: obj.pk for name, obj in new_students.items()})
+
+            links = {
+                (student_by_name[row['student']], guardian_by_user[users_by_name[row['guardian'].lower()]])
+                for row in students
+            } - existing_links
+            self._bulk_create(
+                Student.guardians.through,
+                [Student.guardians.through(student_id=s, guardian_id=g) for s, g in sorted(links)],
+                'Vínculos aluno/responsável',
+                ignore_conflicts=True,
+            )
+            summary['links'] = len(links)
+
+            assignments = {
+                (users_by_name[row['teacher'].lower()], subject_by_name[row['subject']], classroom_by_name[row['classroom']])
+                for row in teachers
+                if row['subject'] and row['classroom'] in classroom_by_name
+            } - existing_assignments
+            self._bulk_create(
+                TeacherAssignment,
+                [TeacherAssignment(teacher_id=t, subject_id=s, classroom_id=c) for t, s, c in sorted(assignments)],
+                'Atribuições',
+                ignore_conflicts=True,
+            )
+            summary['assignments'] = len(assignments)
+
+        # bulk_create não passa por Student.save(): novos vínculos mudam o resumo das famílias.
+        invalidate_family_summary({student_id for student_id, _ in links})
+        self._write_summary(summary, dry_run)
+
+    def _write_summary(self, summary, dry_run):
+        lines = [
+            ('Segmentos', summary['segments'], None),
+            ('Matérias', summary['subjects'], None),
+            ('Turmas', summary['classrooms'], summary['skipped_classrooms'] and f"{summary['skipped_classrooms']} ignorada(s)"),
+            ('Professores', summary['teachers'], f"{summary['teachers_existing']} existente(s)"),
+            ('Usuários de responsáveis', summary['guardian_users'], f"{summary['guardian_users_existing']} existente(s)"),
+            ('Perfis de responsável', summary['guardians'], None),
+            ('Alunos', summary['students'], f"{summary['students_existing']} existente(s)"),
+            ('Vínculos aluno/responsável', summary['links'], None),
+            ('Atribuições', summary['assignments'], None),
+        ]
+        self.stdout.write("\nResumo:")
+        for label, created, extra in lines:
+            self.stdout.write(f"  {label}: {created} novo(s)" + (f" ({extra})" if extra else ''))
+        mode_label = "SIMULAÇÃO" if dry_run else "EXECUÇÃO"
+        self.stdout.write(self.style.SUCCESS(
+            f"{mode_label} concluída. Alunos novos: {summary['students']}, responsáveis novos: {summary['guardians']}, "
+            f"professores novos: {summary['teachers']}."
+        ))
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Sum
+from django.utils import timezone
+
+from apps.core.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = "Resume as consultas lentas gravadas (SlowQuery) por formato, ordenadas pelo tempo total."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7, help="Janela em dias (padrão: 7).")
+        parser.add_argument("--limit", type=int, default=20, help="Quantos formatos listar (padrão: 20).")
+        parser.add_argument("--view", help="Filtra por nome da view (ex.: dashboard-risk-students).")
+        parser.add_argument(
+            "--show-plan",
+            action="store_true",
+            help="Mostra o plano (nó raiz e custo) da execução mais lenta de cada formato.",
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"])
+        qs = SlowQuery.objects.filter(created_at__gte=since)
+        if options.get("view"):
+            qs = qs.filter(view_name=options["view"])
+
+        offenders = list(
+            qs.values("fingerprint")
+            .annotate(
+                total=Sum("duration_ms"), calls=Count("id"), mean=Avg("duration_ms"), worst=Max("duration_ms"),
+            )
+            .order_by("-total")[: options["limit"]]
+        )
+        if not offenders:
+            self.stdout.write(self.style.SUCCESS(f"Nenhuma consulta lenta nos últimos {options['days']} dias."))
+            return
+
+        self.stdout.write(f"{'formato':<12} {'total ms':>10} {'exec.':>6} {'média':>8} {'pior':>8}  views / origem")
+        for row in offenders:
+            sample = qs.filter(fingerprint=row["fingerprint"]).order_by("-duration_ms").first()
+            views = sorted(set(qs.filter(fingerprint=row["fingerprint"]).values_list("view_name", flat=True)) - {""})
+            self.stdout.write(
+                f"{row['fingerprint']:<12} {row['total']:>10.0f} {row['calls']:>6} {row['mean']:>8.0f} {row['worst']:>8.0f}"
+                f"  {', '.join(views) or '-'} | {sample.location or '-'}"
+            )
+            self.stdout.write(f"    {' '.join(sample.sql.split())[:200]}")
+            if options["show_plan"] and sample.plan:
+                root = sample.plan[0]["Plan"]
+                self.stdout.write(
+                    f"    plano: {root.get('Node Type')} custo={root.get('Total Cost')} linhas~{root.get('Plan Rows')}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(offenders)} formatos de consulta lenta em {options['days']} dias."))
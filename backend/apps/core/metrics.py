@@ -0,0 +1,323 @@
+"""
+Métricas no formato texto do Prometheus, sem serviço externo.
+
+Cada processo (worker do gunicorn, comando de manutenção) acumula contadores,
+histogramas e gauges em memória e grava periodicamente um arquivo JSON próprio
+em ``METRICS_DIR`` (``<pid>-<início>.json``, troca atômica). O endpoint
+``/metrics`` soma os arquivos de todos os processos, então qualquer worker
+responde pelo conjunto. Contadores e histogramas são somados; gauges guardam o
+maior valor (usados para "último sucesso" dos comandos). As filas de trabalho
+pendente são contadas no banco na hora da coleta.
+
+Arquivos de processos encerrados continuam valendo (os contadores são
+cumulativos); ``METRICS_DIR`` deve ser limpo ao reiniciar o serviço.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+COMMAND_BUCKETS = (1, 5, 15, 60, 300, 900, 1800, 3600, 7200)
+
+# Comandos interativos/longos ou de desenvolvimento não são medidos.
+SKIPPED_COMMANDS = {'runserver', 'shell', 'dbshell', 'test', 'testserver', 'makemigrations', 'showmigrations'}
+
+
+def _enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def _label_key(labels):
+    return json.dumps(sorted(labels.items()), ensure_ascii=False)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name}: rótulos esperados {self.labelnames}, recebidos {tuple(labels)}')
+        return _label_key({name: str(value) for name, value in labels.items()})
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if _enabled():
+            registry.update(self.name, self._key(labels), lambda value: (value or 0) + amount)
+
+
+class Gauge(Metric):
+    """Gauge agregado pelo maior valor entre os processos."""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        if _enabled():
+            registry.update(self.name, self._key(labels), lambda _: value)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, amount, **labels):
+        if not _enabled():
+            return
+        position = next((i for i, bound in enumerate(self.buckets) if amount <= bound), len(self.buckets))
+
+        def apply(value):
+            value = value or {'b': [0] * (len(self.buckets) + 1), 's': 0.0, 'c': 0}
+            value['b'][position] += 1
+            value['s'] += amount
+            value['c'] += 1
+            return value
+
+        registry.update(self.name, self._key(labels), apply)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._filename = f'{self._pid}-{int(time.time() * 1000)}.json'
+        self._values = {}
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def update(self, name, key, apply):
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Processo filho (fork do gunicorn): não herda os valores do pai.
+                self._reset()
+            series = self._values.setdefault(name, {})
+            series[key] = apply(series.get(key))
+            self._dirty = True
+
+    def directory(self):
+        return str(getattr(settings, 'METRICS_DIR'))
+
+    def flush(self, force=False):
+        """Grava o arquivo deste processo (no máximo a cada METRICS_FLUSH_SECONDS, salvo ``force``)."""
+        if not self._dirty or os.getpid() != self._pid:
+            return
+        interval = getattr(settings, 'METRICS_FLUSH_SECONDS', 5)
+        if not force and time.monotonic() - self._last_flush < interval:
+            return
+        with self._lock:
+            payload = json.dumps(self._values, ensure_ascii=False)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        directory = self.directory()
+        path = os.path.join(directory, self._filename)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as handle:
+                handle.write(payload)
+            os.replace(path + '.tmp', path)
+        except OSError as exc:
+            logger.warning('Não foi possível gravar métricas em %s: %s', directory, exc)
+
+    def collect(self):
+        """Valores somados de todos os processos: {nome: {rótulos: valor}}."""
+        self.flush(force=True)
+        merged = {}
+        directory = self.directory()
+        try:
+            filenames = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        except FileNotFoundError:
+            filenames = []
+        for filename in filenames:
+            try:
+                with open(os.path.join(directory, filename), encoding='utf-8') as handle:
+                    data = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            for name, series in data.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                target = merged.setdefault(name, {})
+                for key, value in series.items():
+                    target[key] = _merge(metric.kind, target.get(key), value)
+        return merged
+
+
+def _merge(kind, current, value):
+    if current is None:
+        return value
+    if kind == 'counter':
+        return current + value
+    if kind == 'gauge':
+        return max(current, value)
+    if len(current['b']) != len(value['b']):
+        return current  # buckets mudaram entre versões: mantém o primeiro
+    return {
+        'b': [a + b for a, b in zip(current['b'], value['b'])],
+        's': current['s'] + value['s'],
+        'c': current['c'] + value['c'],
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels_text(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+atexit.register(lambda: registry.flush(force=True))
+
+
+http_request_duration = Histogram(
+    'lumis_http_request_duration_seconds', 'Latência das requisições HTTP.', ['view', 'action', 'method', 'status'],
+)
+http_request_db_duration = Histogram(
+    'lumis_http_request_db_seconds', 'Tempo gasto no banco por requisição.', ['view', 'action'],
+)
+http_request_queries = Counter(
+    'lumis_http_request_queries_total', 'Consultas SQL executadas pelas requisições.', ['view', 'action'],
+)
+pdf_render_duration = Histogram(
+    'lumis_pdf_render_seconds', 'Tempo de renderização de PDF (WeasyPrint).', ['report'],
+)
+pdf_render_size = Histogram(
+    'lumis_pdf_render_bytes', 'Tamanho dos PDFs gerados.', ['report'], buckets=SIZE_BUCKETS,
+)
+command_duration = Histogram(
+    'lumis_command_duration_seconds', 'Duração dos comandos de manutenção.', ['command', 'status'],
+    buckets=COMMAND_BUCKETS,
+)
+command_last_success = Gauge(
+    'lumis_command_last_success_timestamp_seconds', 'Horário (epoch) da última execução com sucesso.', ['command'],
+)
+db_connections_opened = Counter(
+    'lumis_db_connections_opened_total',
+    'Conexões abertas pelo Django (no modo pool, retiradas do pool).', ['alias'],
+)
+http_request_db_connection = Counter(
+    'lumis_http_request_db_connection_total',
+    'Requisições que usaram o banco, por conexão reaproveitada ou aberta na própria requisição.',
+    ['alias', 'state'],
+)
+
+
+def queue_depths():
+    """Trabalho pendente aguardando revisão/processamento (contado no banco na coleta)."""
+    from apps.academic.models import AbsenceJustification, LessonPlan
+    from apps.coordination.models import StudentReport
+    from apps.core.models import Notification
+
+    return {
+        'absence_justifications_pending': AbsenceJustification.objects.filter(status='PENDING').count(),
+        'lesson_plans_submitted': LessonPlan.objects.filter(status='SUBMITTED').count(),
+        'student_reports_pending': StudentReport.objects.filter(status='PENDING').count(),
+        'notifications_unread': Notification.objects.filter(read=False).count(),
+    }
+
+
+def render_text():
+    """Exposição no formato texto 0.0.4 do Prometheus."""
+    merged = registry.collect()
+    lines = []
+    for name, metric in sorted(registry.metrics.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(merged.get(name, {}).items()):
+            pairs = [tuple(pair) for pair in json.loads(key)]
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_labels_text(pairs)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), value['b']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels_text(pairs + [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_labels_text(pairs)} {_number(value["s"])}')
+            lines.append(f'{name}_count{_labels_text(pairs)} {value["c"]}')
+
+    lines.append('# HELP lumis_queue_depth Itens pendentes por fila de trabalho.')
+    lines.append('# TYPE lumis_queue_depth gauge')
+    for queue, depth in queue_depths().items():
+        lines.append(f'lumis_queue_depth{_labels_text([("queue", queue)])} {depth}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_pdf(html, report):
+    """``html.write_pdf()`` do WeasyPrint medindo duração e tamanho do PDF."""
+    started = time.perf_counter()
+    pdf = html.write_pdf()
+    pdf_render_duration.observe(time.perf_counter() - started, report=report)
+    pdf_render_size.observe(len(pdf or b''), report=report)
+    return pdf
+
+
+def instrument_management_commands():
+    """Mede a duração de todo ``BaseCommand.execute`` (chamado no ready() do app core)."""
+    from django.core.management.base import BaseCommand
+
+    if getattr(BaseCommand.execute, '_lumis_metrics', False):
+        return
+    original = BaseCommand.execute
+
+    def execute(self, *args, **options):
+        command = self.__module__.rsplit('.', 1)[-1]
+        if command in SKIPPED_COMMANDS:
+            return original(self, *args, **options)
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            result = original(self, *args, **options)
+            status = 'success'
+            return result
+        finally:
+            command_duration.observe(time.perf_counter() - started, command=command, status=status)
+            if status == 'success':
+                command_last_success.set(time.time(), command=command)
+            registry.flush(force=True)
+
+    execute._lumis_metrics = True
+    BaseCommand.execute = execute
+
+
+def instrument_db_connections():
+    """Conta as conexões abertas (sinal ``connection_created``; chamado no ready() do app core)."""
+    from django.db.backends.signals import connection_created
+
+    def opened(sender, connection, **kwargs):
+        db_connections_opened.inc(alias=connection.alias)
+
+    connection_created.connect(opened, weak=False, dispatch_uid='lumis_metrics_connection_created')
@@ -0,0 +1,233 @@
+"""
+Middlewares de observabilidade: métricas Prometheus e instrumentação de SQL.
+
+``MetricsMiddleware`` registra latência, tempo de banco e consultas de toda
+requisição, rotuladas pela view do DRF e pela action (ver ``apps/core/metrics.py``).
+
+``SlowQueryMiddleware`` guarda as consultas acima de ``SLOW_QUERY_MS`` com o
+plano de execução (ver ``apps/core/slow_queries.py``).
+
+``ProfilingMiddleware`` roda a requisição sob cProfile quando um superusuário
+pede (ver ``apps/core/profiling.py``).
+
+``ReplicaStickinessMiddleware`` marca quem acabou de gravar, para que as
+leituras desse usuário não vão para a réplica por alguns segundos (ver
+``apps/core/db_routing.py``).
+
+``SQLInstrumentationMiddleware``: instrumentação de SQL por requisição.
+
+Ligada para todas as requisições com ``SQL_INSTRUMENTATION=True`` ou, por
+requisição, quando um usuário da coordenação/direção (ou superusuário) envia o
+cabeçalho ``SQL_INSTRUMENTATION_HEADER``. A autenticação JWT só acontece dentro
+da view do DRF, então com o cabeçalho a coleta começa para qualquer um e o
+resultado só é exposto se o usuário autenticado tiver permissão.
+
+Com a coleta ativa a resposta recebe ``Server-Timing`` (tempo de banco,
+consultas e tempo total) e, se a view estourar o orçamento de consultas/tempo
+ou repetir o mesmo formato de SQL ``SQL_DUPLICATE_QUERY_THRESHOLD`` vezes
+(N+1), um aviso estruturado (JSON) vai para o logger ``lumis.sql``.
+
+Desligada, custa uma leitura de ``request.META`` por requisição.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from . import db_routing, metrics, profiling
+from .slow_queries import SlowQueryRecorder, save_slow_queries
+from .instrumentation import QueryCollector, QueryStats
+
+logger = logging.getLogger('lumis.sql')
+
+_POWER_GROUPS = ['Coordenadores', 'Coordenação', 'Coordenacao', 'Direção', 'Direcao', 'Diretoria', 'Secretaria']
+
+
+def _meta_key(header):
+    return 'HTTP_' + header.upper().replace('-', '_')
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match.route
+
+
+def _metric_labels(request):
+    """(view, action): classe da view do DRF e action do ViewSet; 'unmatched' sem rota."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched', ''
+    func = match.func
+    view = getattr(getattr(func, 'cls', None), '__name__', None) or getattr(func, '__name__', 'unknown')
+    actions = getattr(func, 'actions', None) or {}
+    return view, actions.get(request.method.lower(), '')
+
+
+def _can_inspect(user):
+    if not user or not user.is_authenticated:
+        return False
+    return user.is_superuser or user.groups.filter(name__in=_POWER_GROUPS).exists()
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats = QueryStats()
+        # Conexão já aberta antes da requisição = reaproveitada (CONN_MAX_AGE).
+        open_before = {alias: connections[alias].connection is not None for alias in connections}
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view, action = _metric_labels(request)
+        metrics.http_request_duration.observe(
+            elapsed, view=view, action=action, method=request.method, status=response.status_code,
+        )
+        metrics.http_request_db_duration.observe(stats.duration, view=view, action=action)
+        metrics.http_request_queries.inc(stats.count, view=view, action=action)
+        for alias, was_open in open_before.items():
+            if stats.count and connections[alias].connection is not None:
+                metrics.http_request_db_connection.inc(alias=alias, state='reused' if was_open else 'opened')
+        metrics.registry.flush()
+        return response
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold_ms = getattr(settings, 'SLOW_QUERY_MS', 0)
+        self.keep = getattr(settings, 'SLOW_QUERY_KEEP', 1000)
+
+    def __call__(self, request):
+        if self.threshold_ms <= 0:
+            return self.get_response(request)
+
+        recorders = [SlowQueryRecorder(alias, self.threshold_ms) for alias in connections]
+        with ExitStack() as stack:
+            for recorder in recorders:
+                stack.enter_context(connections[recorder.alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        if any(recorder.captured for recorder in recorders):
+            try:
+                save_slow_queries(recorders, request, keep=self.keep)
+            except DatabaseError:
+                logger.exception('Falha ao gravar consultas lentas de %s', request.path)
+        return response
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled or not profiling.requested(request):
+            return self.get_response(request)
+
+        user = profiling.resolve_user(request)
+        if user is None or not user.is_superuser:
+            return self.get_response(request)
+        if not profiling.take_slot(user):
+            response = self.get_response(request)
+            response['X-Profile-Status'] = 'rate-limited'
+            return response
+
+        response, profile = profiling.profile_request(request, self.get_response, user)
+        if profile is None:
+            response['X-Profile-Status'] = 'busy'
+        else:
+            response['X-Profile-Status'] = 'stored'
+            response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = db_routing.replica_configured()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if self.enabled and request.method not in db_routing.SAFE_METHODS and response.status_code < 500:
+            # Usuário do JWT só existe depois da view (o DRF o repassa ao HttpRequest).
+            db_routing.mark_recent_write(getattr(request, 'user', None), response)
+        return response
+
+
+class SQLInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.always = getattr(settings, 'SQL_INSTRUMENTATION', False)
+        self.header_key = _meta_key(getattr(settings, 'SQL_INSTRUMENTATION_HEADER', 'X-Debug-SQL'))
+        self.query_budget = getattr(settings, 'SQL_QUERY_BUDGET', 50)
+        self.time_budget_ms = getattr(settings, 'SQL_TIME_BUDGET_MS', 300)
+        self.duplicate_threshold = getattr(settings, 'SQL_DUPLICATE_QUERY_THRESHOLD', 5)
+
+    def __call__(self, request):
+        requested = self.header_key in request.META
+        if not self.always and not requested:
+            return self.get_response(request)
+
+        collector = QueryCollector(self.duplicate_threshold)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(collector))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        if not self.always and not _can_inspect(getattr(request, 'user', None)):
+            return response
+
+        db_ms = collector.duration * 1000
+        response['Server-Timing'] = ', '.join([
+            f'db;desc="SQL ({collector.count} queries)";dur={db_ms:.1f}',
+            f'app;dur={max(total_ms - db_ms, 0):.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+        self._check_budgets(request, response, collector, db_ms, total_ms)
+        return response
+
+    def _check_budgets(self, request, response, collector, db_ms, total_ms):
+        exceeded = []
+        if collector.count > self.query_budget:
+            exceeded.append('queries')
+        if db_ms > self.time_budget_ms:
+            exceeded.append('db_time')
+        duplicates = collector.duplicates()
+        if duplicates:
+            exceeded.append('duplicates')
+        if not exceeded:
+            return
+
+        logger.warning(json.dumps({
+            'event': 'sql_budget_exceeded',
+            'exceeded': exceeded,
+            'method': request.method,
+            'path': request.path,
+            'view': _view_name(request),
+            'status': response.status_code,
+            'queries': collector.count,
+            'db_ms': round(db_ms, 1),
+            'total_ms': round(total_ms, 1),
+            'budget': {
+                'queries': self.query_budget,
+                'db_ms': self.time_budget_ms,
+                'duplicates': self.duplicate_threshold,
+            },
+            'duplicates': duplicates[:5],
+        }, ensure_ascii=False))
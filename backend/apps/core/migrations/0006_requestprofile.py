@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_schoolaccount_enforce_lesson_plan_submission_guard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10, verbose_name='Método')),
+                ('path', models.CharField(max_length=500, verbose_name='Caminho')),
+                ('query_string', models.TextField(blank=True, verbose_name='Parâmetros')),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='View')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Status')),
+                ('duration_ms', models.FloatField(verbose_name='Duração (ms)')),
+                ('db_ms', models.FloatField(verbose_name='Tempo no banco (ms)')),
+                ('query_count', models.PositiveIntegerField(verbose_name='Consultas')),
+                ('duplicate_queries', models.JSONField(blank=True, default=list, verbose_name='Consultas repetidas')),
+                ('summary', models.TextField(blank=True, verbose_name='Resumo (cumulativo)')),
+                ('stats', models.BinaryField(verbose_name='Arquivo .prof (pstats)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Perfil de Requisição',
+                'verbose_name_plural': 'Perfis de Requisição',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
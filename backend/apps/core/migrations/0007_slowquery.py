@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(db_index=True, max_length=12, verbose_name='Formato')),
+                ('sql', models.TextField(verbose_name='SQL')),
+                ('params', models.JSONField(blank=True, default=list, verbose_name='Parâmetros')),
+                ('duration_ms', models.FloatField(verbose_name='Duração (ms)')),
+                ('database', models.CharField(default='default', max_length=50, verbose_name='Banco')),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='View')),
+                ('path', models.CharField(blank=True, max_length=500, verbose_name='Caminho')),
+                ('location', models.CharField(blank=True, max_length=300, verbose_name='Origem no código')),
+                ('plan', models.JSONField(blank=True, null=True, verbose_name='Plano (EXPLAIN)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Consulta Lenta',
+                'verbose_name_plural': 'Consultas Lentas',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY não trava escrita na tabela em produção;
+    # exige migração fora de transação.
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_notification_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='accessauditlog',
+            index=models.Index(fields=['created_at', 'id'], name='auditlog_created_id_idx'),
+        ),
+    ]
@@ -84,6 +84,13 @@ class SchoolAccount(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from .thumbnails import generate_thumbnails, image_changed
+        logo_changed = image_changed(self.logo)
+        super().save(*args, **kwargs)
+        if logo_changed:
+            generate_thumbnails(self.logo)
+
     class Meta:
         verbose_name = "Configuração da Escola"
         verbose_name_plural = "Configurações da Escola"
@@ -100,6 +107,11 @@ class Notification(models.Model):
         ordering = ['-created_at']
         verbose_name = "Notificação"
         verbose_name_plural = "Notificações"
+        indexes = [
+            # Lista do usuário (mais recentes primeiro) e contagem de não lidas.
+            models.Index(fields=['recipient', '-created_at'], name='notification_recipient_idx'),
+            models.Index(fields=['recipient'], condition=models.Q(read=False), name='notification_unread_idx'),
+        ]
 
 
 class AccessAuditLog(models.Model):
@@ -117,7 +129,57 @@ class AccessAuditLog(models.Model):
         ordering = ['-created_at']
         verbose_name = "Log de Auditoria"
         verbose_name_plural = "Logs de Auditoria"
+        indexes = [
+            # Listagem/paginação por cursor (-created_at, -id): percorre o índice de trás pra frente.
+            models.Index(fields=['created_at', 'id'], name='auditlog_created_id_idx'),
+        ]
 
     def __str__(self):
         username = self.user.username if self.user else "anon"
-        return f"{self.action} - {username} - {self.created_at:%Y-%m-%d %H:%M}"
\ No newline at end of file
+        return f"{self.action} - {username} - {self.created_at:%Y-%m-%d %H:%M}"
+
+class RequestProfile(models.Model):
+    """Perfil (cProfile + SQL) de uma requisição, pedido por superusuário (ver apps/core/profiling.py)."""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='request_profiles')
+    method = models.CharField("Método", max_length=10)
+    path = models.CharField("Caminho", max_length=500)
+    query_string = models.TextField("Parâmetros", blank=True)
+    view_name = models.CharField("View", max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField("Status")
+    duration_ms = models.FloatField("Duração (ms)")
+    db_ms = models.FloatField("Tempo no banco (ms)")
+    query_count = models.PositiveIntegerField("Consultas")
+    duplicate_queries = models.JSONField("Consultas repetidas", default=list, blank=True)
+    summary = models.TextField("Resumo (cumulativo)", blank=True)
+    stats = models.BinaryField("Arquivo .prof (pstats)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Perfil de Requisição"
+        verbose_name_plural = "Perfis de Requisição"
+
+    def __str__(self):
+        return f"{self.method} {self.path} - {self.duration_ms:.0f}ms - {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class SlowQuery(models.Model):
+    """Consulta acima de SLOW_QUERY_MS numa requisição, com o plano (ver apps/core/slow_queries.py)."""
+    fingerprint = models.CharField("Formato", max_length=12, db_index=True)
+    sql = models.TextField("SQL")
+    params = models.JSONField("Parâmetros", default=list, blank=True)
+    duration_ms = models.FloatField("Duração (ms)")
+    database = models.CharField("Banco", max_length=50, default='default')
+    view_name = models.CharField("View", max_length=200, blank=True)
+    path = models.CharField("Caminho", max_length=500, blank=True)
+    location = models.CharField("Origem no código", max_length=300, blank=True)
+    plan = models.JSONField("Plano (EXPLAIN)", null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Consulta Lenta"
+        verbose_name_plural = "Consultas Lentas"
+
+    def __str__(self):
+        return f"{self.duration_ms:.0f}ms - {self.view_name or self.path} - {self.created_at:%Y-%m-%d %H:%M}"
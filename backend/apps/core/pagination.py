@@ -1,4 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
@@ -12,4 +22,166 @@ class LargeResultsSetPagination(PageNumberPagination):
     """
     page_size = 1000
     page_size_query_param = 'page_size'
-    max_page_size = 10000
\ No newline at end of file
+    max_page_size = 10000
+
+
+def estimated_count(queryset):
+    """
+    Total aproximado sem COUNT(*): ``pg_class.reltuples`` para a tabela
+    inteira ou a estimativa de linhas do planejador quando há filtro.
+    Depende de estatísticas em dia (autovacuum/ANALYZE).
+    """
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # -1: tabela ainda sem estatísticas; cai na estimativa do plano.
+            if row and row[0] >= 0:
+                return int(row[0])
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset): cada página filtra a partir da última linha
+    da anterior (``WHERE (date, id) > (...)``) em vez de ``OFFSET``, então a
+    página 500 custa o mesmo que a primeira. A ordenação vem da view
+    (``keyset_ordering``), termina numa coluna única (o id) e não pode ter
+    campos nulos nem relacionados.
+
+    Sem total por padrão; ``?count=estimate`` devolve a estimativa do
+    PostgreSQL (``estimated_count``) e ``?count=exact`` faz o COUNT(*).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+
+    def __init__(self, ordering, page_size=10, max_page_size=1000):
+        self.ordering = tuple(ordering)
+        self.default_page_size = page_size
+        self.max_page_size = max_page_size
+
+    @classmethod
+    def requested(cls, request):
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or cls.cursor_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.default_page_size))
+        except (TypeError, ValueError):
+            return self.default_page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def _fields(self, model):
+        return [(model._meta.get_field(key.lstrip('-')), key.startswith('-')) for key in self.ordering]
+
+    def encode_cursor(self, obj, reverse):
+        values = [field.value_to_string(obj) for field, _ in self._fields(type(obj))]
+        raw = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            fields = self._fields(model)
+            if len(payload['v']) != len(fields):
+                raise ValueError
+            values = [field.to_python(value) for (field, _), value in zip(fields, payload['v'])]
+            return values, bool(payload.get('r'))
+        except (ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound('Cursor inválido.')
+
+    def _after(self, model, values, reverse):
+        """Linhas depois da posição ``values`` na ordenação (antes, se ``reverse``)."""
+        fields = self._fields(model)
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(fields, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{field.name}__{lookup}': value})
+            equal &= Q(**{field.name: value})
+        # Limite redundante na primeira coluna: sem ele o OR não vira faixa do
+        # índice e o PostgreSQL percorre o índice desde o começo.
+        (first, descending), value = fields[0], values[0]
+        return Q(**{f"{first.name}__{'lte' if descending != reverse else 'gte'}": value}) & condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request, queryset.model)
+
+        self.count = None
+        self.count_is_estimate = False
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.count = queryset.count()
+        elif count_mode == 'estimate':
+            self.count = estimated_count(queryset)
+            self.count_is_estimate = True
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(key[1:] if key.startswith('-') else f'-{key}' for key in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(queryset.model, values, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = bool(rows), has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None and bool(rows)
+        self.page = rows
+        return rows
+
+    def _link(self, obj, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        url = replace_query_param(url, 'pagination', 'cursor')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(obj, reverse))
+
+    def get_next_link(self):
+        return self._link(self.page[-1], False) if self.has_next else None
+
+    def get_previous_link(self):
+        return self._link(self.page[0], True) if self.has_previous else None
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict([('next', self.get_next_link()), ('previous', self.get_previous_link())])
+        if self.count is not None:
+            payload['count'] = self.count
+            payload['count_is_estimate'] = self.count_is_estimate
+        payload['results'] = data
+        return Response(payload)
+
+
+class KeysetPaginationMixin:
+    """
+    Liga a ``KeysetPagination`` quando o cliente pede (``?pagination=cursor``
+    ou ``?cursor=...``); sem isso a view segue com a paginação por página de
+    sempre. ``keyset_ordering`` é a ordenação estável da view (termina no id).
+    """
+    keyset_ordering = None
+    keyset_max_page_size = 1000
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.keyset_ordering and KeysetPagination.requested(self.request):
+            base = super().paginator
+            self._paginator = KeysetPagination(
+                self.keyset_ordering,
+                page_size=getattr(base, 'page_size', None) or 10,
+                max_page_size=self.keyset_max_page_size,
+            )
+        return super().paginator
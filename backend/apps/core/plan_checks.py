@@ -0,0 +1,174 @@
+"""
+Verificação de planos (EXPLAIN) das consultas quentes.
+
+Cada verificação monta a consulta como as views fazem, com valores reais da
+base, e confere se o plano usa o índice esperado. Dois modos:
+
+- natural: o planejador decide sozinho. Só faz sentido numa base com volume
+  (ex.: ``generate_load_data --students 2000``) e estatísticas em dia
+  (``--analyze``); em tabela pequena o seq scan é a escolha certa, então
+  tabelas com menos de ``MIN_ROWS`` linhas estimadas são puladas.
+- ``force_index``: ``SET LOCAL enable_seqscan = off``. Confere também as
+  tabelas pequenas, com a mesma exigência (o plano usa o índice esperado e não
+  lê a tabela por seq scan). É o modo dos testes; numa base quase vazia os
+  custos empatam e o planejador pode preferir outro índice equivalente (ex.: o
+  da FK), por isso os testes geram algumas centenas de linhas por tabela.
+
+Uso: ``python manage.py check_query_plans`` (ver COMMANDS.md).
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+MIN_ROWS = 1000
+
+
+class PlanCheckError(Exception):
+    """Base sem os dados necessários para montar alguma verificação."""
+
+
+def _fixtures():
+    from apps.academic.models import Attendance, Enrollment, LessonPlan, Student
+    from apps.core.models import Notification
+
+    attendance = Attendance.objects.select_related('enrollment').order_by('-date', 'id').first()
+    # Primeira semana: start_date <= semana só é seletivo no começo do ano; na
+    # última semana o filtro pega todos os planejamentos da atribuição e o
+    # índice composto não lê menos que o da FK.
+    plan = LessonPlan.objects.order_by('start_date', 'id').first()
+    recipient_id = Notification.objects.order_by('-id').values_list('recipient_id', flat=True).first()
+    missing = [
+        label for label, value in [
+            ('frequências', attendance), ('planejamentos', plan), ('notificações', recipient_id),
+        ] if value is None
+    ]
+    if missing:
+        raise PlanCheckError('Base sem ' + ', '.join(missing) + '. Rode generate_load_data.')
+    classroom_id = attendance.enrollment.classroom_id
+    return {
+        'date': attendance.date,
+        'attendance': attendance.id,
+        'classroom': classroom_id,
+        'subject': attendance.subject_id,
+        'enrollments': list(Enrollment.objects.filter(classroom_id=classroom_id).values_list('id', flat=True)),
+        'students': list(Student.objects.filter(enrollment__classroom_id=classroom_id).values_list('id', flat=True)),
+        'assignment': plan.assignment_id,
+        'week_start': plan.start_date,
+        'recipient': recipient_id,
+    }
+
+
+def _checks(fx):
+    from apps.academic.models import Attendance, Enrollment, LessonPlan, SchoolEvent, TaughtContent
+    from apps.coordination.models import StudentReport
+    from apps.core.models import AccessAuditLog, Notification
+
+    now = timezone.now()
+    return [
+        # Matrículas da turma -> índice único (enrollment, subject, date).
+        ('attendance_daily_log', 'academic_attendance_enrollment_id_subject_id_date',
+         Attendance.objects.filter(date=fx['date'], enrollment__classroom_id=fx['classroom'], subject_id=fx['subject'])),
+        ('attendance_absences_by_enrollment', 'attendance_absent_enr_idx',
+         Attendance.objects.filter(enrollment_id__in=fx['enrollments'], present=False)
+         .values('enrollment_id').annotate(total=Count('id')).order_by()),
+        ('enrollment_active_by_classroom', 'enrollment_active_cls_idx',
+         Enrollment.objects.filter(classroom_id=fx['classroom'], active=True)),
+        ('lesson_plan_of_week', 'lessonplan_asg_week_idx',
+         LessonPlan.objects.filter(
+             assignment_id=fx['assignment'], start_date__lte=fx['week_start'] + timedelta(days=6),
+             end_date__gte=fx['week_start'], status__in=['SUBMITTED', 'APPROVED'],
+         )),
+        ('lesson_plans_submitted_queue', 'lessonplan_submitted_idx',
+         LessonPlan.objects.filter(status='SUBMITTED').order_by('-start_date')[:10]),
+        ('notifications_list', 'notification_recipient_idx',
+         Notification.objects.filter(recipient_id=fx['recipient']).order_by('-created_at')[:10]),
+        ('notifications_unread', 'notification_unread_idx',
+         Notification.objects.filter(recipient_id=fx['recipient'], read=False).values('id')),
+        ('family_reports', 'studentreport_family_idx',
+         StudentReport.objects.filter(student_id__in=fx['students'], status='APPROVED', visible_to_family=True)
+         .order_by('student_id', '-date')),
+        ('school_events_range', 'schoolevent_start_aud_idx',
+         SchoolEvent.objects.filter(
+             Q(target_audience='ALL') | Q(target_audience='CLASSROOM', classroom_id=fx['classroom']),
+             start_time__gte=now, start_time__lte=now + timedelta(days=30),
+         )),
+        # Página seguinte da paginação por cursor (date, id), sem OFFSET.
+        ('attendance_keyset_page', 'attendance_date_id_idx',
+         Attendance.objects.filter(Q(date__gte=fx['date']) & (Q(date__gt=fx['date']) | Q(date=fx['date'], id__gt=fx['attendance'])))
+         .order_by('date', 'id')[:100]),
+        ('audit_log_keyset_page', 'auditlog_created_id_idx',
+         AccessAuditLog.objects.filter(Q(created_at__lte=now) & (Q(created_at__lt=now) | Q(created_at=now, id__lt=fx['attendance'])))
+         .order_by('-created_at', '-id')[:100]),
+        ('taught_content_of_assignment', 'academic_taughtcontent_assignment_id_date',
+         TaughtContent.objects.filter(assignment_id=fx['assignment'], date__gte=fx['week_start'])),
+    ]
+
+
+def _nodes(plan):
+    stack = [node['Plan'] for node in plan]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.get('Plans', []))
+
+
+def used_indexes(plan):
+    """Nomes de todos os índices referenciados num plano JSON do PostgreSQL."""
+    return {node['Index Name'] for node in _nodes(plan) if 'Index Name' in node}
+
+
+def seq_scanned(plan):
+    """Tabelas lidas por seq scan no plano."""
+    return {node['Relation Name'] for node in _nodes(plan) if node.get('Node Type') == 'Seq Scan'}
+
+
+def existing_indexes(table):
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(cursor, table))
+
+
+def explain_queryset(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    return plan
+
+
+def estimated_rows(model):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    return max(int(row[0]), 0) if row else 0
+
+
+def run_plan_checks(force_index=False, checks=None, analyze=False):
+    """
+    Lista de dicts (name, expected, indexes, ok). ``expected`` casa por prefixo
+    (índices de unique_together têm hash no nome). ``ok`` é None quando pulado.
+    """
+    def matches(names, expected):
+        return any(name.startswith(expected) for name in names)
+
+    if analyze:
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    if checks is None:
+        checks = _checks(_fixtures())
+    results = []
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL enable_seqscan = {'off' if force_index else 'on'}")
+        for name, expected, queryset in checks:
+            if not force_index and estimated_rows(queryset.model) < MIN_ROWS:
+                results.append({'name': name, 'expected': expected, 'indexes': [], 'ok': None})
+                continue
+            plan = explain_queryset(queryset)
+            indexes = used_indexes(plan)
+            table = queryset.model._meta.db_table
+            ok = matches(indexes, expected) and table not in seq_scanned(plan)
+            results.append({'name': name, 'expected': expected, 'indexes': sorted(indexes), 'ok': ok})
+    return results
@@ -0,0 +1,129 @@
+"""
+Perfil de requisição sob demanda (cProfile + SQL), só para superusuários.
+
+Pedido com o cabeçalho ``X-Profile: 1`` ou o parâmetro ``?_profile=1``. O
+usuário é resolvido antes da view (sessão do admin ou token JWT), então
+requisições de outros usuários seguem sem nenhum custo extra.
+
+O resultado fica em ``RequestProfile``: metadados da requisição, consultas
+repetidas, resumo em texto (top funções por tempo cumulativo) e o arquivo
+``.prof`` (formato pstats, abre no ``snakeviz``/``pstats``), baixado pelo admin.
+
+Limites: ``PROFILING_RATE_LIMIT`` perfis por usuário por hora, um perfil por
+vez em cada processo e só os ``PROFILING_KEEP`` mais recentes são mantidos. O
+limite por hora é contado no cache padrão: com o ``LocMemCache`` (padrão) cada
+worker conta o seu, então o limite real é ``PROFILING_RATE_LIMIT`` × workers
+(3 no Dockerfile); com cache compartilhado (ex.: ``FileBasedCache`` no mesmo
+contêiner) vale o número configurado.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .instrumentation import QueryCollector
+
+QUERY_PARAM = '_profile'
+META_KEY = 'HTTP_X_PROFILE'
+SUMMARY_LINES = 40
+TRUTHY = ('1', 'true', 'yes', 'on')
+
+_running = threading.Lock()
+
+
+def _truthy(value):
+    return str(value).strip().lower() in TRUTHY
+
+
+def requested(request):
+    """Só valores verdadeiros ligam o perfil (``X-Profile: 0`` e ``?_profile=0`` não)."""
+    if META_KEY in request.META:
+        return _truthy(request.META[META_KEY])
+    # Teste barato na query string antes de montar request.GET.
+    if f'{QUERY_PARAM}=' not in request.META.get('QUERY_STRING', ''):
+        return False
+    return _truthy(request.GET.get(QUERY_PARAM, ''))
+
+
+def resolve_user(request):
+    """Usuário da sessão (admin) ou do token JWT, sem depender da view."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return result[0] if result else None
+
+
+def take_slot(user):
+    """Consome uma vaga do limite por hora do usuário; False se esgotado."""
+    key = f'profiling:{user.pk}:{int(time.time() // 3600)}'
+    cache.add(key, 0, 3600)
+    try:
+        used = cache.incr(key)
+    except ValueError:
+        used = 1
+    return used <= getattr(settings, 'PROFILING_RATE_LIMIT', 10)
+
+
+def profile_request(request, get_response, user):
+    """Executa a requisição sob cProfile; devolve (response, RequestProfile ou None se ocupado)."""
+    if not _running.acquire(blocking=False):
+        return get_response(request), None
+    try:
+        collector = QueryCollector(getattr(settings, 'SQL_DUPLICATE_QUERY_THRESHOLD', 5))
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(collector))
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+    finally:
+        _running.release()
+
+    return response, _store(request, response, user, profiler, collector, elapsed)
+
+
+def _store(request, response, user, profiler, collector, elapsed):
+    from .models import RequestProfile
+
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    match = getattr(request, 'resolver_match', None)
+    profile = RequestProfile.objects.create(
+        user=user,
+        method=request.method,
+        path=request.path[:500],
+        query_string=request.META.get('QUERY_STRING', ''),
+        view_name=(match.view_name or match.route) if match else '',
+        status_code=response.status_code,
+        duration_ms=round(elapsed * 1000, 2),
+        db_ms=round(collector.duration * 1000, 2),
+        query_count=collector.count,
+        duplicate_queries=collector.duplicates()[:10],
+        summary=summary.getvalue(),
+        stats=marshal.dumps(stats.stats),
+    )
+    keep = getattr(settings, 'PROFILING_KEEP', 100)
+    stale = RequestProfile.objects.order_by('-created_at', '-id').values_list('id', flat=True)[keep:]
+    RequestProfile.objects.filter(id__in=list(stale)).delete()
+    return profile
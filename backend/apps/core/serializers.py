@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import User, SchoolAccount, Notification, AccessAuditLog
+from .thumbnails import thumbnail_urls
 
 User = get_user_model()
 
@@ -18,6 +19,11 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'groups', 'is_superuser']
 
 class SchoolAccountSerializer(serializers.ModelSerializer):
+    logo_thumbnails = serializers.SerializerMethodField()
+
+    def get_logo_thumbnails(self, obj):
+        return thumbnail_urls(obj.logo, request=self.context.get('request'))
+
     def validate_non_teaching_event_types(self, value):
         from apps.academic.models import SchoolEvent
 
@@ -50,6 +56,7 @@ class SchoolAccountSerializer(serializers.ModelSerializer):
         fields = [
             'name', 
             'logo',
+            'logo_thumbnails',
             'icon',
             'primary_color', 
             'secondary_color', 
@@ -0,0 +1,95 @@
+"""
+Registro de consultas lentas com plano de execução.
+
+Durante a requisição, ``SlowQueryRecorder`` (``execute_wrapper``) só anota as
+consultas que passaram de ``SLOW_QUERY_MS``, com o ponto do código que as
+disparou. Depois da resposta, ``save_slow_queries`` grava cada uma em
+``SlowQuery`` junto com ``EXPLAIN (ANALYZE false, FORMAT JSON)`` (o plano é
+estimado: a consulta não é executada de novo). A tabela é limitada aos
+``SLOW_QUERY_KEEP`` registros mais recentes.
+
+Resumo por formato de consulta: ``python manage.py slow_queries_report``.
+"""
+import json
+import time
+
+from django.db import DatabaseError, connections, transaction
+
+from .instrumentation import app_location, fingerprint, fingerprint_id
+
+MAX_PARAMS = 100
+MAX_PARAM_LENGTH = 200
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+
+class SlowQueryRecorder:
+    def __init__(self, alias, threshold_ms):
+        self.alias = alias
+        self.threshold = threshold_ms / 1000
+        self.captured = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold:
+                self.captured.append((sql, None if many else params, elapsed, app_location()))
+
+
+def _serialize_params(params):
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        params = list(params.values())
+    return [
+        value if isinstance(value, (int, float, bool)) or value is None else str(value)[:MAX_PARAM_LENGTH]
+        for value in list(params)[:MAX_PARAMS]
+    ]
+
+
+def explain(alias, sql, params):
+    """Plano estimado (lista JSON do PostgreSQL) ou None se não for possível."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql' or params is None:
+        return None
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    try:
+        # Savepoint: um EXPLAIN que falhe não pode quebrar a transação em curso.
+        with transaction.atomic(using=alias):
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (ANALYZE false, FORMAT JSON) ' + sql, params)
+                plan = cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+def save_slow_queries(recorders, request=None, keep=1000):
+    from .models import SlowQuery
+
+    match = getattr(request, 'resolver_match', None) if request is not None else None
+    view_name = (match.view_name or match.route) if match else ''
+    path = request.path[:500] if request is not None else ''
+    rows = []
+    for recorder in recorders:
+        for sql, params, elapsed, location in recorder.captured:
+            rows.append(SlowQuery(
+                fingerprint=fingerprint_id(fingerprint(sql)),
+                sql=sql,
+                params=_serialize_params(params),
+                duration_ms=round(elapsed * 1000, 2),
+                database=recorder.alias,
+                view_name=view_name,
+                path=path,
+                location=(location or '')[:300],
+                plan=explain(recorder.alias, sql, params),
+            ))
+    if not rows:
+        return []
+    SlowQuery.objects.bulk_create(rows)
+    stale = SlowQuery.objects.order_by('-created_at', '-id').values_list('id', flat=True)[keep:]
+    SlowQuery.objects.filter(id__in=list(stale)).delete()
+    return rows
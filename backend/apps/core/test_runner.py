@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class LumisTestRunner(DiscoverRunner):
+    """Runner padrão com as leituras na réplica desligadas (ver REPLICA_READS em settings)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.REPLICA_READS = False
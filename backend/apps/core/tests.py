@@ -1,6 +1,35 @@
+import json
+import os
+import pstats
+import sys
+import tempfile
+import types
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.academic.autocomplete import normalize_digits, normalize_registration
+from apps.academic.models import (
+    Attendance, ClassSchedule, Enrollment, Grade, Guardian, SchoolEvent, Student, TeacherAssignment,
+)
+from apps.academic.timetable import find_conflicts
+from apps.core import checks, db_routing
+from apps.core.benchmark import SCENARIO_NAMES, compare, resolve_fixtures
+from apps.core.instrumentation import fingerprint
+from apps.core.metrics import write_pdf
+from apps.core.plan_checks import run_plan_checks
+from apps.core.models import AccessAuditLog, Notification, RequestProfile, SlowQuery
 
 
 User = get_user_model()
@@ -22,3 +51,573 @@ class UserViewSetAuthorizationTests(APITestCase):
         self.client.force_authenticate(user=self.power_user)
         response = self.client.get('/api/users/')
         self.assertEqual(response.status_code, 200)
+
+
+class ImportInitialDataTests(TestCase):
+    TEACHERS = "Matemática;Year 6 manhã - Fundamental;Ms.Freire\nArte;Nursery 2 - Infantil;Ms.Freire\n;;Ms. Souza\n"
+    STUDENTS = (
+        "Ana Souza;Carla Souza\n"
+        "Bruno Souza;Carla Souza\n"
+        "Ana Souza;Outro Nome\n"
+        "Caio Lima;Paulo Lima\n"
+    )
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.teachers_file = os.path.join(self.tmpdir.name, 'teachers.txt')
+        self.students_file = os.path.join(self.tmpdir.name, 'students.txt')
+        with open(self.teachers_file, 'w', encoding='utf-8') as handle:
+            handle.write(self.TEACHERS)
+        with open(self.students_file, 'w', encoding='utf-8') as handle:
+            handle.write(self.STUDENTS)
+        # Ocupa o username e o primeiro CPF fictício: a geração em memória precisa desviar.
+        User.objects.create_user(username='carla.souza', password='x')
+        Guardian.objects.create(name='Já existe', cpf='000.000.000-01', phone='1')
+
+    def _run(self, *extra):
+        out = StringIO()
+        call_command(
+            'import_initial_data',
+            '--teachers-file', self.teachers_file,
+            '--students-file', self.students_file,
+            '--batch-size', '2',
+            *extra,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_dry_run_writes_nothing(self):
+        output = self._run('--dry-run')
+        self.assertIn('SIMULAÇÃO', output)
+        self.assertIn('Alunos: 3 novo(s)', output)
+        self.assertFalse(Student.objects.exists())
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_bulk_import_and_rerun_is_idempotent(self):
+        with CaptureQueriesContext(connection) as ctx:
+            output = self._run()
+        self.assertIn('EXECUÇÃO', output)
+        self.assertIn('Alunos: 2/3', output)
+        # Consultas não crescem por linha: prefetch + lotes.
+        self.assertLess(len(ctx.captured_queries), 40)
+
+        self.assertEqual(Student.objects.count(), 3)
+        ana = Student.objects.get(name='Ana Souza')
+        self.assertEqual(ana.registration_key, normalize_registration(ana.registration_number))
+        self.assertEqual(list(ana.guardians.values_list('name', flat=True)), ['Carla Souza'])
+
+        carla = Guardian.objects.get(name='Carla Souza')
+        self.assertEqual(carla.user.username, 'carla.souza1')
+        self.assertNotEqual(carla.cpf, '000.000.000-01')
+        self.assertEqual(carla.cpf_digits, normalize_digits(carla.cpf))
+        self.assertEqual(carla.students.count(), 2)
+        self.assertTrue(carla.user.groups.filter(name='Responsáveis').exists())
+        self.assertTrue(carla.user.check_password('123mudar'))
+
+        freire = User.objects.get(first_name='Ms.Freire')
+        self.assertTrue(freire.groups.filter(name='Professores').exists())
+        self.assertEqual(TeacherAssignment.objects.filter(teacher=freire).count(), 2)
+        self.assertTrue(User.objects.filter(first_name='Ms. Souza').exists())
+
+        self._run()
+        self.assertEqual(Student.objects.count(), 3)
+        self.assertEqual(Guardian.objects.count(), 3)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(TeacherAssignment.objects.count(), 2)
+
+
+class GenerateLoadDataTests(TestCase):
+    ARGS = [
+        '--students', '12', '--classrooms', '3', '--subjects', '4', '--years', '2', '--start-year', '2024',
+        '--attendance-density', '0.5', '--grades-per-period', '2', '--notifications', '20',
+        '--audit-rows', '30', '--batch-size', '50', '--tag', 'tst',
+    ]
+
+    def _run(self, *extra):
+        out = StringIO()
+        call_command('generate_load_data', *self.ARGS, *extra, stdout=out)
+        return out.getvalue()
+
+    def _snapshot(self):
+        return {
+            'students': list(Student.objects.filter(registration_number__startswith='TST').order_by('registration_number').values_list('name', flat=True)),
+            'grades': sorted(Grade.objects.values_list('enrollment__student__registration_number', 'subject__name', 'period__name', 'name', 'value')),
+            'absences': Attendance.objects.filter(present=False).count(),
+            'attendance': Attendance.objects.count(),
+        }
+
+    def test_dry_run_counts_match_execution(self):
+        dry = self._run('--dry-run')
+        self.assertIn('SIMULAÇÃO', dry)
+        self.assertFalse(Student.objects.exists())
+
+        real = self._run()
+        self.assertIn('EXECUÇÃO', real)
+        for label in ('Frequências', 'Notas', 'Eventos', 'Grade horária'):
+            dry_line = next(line for line in dry.splitlines() if line.startswith(f'  {label}:'))
+            self.assertIn(dry_line, real)
+
+        self.assertEqual(Student.objects.count(), 12)
+        self.assertEqual(Enrollment.objects.count(), 24)
+        self.assertEqual(Grade.objects.count(), 12 * 4 * 2 * 8)
+        self.assertTrue(Student.objects.filter(current_enrollment__isnull=True).count() == 0)
+        self.assertTrue(SchoolEvent.objects.filter(event_type='EXAM', classroom__isnull=False).exists())
+        self.assertEqual(Notification.objects.count(), 20)
+        self.assertEqual(AccessAuditLog.objects.count(), 30)
+
+        schedules = [
+            {
+                'index': n, 'classroom_id': s.classroom_id, 'assignment_id': s.assignment_id,
+                'teacher_id': s.assignment.teacher_id, 'day_of_week': s.day_of_week,
+                'start_time': s.start_time, 'end_time': s.end_time,
+            }
+            for n, s in enumerate(ClassSchedule.objects.select_related('assignment'))
+        ]
+        self.assertTrue(schedules)
+        self.assertEqual(find_conflicts(schedules), [])
+
+    def test_same_seed_is_reproducible_and_requires_wipe(self):
+        self._run()
+        first = self._snapshot()
+        with self.assertRaises(CommandError):
+            self._run()
+        self._run('--wipe')
+        self.assertEqual(self._snapshot(), first)
+        self.assertEqual(Student.objects.count(), 12)
+
+
+class BenchmarkEndpointsTests(TestCase):
+    def setUp(self):
+        call_command(
+            'generate_load_data', '--students', '8', '--classrooms', '2', '--subjects', '3', '--years', '1',
+            '--start-year', '2025', '--grades-per-period', '1', '--notifications', '10', '--audit-rows', '5',
+            '--tag', 'bm', stdout=StringIO(),
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.output = os.path.join(self.tmpdir.name, 'result.json')
+        self.baseline = os.path.join(self.tmpdir.name, 'baseline.json')
+
+    def _run(self, *extra):
+        call_command(
+            'benchmark_endpoints', '--iterations', '2', '--warmup', '0', '--baseline', self.baseline, *extra,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def test_measures_every_endpoint_and_writes_json(self):
+        self._run('--output', self.output, '--update-baseline')
+        with open(self.output, encoding='utf-8') as handle:
+            results = json.load(handle)
+        self.assertEqual(set(results['endpoints']), set(SCENARIO_NAMES))
+        for name, row in results['endpoints'].items():
+            self.assertEqual(row['status'], 200, name)
+            self.assertGreater(row['queries'], 0, name)
+            self.assertGreaterEqual(row['p95_ms'], row['p50_ms'], name)
+            # Dentro da transação do teste a conexão nunca é fechada: tudo reaproveitado.
+            self.assertEqual(row['connections_opened'], 0, name)
+        self.assertEqual(results['dataset']['students'], 8)
+        self.assertTrue(os.path.exists(self.baseline))
+
+    def test_fails_on_query_regression_against_baseline(self):
+        self._run('--only', 'notifications,lesson_plans_teacher', '--update-baseline')
+        with open(self.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        baseline['endpoints']['lesson_plans_teacher']['queries'] -= 1
+        with open(self.baseline, 'w', encoding='utf-8') as handle:
+            json.dump(baseline, handle)
+
+        with self.assertRaises(CommandError):
+            self._run('--only', 'notifications,lesson_plans_teacher', '--latency-threshold', '100')
+        self._run('--only', 'notifications,lesson_plans_teacher', '--latency-threshold', '100', '--query-threshold', '1')
+
+    def test_latency_regression_needs_relative_and_absolute_increase(self):
+        baseline = {'endpoints': {'x': {'status': 200, 'queries': 3, 'p95_ms': 2.0}}}
+        slower = {'endpoints': {'x': {'status': 200, 'queries': 3, 'p95_ms': 4.0}}}
+        self.assertEqual(compare(slower, baseline, latency_threshold=0.25, min_latency_delta_ms=5), [])
+        self.assertEqual(len(compare(slower, baseline, latency_threshold=0.25, min_latency_delta_ms=1)), 1)
+
+
+class SQLInstrumentationMiddlewareTests(APITestCase):
+    def setUp(self):
+        call_command(
+            'generate_load_data', '--students', '8', '--classrooms', '1', '--subjects', '2', '--years', '1',
+            '--start-year', '2025', '--grades-per-period', '1', '--notifications', '5', '--audit-rows', '5',
+            '--tag', 'sq', stdout=StringIO(),
+        )
+        fixtures = resolve_fixtures()
+        self.url = '/api/attendance/daily-log/?date={date}&classroom={classroom}&subject={subject}'.format(**fixtures)
+        self.common_user = User.objects.create_user(username='common_sql', password='pass12345')
+        self.superuser = User.objects.create_superuser(username='root_sql', password='pass12345')
+
+    def test_disabled_without_header(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/notifications/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_header_only_exposes_timing_to_power_users(self):
+        self.client.force_authenticate(user=self.common_user)
+        response = self.client.get('/api/notifications/', HTTP_X_DEBUG_SQL='1')
+        self.assertNotIn('Server-Timing', response)
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/notifications/', HTTP_X_DEBUG_SQL='1')
+        self.assertRegex(response['Server-Timing'], r'^db;desc="SQL \(\d+ queries\)";dur=[\d.]+, app;dur=')
+
+    @override_settings(SQL_INSTRUMENTATION=True, SQL_DUPLICATE_QUERY_THRESHOLD=4, SQL_QUERY_BUDGET=1000)
+    def test_flags_repeated_query_shape_with_location(self):
+        self.client.force_authenticate(user=self.superuser)
+        with self.assertLogs('lumis.sql', 'WARNING') as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Server-Timing', response)
+        payload = json.loads(logs.records[0].getMessage())
+        self.assertEqual(payload['event'], 'sql_budget_exceeded')
+        self.assertEqual(payload['exceeded'], ['duplicates'])
+        self.assertEqual(payload['view'], 'attendance-daily-log')
+        locations = [item['location'] or '' for item in payload['duplicates']]
+        self.assertTrue(any('get_justification_status' in location for location in locations), locations)
+        self.assertTrue(all(item['count'] >= 4 for item in payload['duplicates']))
+
+    @override_settings(SQL_INSTRUMENTATION=True, SQL_QUERY_BUDGET=1000, SQL_DUPLICATE_QUERY_THRESHOLD=1000)
+    def test_within_budget_does_not_log(self):
+        self.client.force_authenticate(user=self.superuser)
+        with self.assertNoLogs('lumis.sql', 'WARNING'):
+            self.client.get('/api/notifications/')
+
+    def test_fingerprint_ignores_literals_and_in_list_size(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'a' LIMIT 21"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s)  AND name = 'bb' LIMIT 5"),
+        )
+
+
+class MetricsEndpointTests(APITestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        override = override_settings(METRICS_DIR=self.tmpdir.name, METRICS_TOKEN='segredo', METRICS_ENABLED=True)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='metrics_user', password='pass12345')
+
+    def _scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode('utf-8')
+
+    def _sample(self, text, prefix):
+        for line in text.splitlines():
+            if line.startswith(prefix + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        return None
+
+    def test_records_request_latency_by_view_action_and_status(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/notifications/')
+        self.client.force_authenticate(user=None)
+        text = self._scrape()
+        series = 'lumis_http_request_duration_seconds_count{action="list",method="GET",status="200",view="NotificationViewSet"}'
+        self.assertGreaterEqual(self._sample(text, series), 1)
+        self.assertIn('lumis_http_request_duration_seconds_bucket{action="list",method="GET",status="200",view="NotificationViewSet",le="+Inf"}', text)
+        self.assertIsNotNone(self._sample(text, 'lumis_http_request_db_seconds_count{action="list",view="NotificationViewSet"}'))
+        self.assertIn('lumis_queue_depth{queue="notifications_unread"} 0', text)
+
+    def test_counts_reused_database_connections(self):
+        series = 'lumis_http_request_db_connection_total{alias="default",state="reused"}'
+        before = self._sample(self._scrape(), series) or 0
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/notifications/')
+        self.client.force_authenticate(user=None)
+        text = self._scrape()
+        # A própria coleta anterior (filas no banco) também conta.
+        self.assertGreaterEqual(self._sample(text, series), before + 1)
+        self.assertIn('# TYPE lumis_db_connections_opened_total counter', text)
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer outro').status_code, 401)
+        with override_settings(METRICS_TOKEN='', DEBUG=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    def test_sums_files_written_by_other_processes(self):
+        series = 'lumis_pdf_render_bytes_count{report="teste"}'
+        write_pdf(type('FakeHTML', (), {'write_pdf': lambda self: b'%PDF' * 100})(), 'teste')
+        before = self._sample(self._scrape(), series)
+        with open(os.path.join(self.tmpdir.name, '99999-1.json'), 'w', encoding='utf-8') as handle:
+            json.dump({'lumis_pdf_render_bytes': {
+                '[["report", "teste"]]': {'b': [2, 0, 0, 0, 0, 0, 0, 0, 0], 's': 20.0, 'c': 2},
+            }}, handle)
+        self.assertEqual(self._sample(self._scrape(), series), before + 2)
+
+    def test_records_management_command_duration(self):
+        call_command('sync_current_enrollments', stdout=StringIO())
+        text = self._scrape()
+        self.assertGreaterEqual(
+            self._sample(text, 'lumis_command_duration_seconds_count{command="sync_current_enrollments",status="success"}'), 1,
+        )
+        self.assertIsNotNone(self._sample(text, 'lumis_command_last_success_timestamp_seconds{command="sync_current_enrollments"}'))
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='keyset_user', password='pass12345')
+        Notification.objects.bulk_create([
+            Notification(recipient=self.user, title=f'Aviso {i}', message='...') for i in range(25)
+        ])
+        self.client.force_authenticate(user=self.user)
+
+    def test_walks_all_pages_in_stable_order_without_count(self):
+        expected = list(
+            Notification.objects.filter(recipient=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        seen, pages = [], []
+        url = '/api/notifications/?pagination=cursor&page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 5])
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[1]['previous'])
+        self.assertEqual([item['id'] for item in previous.data['results']], expected[:10])
+        self.assertIsNone(previous.data['previous'])
+        self.assertIsNotNone(previous.data['next'])
+
+    def test_optional_exact_or_estimated_count(self):
+        exact = self.client.get('/api/notifications/?pagination=cursor&count=exact')
+        self.assertEqual((exact.data['count'], exact.data['count_is_estimate']), (25, False))
+        estimate = self.client.get('/api/notifications/?pagination=cursor&count=estimate')
+        self.assertTrue(estimate.data['count_is_estimate'])
+        self.assertIsInstance(estimate.data['count'], int)
+
+    def test_page_number_stays_default_and_bad_cursor_is_404(self):
+        response = self.client.get('/api/notifications/')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(self.client.get('/api/notifications/?cursor=nao-e-cursor').status_code, 404)
+
+
+class DatabaseConnectionChecksTests(TestCase):
+    def _errors(self, **config):
+        return [message.id for message in checks.validate_connection_settings('default', config)]
+
+    def test_default_settings_are_valid(self):
+        self.assertEqual(checks.check_database_connections(None), [])
+        self.assertEqual(settings.DATABASES['default']['CONN_MAX_AGE'], settings.DB_CONN_MAX_AGE)
+        self.assertEqual(checks.check_database_server(None, databases=['default']), [])
+
+    def test_rejects_negative_conn_max_age(self):
+        self.assertEqual(self._errors(CONN_MAX_AGE=-1), ['core.E001'])
+
+    def test_pool_requires_psycopg3_and_valid_sizes(self):
+        with patch.dict(sys.modules, {'psycopg': None, 'psycopg_pool': None}):
+            self.assertEqual(self._errors(CONN_MAX_AGE=0, OPTIONS={'pool': True}), ['core.E002'])
+        fake = {'psycopg': types.ModuleType('psycopg'), 'psycopg_pool': types.ModuleType('psycopg_pool')}
+        with patch.dict(sys.modules, fake):
+            self.assertEqual(self._errors(CONN_MAX_AGE=0, OPTIONS={'pool': {'min_size': 2, 'max_size': 10}}), [])
+            self.assertEqual(self._errors(CONN_MAX_AGE=0, OPTIONS={'pool': {'min_size': 5, 'max_size': 2}}), ['core.E003'])
+            self.assertEqual(self._errors(CONN_MAX_AGE=0, OPTIONS={'pool': {'max_size': 4, 'timeout': 0}}), ['core.E003'])
+            self.assertEqual(self._errors(CONN_MAX_AGE=60, OPTIONS={'pool': {'max_size': 4}}), ['core.W001'])
+
+
+class RequestProfilingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(username='root_prof', password='pass12345')
+        self.common_user = User.objects.create_user(username='common_prof', password='pass12345')
+
+    def _get(self, user, url='/api/notifications/', **extra):
+        token = RefreshToken.for_user(user).access_token
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}', **extra)
+
+    def test_superuser_header_stores_profile_with_metadata(self):
+        response = self._get(self.superuser, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Profile-Status'], 'stored')
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.user, profile.method, profile.path), (self.superuser, 'GET', '/api/notifications/'))
+        self.assertEqual(profile.view_name, 'notification-list')
+        self.assertGreater(profile.query_count, 0)
+        self.assertIn('cumulative', profile.summary)
+        self.assertTrue(pstats.Stats(self._dump(profile)).stats)
+
+    def _dump(self, profile):
+        handle = tempfile.NamedTemporaryFile(suffix='.prof', delete=False)
+        self.addCleanup(os.unlink, handle.name)
+        handle.write(bytes(profile.stats))
+        handle.close()
+        return handle.name
+
+    def test_query_flag_and_non_superuser_is_ignored(self):
+        response = self._get(self.superuser, '/api/notifications/?_profile=1')
+        self.assertEqual(response['X-Profile-Status'], 'stored')
+
+        response = self._get(self.common_user, '/api/notifications/?_profile=1', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Status', response)
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_false_flag_values_do_not_profile(self):
+        for extra in ({'HTTP_X_PROFILE': '0'}, {'HTTP_X_PROFILE': 'false'}, {}):
+            response = self._get(self.superuser, '/api/notifications/?_profile=0', **extra)
+            self.assertNotIn('X-Profile-Status', response)
+        self.assertEqual(self._get(self.superuser, '/api/notifications/?_profile=true')['X-Profile-Status'], 'stored')
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    @override_settings(PROFILING_RATE_LIMIT=2, PROFILING_KEEP=1)
+    def test_rate_limit_and_retention(self):
+        statuses = [self._get(self.superuser, HTTP_X_PROFILE='1')['X-Profile-Status'] for _ in range(3)]
+        self.assertEqual(statuses, ['stored', 'stored', 'rate-limited'])
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_admin_lists_and_downloads_for_superuser_only(self):
+        profile_id = self._get(self.superuser, HTTP_X_PROFILE='1')['X-Profile-Id']
+        staff = User.objects.create_user(username='staff_prof', password='pass12345', is_staff=True)
+
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(f'/admin/core/requestprofile/{profile_id}/download/').status_code, 403)
+
+        self.client.force_login(self.superuser)
+        self.assertContains(self.client.get('/admin/core/requestprofile/'), '/api/notifications/')
+        response = self.client.get(f'/admin/core/requestprofile/{profile_id}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename="profile-', response['Content-Disposition'])
+
+
+class SlowQueryRecorderTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='slow_user', password='pass12345')
+        Notification.objects.create(recipient=self.user, title='Aviso', message='Teste')
+        self.client.force_authenticate(user=self.user)
+
+    @override_settings(SLOW_QUERY_MS=0.0001, SLOW_QUERY_KEEP=50)
+    def test_records_sql_params_view_location_and_plan(self):
+        response = self.client.get('/api/notifications/')
+        self.assertEqual(response.status_code, 200)
+        recorded = SlowQuery.objects.filter(view_name='notification-list', sql__contains='core_notification')
+        self.assertTrue(recorded.exists())
+        query = recorded.filter(sql__contains='ORDER BY').first()
+        self.assertIn(self.user.id, query.params)
+        self.assertEqual(query.path, '/api/notifications/')
+        self.assertIn('Plan', query.plan[0])
+        self.assertTrue(SlowQuery.objects.exclude(location='').filter(location__contains='apps/').exists())
+
+        out = StringIO()
+        call_command('slow_queries_report', '--view', 'notification-list', '--show-plan', stdout=out)
+        self.assertIn(query.fingerprint, out.getvalue())
+        self.assertIn('plano:', out.getvalue())
+
+    @override_settings(SLOW_QUERY_MS=0.0001, SLOW_QUERY_KEEP=3)
+    def test_table_is_capped(self):
+        self.client.get('/api/notifications/')
+        self.client.get('/api/notifications/')
+        self.assertEqual(SlowQuery.objects.count(), 3)
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_disabled_with_zero_threshold(self):
+        self.client.get('/api/notifications/')
+        self.assertFalse(SlowQuery.objects.exists())
+
+
+class QueryPlanRegressionTests(TestCase):
+    """Consultas quentes precisam usar os índices esperados (seq scan desligado; o plano natural fica com check_query_plans)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_load_data', '--students', '100', '--classrooms', '4', '--subjects', '2', '--years', '1',
+            '--start-year', '2025', '--grades-per-period', '1', '--notifications', '2000', '--audit-rows', '1000',
+            '--tag', 'pl', stdout=StringIO(),
+        )
+
+    def test_hot_queries_use_expected_indexes(self):
+        results = run_plan_checks(force_index=True, analyze=True)
+        self.assertEqual(len(results), 12)
+        failures = [row for row in results if not row['ok']]
+        self.assertEqual(failures, [])
+
+    def test_reports_sequential_scan_or_missing_index(self):
+        checks = [
+            ('justified', 'attendance_absent_enr_idx', Attendance.objects.filter(justified=True)),
+            ('missing', 'attendance_inexistente_idx', Attendance.objects.filter(enrollment_id=1, present=False)),
+        ]
+        self.assertEqual([row['ok'] for row in run_plan_checks(force_index=True, checks=checks)], [False, False])
+
+    def test_command_lists_every_check(self):
+        out = StringIO()
+        call_command("check_query_plans", "--force-index", "--analyze", stdout=out)
+        self.assertIn('12 planos conferidos', out.getvalue())
+
+
+@override_settings(REPLICA_READS=True)
+class ReplicaRoutingTests(APITestCase):
+    """Com DB_REPLICA_HOST definido, o alias 'replica' espelha o banco de teste (TEST.MIRROR)."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        db_routing.reset_lag_cache()
+        self.coordinator = User.objects.create_user(username='coord_replica', password='pass12345')
+        self.coordinator.groups.add(Group.objects.get_or_create(name='Coordenacao')[0])
+
+    def _replica_queries(self, call):
+        if not db_routing.replica_configured():
+            call()
+            return None
+        with CaptureQueriesContext(connections['replica']) as captured:
+            call()
+        return len(captured.captured_queries)
+
+    def test_reads_stay_on_default_outside_opted_in_views(self):
+        self.assertIsNone(db_routing.ReplicaRouter().db_for_read(User))
+        self.assertEqual(db_routing.ReplicaRouter().db_for_write(User), 'default')
+        self.client.force_authenticate(user=self.coordinator)
+        replica = self._replica_queries(lambda: self.assertEqual(self.client.get('/api/notifications/').status_code, 200))
+        self.assertIn(replica, (None, 0))
+
+    def test_without_replica_falls_back_to_default(self):
+        if db_routing.replica_configured():
+            self.skipTest('réplica configurada')
+        self.assertEqual(db_routing.choose_read_alias(self.coordinator), 'default')
+        self.client.force_authenticate(user=self.coordinator)
+        self.assertEqual(self.client.get('/api/dashboard/data/').status_code, 200)
+
+    def test_opted_in_view_reads_from_replica(self):
+        if not db_routing.replica_configured():
+            self.skipTest('defina DB_REPLICA_HOST para testar a réplica')
+        self.client.force_authenticate(user=self.coordinator)
+        replica = self._replica_queries(lambda: self.assertEqual(self.client.get('/api/dashboard/data/').status_code, 200))
+        self.assertGreater(replica, 0)
+
+    def test_recent_writer_and_lagging_replica_read_from_default(self):
+        if not db_routing.replica_configured():
+            self.skipTest('defina DB_REPLICA_HOST para testar a réplica')
+        self.client.force_authenticate(user=self.coordinator)
+        self.assertEqual(self.client.patch('/api/notifications/mark_all_read/').status_code, 200)
+        self.assertEqual(self._replica_queries(lambda: self.client.get('/api/dashboard/data/')), 0)
+
+        # Outro worker (cache por processo vazio): o cookie assinado mantém a leitura no default.
+        cache.clear()
+        self.assertIn(db_routing.STICKY_COOKIE, self.client.cookies)
+        self.assertEqual(self._replica_queries(lambda: self.client.get('/api/dashboard/data/')), 0)
+
+        # O cookie só vale para quem gravou.
+        request = RequestFactory().get('/api/dashboard/data/')
+        request.COOKIES[db_routing.STICKY_COOKIE] = self.client.cookies[db_routing.STICKY_COOKIE].value
+        other = User.objects.create_user(username='outro_replica', password='pass12345')
+        self.assertEqual(db_routing.choose_read_alias(self.coordinator, request), 'default')
+        self.assertEqual(db_routing.choose_read_alias(other, request), db_routing.REPLICA_ALIAS)
+
+        del self.client.cookies[db_routing.STICKY_COOKIE]
+        self.assertEqual(db_routing.replica_lag(), 0)  # medição fica em cache
+        with override_settings(REPLICA_MAX_LAG_SECONDS=-1):
+            self.assertEqual(self._replica_queries(lambda: self.client.get('/api/dashboard/data/')), 0)
+        db_routing.reset_lag_cache()
+        self.assertGreater(self._replica_queries(lambda: self.client.get('/api/dashboard/data/')), 0)
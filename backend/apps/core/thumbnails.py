@@ -0,0 +1,150 @@
+"""
+Miniaturas de imagens enviadas (foto do aluno, logotipo da escola).
+
+As derivadas são gravadas ao lado do original, no mesmo storage:
+``students/foto.jpg`` -> ``students/foto.thumb-sm.webp``. São geradas no
+``save()`` quando a imagem muda; arquivos anteriores ao pipeline são
+processados pelo comando ``generate_thumbnails`` (uma leitura do original por
+imagem). A leitura da API nunca gera miniatura: enquanto não houver, devolve a
+URL do original.
+
+O estado de cada arquivo (pronto, ausente, falhou) fica no cache, então as
+listagens não consultam o storage a cada requisição e um original corrompido
+não é reprocessado (nem gera traceback no log) a cada chamada.
+
+WebP é o formato padrão; se o Pillow instalado não tiver suporte a WebP,
+cai para JPEG (o nome do arquivo acompanha o formato).
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+# Lado máximo (px) de cada tamanho.
+THUMBNAIL_SIZES = {
+    'sm': 64,    # avatar em listas
+    'md': 160,   # grade de turma / cards
+    'lg': 480,   # visualização/perfil
+}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Estado das miniaturas por arquivo no cache (segundos).
+STATE_KEY = 'thumbnails:{}'
+READY_TTL = 24 * 3600
+MISSING_TTL = 600
+FAILED_TTL = 24 * 3600
+
+
+def _output_format():
+    from PIL import features
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def thumbnail_name(name, size):
+    root, _ = os.path.splitext(name)
+    _, extension = _output_format()
+    return f'{root}.thumb-{size}.{extension}'
+
+
+def _render(image, max_side, crop, image_format):
+    from PIL import Image, ImageOps
+
+    if crop:
+        # Avatares: recorte central quadrado.
+        thumb = ImageOps.fit(image, (max_side, max_side), Image.Resampling.LANCZOS)
+    else:
+        thumb = image.copy()
+        thumb.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        if thumb.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', thumb.size, (255, 255, 255))
+            background.paste(thumb, mask=thumb.convert('RGBA').split()[-1])
+            thumb = background
+        thumb.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        if thumb.mode not in ('RGB', 'RGBA'):
+            thumb = thumb.convert('RGBA' if 'A' in thumb.getbands() or 'transparency' in thumb.info else 'RGB')
+        thumb.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _state_key(name):
+    return STATE_KEY.format(name)
+
+
+def generate_thumbnails(fieldfile, crop=False):
+    """
+    (Re)gera todas as miniaturas de um ImageField já salvo, abrindo o original
+    uma vez. Retorna a lista de nomes gravados. Falhas de leitura (arquivo
+    ausente/corrompido) são registradas, lembradas no cache e não propagam.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    if not fieldfile:
+        return []
+    storage = fieldfile.storage
+    image_format, _ = _output_format()
+
+    try:
+        with storage.open(fieldfile.name, 'rb') as source:
+            image = Image.open(source)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (OSError, UnidentifiedImageError, ValueError):
+        logger.warning('Não foi possível gerar miniaturas de %s', fieldfile.name, exc_info=True)
+        cache.set(_state_key(fieldfile.name), 'failed', FAILED_TTL)
+        return []
+
+    written = []
+    for size in THUMBNAIL_SIZES:
+        name = thumbnail_name(fieldfile.name, size)
+        content = _render(image, THUMBNAIL_SIZES[size], crop, image_format)
+        if storage.exists(name):
+            storage.delete(name)
+        written.append(storage.save(name, ContentFile(content)))
+    cache.set(_state_key(fieldfile.name), 'ready', READY_TTL)
+    return written
+
+
+def thumbnail_state(fieldfile):
+    """
+    'ready', 'missing' ou 'failed'. Sem informação no cache, confere no
+    storage só a última miniatura gravada (todas são geradas juntas).
+    """
+    key = _state_key(fieldfile.name)
+    state = cache.get(key)
+    if state is None:
+        last_size = list(THUMBNAIL_SIZES)[-1]
+        ready = fieldfile.storage.exists(thumbnail_name(fieldfile.name, last_size))
+        state = 'ready' if ready else 'missing'
+        cache.set(key, state, READY_TTL if ready else MISSING_TTL)
+    return state
+
+
+def thumbnail_urls(fieldfile, request=None):
+    """
+    Dicionário {tamanho: url} (None se não houver imagem). Sem miniaturas
+    prontas, todos os tamanhos apontam para o original.
+    """
+    if not fieldfile:
+        return None
+    if thumbnail_state(fieldfile) == 'ready':
+        storage = fieldfile.storage
+        urls = {size: storage.url(thumbnail_name(fieldfile.name, size)) for size in THUMBNAIL_SIZES}
+    else:
+        urls = dict.fromkeys(THUMBNAIL_SIZES, fieldfile.url)
+    if request is not None:
+        urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+    return urls
+
+
+def image_changed(fieldfile):
+    """True quando o arquivo do campo foi trocado e ainda não foi gravado (usar antes do save())."""
+    return bool(fieldfile) and not getattr(fieldfile, '_committed', True)
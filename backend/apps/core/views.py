@@ -5,8 +5,10 @@ from django.utils.encoding import force_bytes, force_str
 from django.core.mail import send_mail
 from django.utils.html import strip_tags
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.http import HttpResponse
 import csv
+import hmac
 from django.db.models import Q
 from django.db.utils import ProgrammingError, OperationalError
 from rest_framework import viewsets, status, permissions
@@ -14,10 +16,12 @@ from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from apps.core.pagination import LargeResultsSetPagination
+from apps.core.pagination import KeysetPaginationMixin, LargeResultsSetPagination
 from .models import SchoolAccount, Notification, AccessAuditLog
 from .serializers import UserSerializer, SchoolAccountSerializer, NotificationSerializer, AccessAuditLogSerializer
 from apps.core.audit import register_access_audit
+from apps.core import metrics
+from apps.core.db_routing import ReplicaReadMixin
 
 User = get_user_model()
 
@@ -249,8 +253,9 @@ class SchoolConfigView(APIView):
         # O Frontend entenderá isso e usará o padrão 'Lumis'
         return Response(status=404)
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         # Cada usuário só vê as suas notificações
@@ -269,8 +274,10 @@ class NotificationViewSet(viewsets.ModelViewSet):
         return Response({'status': 'all_read'})
 
 
-class AccessAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AccessAuditLogViewSet(ReplicaReadMixin, KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = AccessAuditLogSerializer
+    replica_actions = {'list', 'export_csv'}
+    keyset_ordering = ('-created_at', '-id')
     pagination_class = LargeResultsSetPagination
     permission_classes = [permissions.IsAuthenticated]
 
@@ -325,4 +332,21 @@ class AccessAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
                 item.get('user_agent', ''),
                 str(item.get('details', {})),
             ])
-        return response
\ No newline at end of file
+        return response
+
+
+def metrics_view(request):
+    """
+    Métricas no formato texto do Prometheus (fora do DRF: o coletor não usa JWT).
+    Com METRICS_TOKEN exige "Authorization: Bearer <token>"; sem ele, só em DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        provided = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(provided.encode(), f'Bearer {token}'.encode()):
+            return HttpResponse('Não autorizado.', status=401, content_type='text/plain; charset=utf-8')
+    elif not settings.DEBUG:
+        return HttpResponse('Métricas desativadas: defina METRICS_TOKEN.', status=404, content_type='text/plain; charset=utf-8')
+    if not settings.METRICS_ENABLED:
+        return HttpResponse('Métricas desativadas.', status=404, content_type='text/plain; charset=utf-8')
+    return HttpResponse(metrics.render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
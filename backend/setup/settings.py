@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from decouple import config
 from datetime import timedelta
 from django.core.exceptions import ImproperlyConfigured
@@ -62,6 +63,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'apps.core',
@@ -71,14 +73,19 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.MetricsMiddleware',
+    'apps.core.middleware.SlowQueryMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'apps.core.middleware.SQLInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'setup.urls'
@@ -104,6 +111,20 @@ WSGI_APPLICATION = 'setup.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Conexões persistentes: segundos que a conexão de cada worker fica aberta
+# entre requisições (0 = abre e fecha a cada requisição). Com a checagem de
+# saúde, uma conexão derrubada pelo servidor é refeita antes de ser usada.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+# Pool de conexões (psycopg 3 + psycopg_pool) para gunicorn com --threads ou
+# ASGI: cada processo mantém de DB_POOL_MIN_SIZE a DB_POOL_MAX_SIZE conexões e
+# uma requisição espera até DB_POOL_TIMEOUT segundos por uma livre. Substitui
+# as conexões persistentes (CONN_MAX_AGE fica 0). Validado em apps/core/checks.py.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -112,9 +133,41 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        'OPTIONS': {
+            'pool': {'min_size': DB_POOL_MIN_SIZE, 'max_size': DB_POOL_MAX_SIZE, 'timeout': DB_POOL_TIMEOUT},
+        } if DB_POOL else {},
     }
 }
 
+# Réplica de leitura (opcional). Só as views com ReplicaReadMixin leem dela
+# (apps/core/db_routing.py); sem DB_REPLICA_HOST tudo fica no default. Nos
+# testes a réplica espelha o banco de teste do default (TEST.MIRROR).
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['apps.core.db_routing.ReplicaRouter']
+# Liga/desliga as leituras na réplica sem remover a configuração. O runner de
+# testes desliga: o espelho é outra conexão e não enxerga os dados ainda não
+# commitados de cada TestCase (ReplicaRoutingTests religa).
+REPLICA_READS = config('REPLICA_READS', default=True, cast=bool)
+TEST_RUNNER = 'apps.core.test_runner.LumisTestRunner'
+# Atraso máximo aceito na réplica, intervalo entre medições do atraso e por
+# quanto tempo as leituras de quem acabou de gravar ficam no default.
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5, cast=float)
+REPLICA_LAG_CHECK_SECONDS = config('REPLICA_LAG_CHECK_SECONDS', default=5, cast=float)
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -158,6 +211,67 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache (resumos do portal da família, etc.)
+# Em produção com vários workers, prefira um backend compartilhado
+# (ex.: CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache e CACHE_LOCATION=/tmp/lumis-cache).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='lumis-default'),
+    }
+}
+
+# TTL (segundos) do resumo da família; escritas relevantes invalidam antes disso.
+FAMILY_SUMMARY_CACHE_TTL = config('FAMILY_SUMMARY_CACHE_TTL', default=60, cast=int)
+
+# TTL (segundos) das estatísticas de notas por período; gravação de nota invalida o período.
+GRADE_ANALYTICS_CACHE_TTL = config('GRADE_ANALYTICS_CACHE_TTL', default=300, cast=int)
+
+# Instrumentação de SQL por requisição (apps/core/middleware.py): Server-Timing +
+# aviso no logger lumis.sql quando a view estoura o orçamento ou repete a mesma
+# consulta (N+1). Desligada, só vale para quem enviar o cabeçalho abaixo e for
+# da coordenação/direção ou superusuário.
+SQL_INSTRUMENTATION = config('SQL_INSTRUMENTATION', default=False, cast=bool)
+SQL_INSTRUMENTATION_HEADER = config('SQL_INSTRUMENTATION_HEADER', default='X-Debug-SQL')
+SQL_QUERY_BUDGET = config('SQL_QUERY_BUDGET', default=50, cast=int)
+SQL_TIME_BUDGET_MS = config('SQL_TIME_BUDGET_MS', default=300, cast=int)
+SQL_DUPLICATE_QUERY_THRESHOLD = config('SQL_DUPLICATE_QUERY_THRESHOLD', default=5, cast=int)
+
+# Consultas acima de SLOW_QUERY_MS (0 desliga) são gravadas com o plano (EXPLAIN)
+# em admin > Consultas Lentas; só as SLOW_QUERY_KEEP mais recentes ficam.
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=500, cast=float)
+SLOW_QUERY_KEEP = config('SLOW_QUERY_KEEP', default=1000, cast=int)
+
+# Perfil de requisição sob demanda (superusuário, cabeçalho X-Profile ou ?_profile=1).
+# Limite por usuário por hora (contado no cache padrão: com LocMemCache vale por worker)
+# e quantos perfis ficam guardados (admin > Perfis de Requisição).
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=True, cast=bool)
+PROFILING_RATE_LIMIT = config('PROFILING_RATE_LIMIT', default=10, cast=int)
+PROFILING_KEEP = config('PROFILING_KEEP', default=100, cast=int)
+
+# Métricas Prometheus (GET /metrics). Cada processo grava seus valores em
+# METRICS_DIR, que precisa ser compartilhado pelos workers do gunicorn (e pelos
+# comandos de manutenção) e limpo ao reiniciar o serviço. Sem METRICS_TOKEN o
+# endpoint só responde com DEBUG=True; com ele, exige "Authorization: Bearer <token>".
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'lumis-metrics'))
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=5, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'lumis': {
+            'handlers': ['console'],
+            'level': config('LUMIS_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 